@@ -1,20 +1,97 @@
 # backend/app.py
+import asyncio
+import heapq
+import json
 import os
 import math
-import requests
-from datetime import datetime, timedelta
-from fastapi import FastAPI, HTTPException
+import time
+from datetime import date, datetime, timedelta
+import numpy as np
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
-from simulation.calculations import ImpactCalculator, run_simulation
 
-# Load .env if present
+# Load .env if present (before local modules read their settings)
 load_dotenv()
 
+import metrics
+from jobs import JobManager, JobStore, JOB_PAGE_LIMIT, DONE, job_id
+from hazard_ranking import rank_catalog, DEFAULT_TOP_K, MAX_TOP_K
+from cache import ResponseMemo, TTLCache
+from catalog_store import NeoCatalog, NEO_CATALOG_PATH, iter_synced_shards, parse_feed_object, sync_range
+from nasa_client import NeoWsClient, check_feed_range, NASA_CACHE_MAX_BYTES, NASA_CACHE_STALE, NASA_CACHE_TTLS
+from simulation.calculations import (
+    DEFAULT_ANGLE, run_batch_simulation, impact_summary, iter_impact_summaries,
+    iter_batch_rows, batch_to_rows, iter_batch_simulation, batch_output_columns, label_columns, set_stage_observer,
+)
+from simulation.deflection import (
+    EARTH_ESCAPE_SPEED, deflect, min_delta_v_sweep, shifted_impact_point, DEFAULT_APPROACH_AZIMUTH, DEFAULT_APPROACH_ELEVATION,
+)
+from simulation.exposure import load_population_raster, zone_radii
+from simulation.result_store import ResultStore, SIMULATION_VERSION, code_version, result_key
+from simulation.heatmap import HeatmapStore, build_heatmap, heatmap_id, DEFAULT_RESOLUTION, DEFAULT_TILE_SIZE
+from simulation.models import MODELS, DEFAULT_MODEL, get_model
+from simulation.monte_carlo import (
+    nasa_distributions, resolve_distributions, run_monte_carlo, validate_monte_carlo, DEFAULT_CHUNK_SIZE, MAX_SAMPLES,
+)
+from simulation.sensitivity import (
+    run_sensitivity, METHODS, DEFAULT_LEVELS, DEFAULT_RELATIVE_STEP, DEFAULT_SOBOL_SAMPLES, DEFAULT_TRAJECTORIES,
+)
+from simulation.scenario import (
+    run_scenario, decimate, pack_frames, APPROACH_TIME, DEFAULT_MAX_FRAMES, FRAME_DTYPE, FRAME_HEADER, MAX_FRAMES,
+    SCENARIO_COLUMNS,
+)
+from simulation.parallel import batch_simulation, monte_carlo, shutdown_executor, BATCH_INPUT_COLUMNS
+from streaming import stream_format, streaming_response, STREAM_FORMATS
+from columnar import columnar_format, columnar_response
+
 NASA_API_KEY = os.getenv("NASA_API_KEY", "RKXMM4oRmVRK0efpUqkbcg38cf1fLMJaRDtKGgYJ")
-NASA_NEO_BASE = "https://api.nasa.gov/neo/rest/v1"
+NASA_NEO_BASE = os.getenv("NASA_NEO_BASE", "https://api.nasa.gov/neo/rest/v1")
+
+# Shared pooled NeoWs client for every NASA endpoint, with a response cache
+nasa_cache = TTLCache(NASA_CACHE_MAX_BYTES, NASA_CACHE_TTLS, stale_ttl=NASA_CACHE_STALE)
+nasa = NeoWsClient(NASA_NEO_BASE, NASA_API_KEY, cache=nasa_cache)
+# Longest /nasa-asteroids waits on NeoWs before answering from the catalog or sample data (s)
+NASA_ASTEROIDS_DEADLINE = float(os.getenv("NASA_ASTEROIDS_DEADLINE", "5"))
+
+# Local NEO catalog; feed and lookup endpoints answer from it when enabled
+catalog = NeoCatalog(NEO_CATALOG_PATH) if NEO_CATALOG_PATH else None
+
+# Serialized responses of the deterministic simulation endpoints, keyed on quantized inputs
+response_memo = ResponseMemo(
+    int(os.getenv("RESPONSE_MEMO_MAX_ENTRIES", "4096")), int(os.getenv("RESPONSE_MEMO_DIGITS", "6"))
+)
+
+# Results on disk, content-addressed by code version and inputs: shared by every worker
+# and kept across restarts. RESULT_STORE_DIR="" disables it; only results that took at
+# least RESULT_STORE_MIN_SECONDS to compute are kept
+RESULT_STORE_DIR = os.getenv("RESULT_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "results"))
+result_store = ResultStore(
+    RESULT_STORE_DIR,
+    int(os.getenv("RESULT_STORE_MAX_BYTES", str(512 * 1024 * 1024))),
+    float(os.getenv("RESULT_STORE_MAX_AGE", str(30 * 86400)))
+) if RESULT_STORE_DIR else None
+RESULT_STORE_MIN_SECONDS = float(os.getenv("RESULT_STORE_MIN_SECONDS", "0.05"))
+# Responses are shaped here too, so a change to the API code also retires stored results
+RESULT_VERSION = SIMULATION_VERSION + code_version(os.path.dirname(os.path.abspath(__file__)))
+
+# Optional gridded population (.npy + .json sidecar, memory-mapped, or an ESRI .asc grid)
+# for per-zone exposure in /simulate and /simulate/batch
+population = load_population_raster(os.getenv("POPULATION_RASTER", ""))
+
+# Tiled heatmaps, content-addressed by their request
+heatmap_store = HeatmapStore(os.getenv(
+    "HEATMAP_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "heatmaps")
+))
+
+# Background jobs for runs too long for one request; state and results on disk
+jobs = JobManager(JobStore(os.getenv(
+    "JOB_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "jobs")
+)))
+JOB_CHUNK_ROWS = int(os.getenv("JOB_CHUNK_ROWS", "100000"))
 
 app = FastAPI(title="Impactor-2025 API", version="2.0.0")
 
@@ -27,14 +104,84 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request timing (outermost, so it sees CORS and serialization time too)
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+    # Model kernel and column stages of every batch chunk, parallel shards included
+    set_stage_observer(metrics.observe)
+    metrics.REGISTRY.stats("nasa_cache", "NASA response cache", nasa_cache.stats)
+    metrics.REGISTRY.stats("nasa_upstream", "NeoWs circuit breaker and hedging", lambda: nasa.stats())
+    metrics.REGISTRY.stats("response_memo", "Simulation response memo", response_memo.stats)
+    if result_store is not None:
+        metrics.REGISTRY.stats("result_store", "On-disk simulation result store", result_store.stats)
+
+# Readiness (/ready): set once this worker has warmed up, cleared as soon as it starts draining
+ready = False
+
+@app.on_event("startup")
+async def warm_up():
+    """One small simulation per worker, so the first real request doesn't pay for first-use setup"""
+    global ready
+    await asyncio.to_thread(simulate_columns, 100.0, 20.0, 3000.0)
+    ready = True
+
+@app.on_event("shutdown")
+async def shutdown_pools():
+    global ready
+    ready = False
+    jobs.cancel_all()
+    shutdown_executor()
+    await nasa.aclose()
+
 # --- Pydantic Models ---
-class ImpactRequest(BaseModel):
+class ImpactScenario(BaseModel):
     diameter: float  # meters
     velocity: float  # km/s
     density: float   # kg/m³
+    angle: float = DEFAULT_ANGLE  # degrees from horizontal
     lat: Optional[float] = None
     lon: Optional[float] = None
 
+class ImpactRequest(ImpactScenario):
+    model: str = DEFAULT_MODEL  # see GET /models
+
+class ScenarioRequest(ImpactRequest):
+    max_frames: int = DEFAULT_MAX_FRAMES  # frames streamed, placed where the animation changes most
+    frames_per_message: int = 64
+    approach_time: float = APPROACH_TIME  # seconds of approach before atmospheric entry
+
+class BatchImpactRequest(BaseModel):
+    scenarios: List[ImpactScenario]
+    model: str = DEFAULT_MODEL
+
+class MonteCarloRequest(BaseModel):
+    # Distribution specs, e.g. {"dist": "loguniform", "low": 120, "high": 270}
+    diameter: Dict  # meters
+    velocity: Optional[Dict] = None  # km/s
+    density: Optional[Dict] = None   # kg/m³
+    angle: Optional[Dict] = None     # degrees
+    samples: int = 100_000
+    seed: Optional[int] = None
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+    percentiles: List[float] = [5, 25, 50, 75, 95]
+    model: str = DEFAULT_MODEL
+
+class SensitivityRequest(BaseModel):
+    # Base point: local derivatives are taken here, default ranges are ±25% around it
+    diameter: float  # meters
+    velocity: float  # km/s
+    density: float = 3000.0
+    angle: float = DEFAULT_ANGLE
+    # Distribution specs per parameter (uniform, loguniform, triangular, isotropic, fixed)
+    ranges: Dict[str, Dict] = {}
+    methods: List[str] = list(METHODS)  # local, sobol, morris
+    samples: int = DEFAULT_SOBOL_SAMPLES  # Sobol base samples, rounded up to a power of two
+    trajectories: int = DEFAULT_TRAJECTORIES  # Morris
+    levels: int = DEFAULT_LEVELS  # Morris grid levels
+    relative_step: float = DEFAULT_RELATIVE_STEP  # local central differences
+    seed: Optional[int] = None
+    model: str = DEFAULT_MODEL
+
 class MitigationRequest(BaseModel):
     diameter: float
     velocity: float
@@ -43,12 +190,59 @@ class MitigationRequest(BaseModel):
     time_before_impact: float  # days
     lat: float
     lon: float
+    direction: str = "along_track"  # along_track, radial or normal
+    approach_azimuth: float = DEFAULT_APPROACH_AZIMUTH  # degrees from Earth's direction of motion
+    approach_elevation: float = DEFAULT_APPROACH_ELEVATION  # degrees above the ecliptic
+
+class MitigationSweepRequest(BaseModel):
+    velocity: float  # impact velocity, km/s
+    lead_times_days: List[float]
+    # Explicit delta-v grid (m/s), or a log-spaced one from the bounds below
+    delta_v_ms: Optional[List[float]] = None
+    delta_v_min: float = 1e-4
+    delta_v_max: float = 10.0
+    delta_v_points: int = 400
+    direction: str = "along_track"
+    margin: float = 1.0  # required miss distance in capture radii
+    approach_azimuth: float = DEFAULT_APPROACH_AZIMUTH
+    approach_elevation: float = DEFAULT_APPROACH_ELEVATION
+    include_grid: bool = False  # also return the full miss-distance matrix
+
+class HeatmapImpactor(BaseModel):
+    diameter: float  # meters
+    velocity: float  # km/s
+    density: float = 3000.0
+    angle: float = DEFAULT_ANGLE
+    weight: float = 1.0  # e.g. impact probability
+
+class HeatmapScenario(HeatmapImpactor):
+    lat: float
+    lon: float
+
+class HeatmapRequest(BaseModel):
+    # exposure: people in the zone if the impactors hit each cell (needs POPULATION_RASTER)
+    # frequency: summed weight of the scenario footprints covering each cell
+    metric: str = "exposure"
+    zone: str = "shockwave"  # crater, ejecta, earthquake, shockwave or thermal
+    resolution: float = DEFAULT_RESOLUTION  # degrees
+    tile_size: int = DEFAULT_TILE_SIZE
+    model: str = DEFAULT_MODEL
+    impactors: List[HeatmapImpactor] = []
+    scenarios: List[HeatmapScenario] = []
+
+class CatalogRankingRequest(BaseModel):
+    k: int = DEFAULT_TOP_K
+    density: float = 3000.0  # kg/m³, assumed for every object
+    angle: float = DEFAULT_ANGLE
+    model: str = DEFAULT_MODEL
+    refresh: bool = False    # rank the catalog again rather than return the finished ranking
 
 class ManualImpactInput(BaseModel):
     diameter: float
     velocity: float
     density: float = 3000.0
-    angle: float = 45.0
+    angle: float = DEFAULT_ANGLE
+    model: str = DEFAULT_MODEL
 
 class NasaAsteroid(BaseModel):
     id: str
@@ -57,60 +251,59 @@ class NasaAsteroid(BaseModel):
     velocity: float
     miss_distance: float
     date: str
+    angle: float = DEFAULT_ANGLE
+    model: str = DEFAULT_MODEL
 
 # --- Helper Functions ---
-def simulate_impact_basic(diameter_m: float, velocity_ms: float, density_kgm3: float = 3000.0, angle_deg: float = 45.0):
-    """
-    Approximate impact calculator (fallback). Returns dict with mass, energy, crater, seismic magnitude.
-    Note: approximate — replace with more robust model / Holsapple scaling for production.
-    """
-    # radius
-    r = diameter_m / 2.0
-    volume = (4.0/3.0) * math.pi * (r**3)               # m^3
-    mass = volume * density_kgm3                        # kg
-
-    # kinetic energy
-    energy_joules = 0.5 * mass * (velocity_ms**2)       # J
-
-    # convert to TNT equivalents
-    # 1 megaton TNT = 4.184e15 J
-    energy_megatons = energy_joules / 4.184e15
-
-    # crude crater scaling (very approximate)
-    # using a power-law from earlier examples — results are illustrative
-    crater_diameter_km = 1.161 * (energy_joules ** (1.0/3.4)) / 1000.0
-    crater_diameter_km = max(0.001, crater_diameter_km)
-
-    # seismic magnitude approx (very rough)
-    # magnitude = a * log10(E) + b ; constants chosen for demonstration
-    if energy_joules > 0:
-        magnitude = 0.67 * math.log10(energy_joules) - 5.87
-    else:
-        magnitude = 0.0
-
-    # simple impact classification
-    if diameter_m < 25:
-        impact_type = "airburst / local"
-    elif diameter_m < 100:
-        impact_type = "regional"
-    elif diameter_m < 1000:
-        impact_type = "continental"
-    else:
-        impact_type = "global"
+def encode_json(content) -> bytes:
+    """Same encoding FastAPI's JSONResponse uses"""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
 
-    return {
-        "diameter_m": diameter_m,
-        "density_kgm3": density_kgm3,
-        "velocity_ms": velocity_ms,
-        "mass_kg": mass,
-        "energy_joules": energy_joules,
-        "energy_megatons": energy_megatons,
-        "crater_diameter_km": crater_diameter_km,
-        "crater_radius_km": crater_diameter_km / 2.0,
-        "seismic_magnitude": magnitude,
-        "impact_type": impact_type,
-        "notes": "Approximate model — for demonstration only"
-    }
+def memoized_response(endpoint: str, model: BaseModel, compute):
+    """
+    Serve `compute(model)` from the response memo, then the on-disk result store. Inputs
+    are quantized before both the lookup and the computation, so a key always maps to the
+    same bytes. Stored results outlive the process, so their key also names the population
+    raster the exposure figures came from.
+    """
+    if not response_memo.enabled:
+        return compute(model)
+
+    quantized = response_memo.quantize_inputs(model.dict())
+    key = response_memo.key(endpoint, quantized)
+    body = response_memo.get(key)
+    if body is None:
+        stored_key = None
+        if result_store is not None:
+            inputs = dict(quantized, population=population.stats()) if population is not None else quantized
+            stored_key = result_key(endpoint, inputs, RESULT_VERSION)
+        body = result_store.get(stored_key) if stored_key else None
+        if body is None:
+            started = time.perf_counter()
+            result = compute(type(model)(**quantized))
+            with metrics.span("serialize"):
+                body = encode_json(result)
+            if stored_key and time.perf_counter() - started >= RESULT_STORE_MIN_SECONDS:
+                result_store.put(stored_key, body)
+        response_memo.put(key, body)
+    return Response(body, media_type="application/json")
+
+async def stored_response(kind: str, inputs: dict, compute):
+    """
+    `await compute()` answered from the on-disk result store when the same request was
+    computed before, by any worker or before a restart. Only for reproducible results.
+    """
+    if result_store is None:
+        return await compute()
+
+    key = result_key(kind, inputs, RESULT_VERSION)
+    body = await asyncio.to_thread(result_store.get, key)
+    if body is None:
+        started = time.perf_counter()
+        body = encode_json(await compute())
+        if time.perf_counter() - started >= RESULT_STORE_MIN_SECONDS:
+            await asyncio.to_thread(result_store.put, key, body)
+    return Response(body, media_type="application/json")
 
 # --- Core Endpoints ---
 @app.get("/")
@@ -126,52 +319,200 @@ def read_root():
 def health():
     return {"status": "ok", "time": datetime.utcnow().isoformat() + "Z"}
 
+@app.get("/ready")
+def readiness():
+    """
+    Readiness probe, unlike /health (liveness): 503 until this worker has warmed up, while
+    it drains at shutdown, or when the local catalog doesn't answer
+    """
+    checks = {"warmed_up": ready}
+    if catalog is not None:
+        try:
+            catalog.ping()
+            checks["catalog"] = True
+        except Exception:
+            checks["catalog"] = False
+    ok = all(checks.values())
+    body = {"status": "ready" if ok else "not ready", "pid": os.getpid(), "checks": checks}
+    return Response(encode_json(body), status_code=200 if ok else 503, media_type="application/json")
+
+def after_fork():
+    """Per-process state a worker forked from a preloaded master must not share with it"""
+    if catalog is not None:
+        catalog.reopen()
+
+@app.get("/cache-stats")
+def cache_stats():
+    """Hit/miss/eviction counters for the NASA response cache, the simulation memo and result store, NeoWs breaker state"""
+    return {
+        "nasa": nasa_cache.stats(),
+        "responses": response_memo.stats(),
+        "results": result_store.stats() if result_store is not None else None,
+        "upstream": nasa.stats()
+    }
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus text exposition of request/stage latency, upstream outcomes and cache counters"""
+    if not metrics.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (METRICS_ENABLED=0)")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/models")
+def list_models():
+    """Registered physics models; every simulation endpoint takes one by name"""
+    return {"default": DEFAULT_MODEL, "models": [model.info() for model in MODELS.values()]}
+
+def simulate_columns(diameter: float, velocity: float, density: float, angle: float = DEFAULT_ANGLE,
+                     lat: Optional[float] = None, lon: Optional[float] = None, model: str = DEFAULT_MODEL) -> dict:
+    """One scenario through the shared model path, as one-row batch columns"""
+    location = (
+        np.array([np.nan if lat is None else lat]),
+        np.array([np.nan if lon is None else lon]),
+    )
+    return run_batch_simulation([diameter], [velocity], [density], *location, [angle], model)
+
 @app.post("/simulate")
 def simulate_impact(impact: ImpactRequest):
     """
-    Main simulation endpoint using ImpactCalculator
+    Main simulation endpoint; `model` picks the physics (GET /models)
     """
+    return memoized_response("simulate", impact, compute_impact)
+
+def compute_impact(impact: ImpactRequest):
     try:
-        # Convert velocity from km/s to m/s for calculations
-        velocity_ms = impact.velocity * 1000
-        
-        # Calculate kinetic energy
-        kinetic_energy = ImpactCalculator.calculate_kinetic_energy(
-            impact.diameter, velocity_ms, impact.density
+        columns = simulate_columns(
+            impact.diameter, impact.velocity, impact.density, impact.angle, impact.lat, impact.lon, impact.model
         )
-        
-        # Calculate crater dimensions
-        crater = ImpactCalculator.calculate_crater_size(kinetic_energy)
-        
-        # Calculate seismic magnitude
-        magnitude = ImpactCalculator.calculate_seismic_magnitude(kinetic_energy)
-        
-        # Energy comparisons
-        comparisons = ImpactCalculator.energy_comparisons(kinetic_energy)
-        
-        # Calculate impact zones
-        impact_zones = ImpactCalculator.calculate_impact_zones(
-            crater['radius'] / 1000,  # Convert to km
-            kinetic_energy / (4.184e15)  # Convert to megatons
+        result = next(iter_batch_rows(columns))
+
+        # People inside each zone's footprint, when a population raster is configured
+        if population is not None and impact.lat is not None and impact.lon is not None:
+            with metrics.span("population_exposure"):
+                result["population_exposure"] = population.zone_exposure(
+                    impact.lat, impact.lon, zone_radii(result["impact_zones"])
+                )
+
+        return result
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid simulation request: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
+
+@app.post("/simulate/batch")
+async def simulate_impact_batch(batch: BatchImpactRequest, request: Request, format: Optional[str] = None):
+    """
+    Batch simulation endpoint - N scenarios computed in one vectorized pass,
+    sharded across the process pool for large batches.
+    format=ndjson / json-stream computes and emits rows chunk by chunk instead.
+    format=columns / msgpack / arrow (or a MessagePack / Arrow Accept header) returns
+    struct-of-arrays columns with the zone metadata sent once.
+    """
+    try:
+        compact = columnar_format(request, format, ("json",) + STREAM_FORMATS)
+        fmt = None if compact else stream_format(request, format)
+        get_model(batch.model)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    scenarios = batch.scenarios
+    if fmt:
+        rows = iter_batch_simulation(
+            diameter=[s.diameter for s in scenarios],
+            velocity=[s.velocity for s in scenarios],
+            density=[s.density for s in scenarios],
+            lat=[s.lat for s in scenarios],
+            lon=[s.lon for s in scenarios],
+            augment=population.exposure_columns if population is not None else None,
+            angle=[s.angle for s in scenarios],
+            model=batch.model
         )
-        
+        return streaming_response(fmt, rows, {"model": batch.model}, key="results")
+
+    try:
+        columns = await batch_simulation(
+            diameter=[s.diameter for s in scenarios],
+            velocity=[s.velocity for s in scenarios],
+            density=[s.density for s in scenarios],
+            lat=[s.lat for s in scenarios],
+            lon=[s.lon for s in scenarios],
+            angle=[s.angle for s in scenarios],
+            model=batch.model
+        )
+        if population is not None:
+            columns.update(await asyncio.to_thread(population.exposure_columns, columns))
+
+        if compact:
+            return await asyncio.to_thread(
+                columnar_response, compact, {"count": len(scenarios), "model": batch.model},
+                columns, batch_output_columns(batch.model)
+            )
         return {
-            "kinetic_energy_joules": kinetic_energy,
-            "kinetic_energy_megatons": kinetic_energy / (4.184e15),
-            "crater_diameter_km": crater['diameter'] / 1000,
-            "crater_depth_km": crater['depth'] / 1000,
-            "crater_radius_km": crater['radius'] / 1000,
-            "seismic_magnitude": magnitude,
-            "comparisons": comparisons,
-            "impact_zones": impact_zones,
-            "impact_location": {
-                "lat": impact.lat,
-                "lon": impact.lon
-            } if impact.lat and impact.lon else None
+            "count": len(scenarios),
+            "model": batch.model,
+            "results": batch_to_rows(columns)
         }
-        
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch request: {str(e)}")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch calculation error: {str(e)}")
+
+@app.post("/simulate/monte-carlo")
+async def simulate_monte_carlo(mc: MonteCarloRequest):
+    """
+    Monte Carlo uncertainty sweep - percentiles of energy, crater, magnitude and zone radii
+    """
+    try:
+        def run():
+            return monte_carlo(
+                {"diameter": mc.diameter, "velocity": mc.velocity, "density": mc.density, "angle": mc.angle},
+                samples=mc.samples,
+                seed=mc.seed,
+                chunk_size=mc.chunk_size,
+                percentiles=mc.percentiles,
+                model=mc.model
+            )
+
+        # A seeded run gives the same answer on any worker count (chunks are seeded by index,
+        # see parallel_monte_carlo), so the seed, sizes and distributions are the whole key
+        if mc.seed is None:
+            return await run()
+        return await stored_response("monte-carlo", mc.dict(), run)
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid Monte Carlo request: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Monte Carlo error: {str(e)}")
+
+@app.post("/simulate/sensitivity")
+async def simulate_sensitivity(req: SensitivityRequest):
+    """
+    Which parameter matters most - local derivatives and global Sobol/Morris indices of energy,
+    crater, magnitude and zone radii with respect to diameter, velocity, density and angle
+    """
+    try:
+        def run():
+            return asyncio.to_thread(
+                run_sensitivity,
+                {"diameter": req.diameter, "velocity": req.velocity, "density": req.density, "angle": req.angle},
+                ranges=req.ranges,
+                methods=req.methods,
+                samples=req.samples,
+                trajectories=req.trajectories,
+                levels=req.levels,
+                relative_step=req.relative_step,
+                model=req.model,
+                seed=req.seed
+            )
+
+        if req.seed is None:
+            return await run()
+        return await stored_response("sensitivity", req.dict(), run)
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid sensitivity request: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Sensitivity analysis error: {str(e)}")
 
 @app.post("/simulate-mitigation")
 def simulate_mitigation(mitigation: MitigationRequest):
@@ -179,62 +520,189 @@ def simulate_mitigation(mitigation: MitigationRequest):
     Mitigation/deflection simulation
     """
     try:
-        # Simple orbital deflection calculation
-        time_seconds = mitigation.time_before_impact * 24 * 3600
-        
-        deflection_distance_km = (mitigation.delta_v * time_seconds) / 1000
-        
+        # Two-body heliocentric propagation; miss distance measured in the b-plane
+        result = deflect(
+            mitigation.time_before_impact,
+            mitigation.delta_v,
+            mitigation.velocity,
+            direction=mitigation.direction,
+            azimuth_deg=mitigation.approach_azimuth,
+            elevation_deg=mitigation.approach_elevation
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid mitigation request: {str(e)}")
+
+    try:
+        miss_distance_km = float(result["miss_distance_km"])
+        xi_km, zeta_km = float(result["xi_km"]), float(result["zeta_km"])
+        capture_km = result["capture_radius_km"]
+
         original_lat = mitigation.lat
         original_lon = mitigation.lon
-        
-        # Calculate new impact point
-        new_lat = original_lat + (deflection_distance_km / 111) * 0.1
-        new_lon = original_lon + (deflection_distance_km / 111) * 0.1
-        
-        # Check if deflection is sufficient to miss Earth
-        earth_radius_km = 6371
-        miss_distance_km = deflection_distance_km
-        
-        impact_avoided = miss_distance_km > 1000
-        
+        impact_avoided = bool(result["impact_avoided"])
+
         return {
-            "deflection_distance_km": deflection_distance_km,
+            "deflection_distance_km": miss_distance_km,
             "miss_distance_km": miss_distance_km,
             "impact_avoided": impact_avoided,
             "original_impact": {"lat": original_lat, "lon": original_lon},
-            "new_impact": {"lat": new_lat, "lon": new_lon} if not impact_avoided else None,
+            "new_impact": shifted_impact_point(original_lat, original_lon, xi_km, zeta_km, capture_km),
             "delta_v_applied": mitigation.delta_v,
-            "time_before_impact_days": mitigation.time_before_impact
+            "time_before_impact_days": mitigation.time_before_impact,
+            "b_plane": {"xi_km": xi_km, "zeta_km": zeta_km},
+            "capture_radius_km": capture_km,
+            "timing_shift_s": float(result["timing_shift_s"]),
+            "v_infinity_km_s": result["v_infinity_km_s"],
+            "entry_velocity_km_s": result["entry_velocity_km_s"],
+            "model": "two-body heliocentric propagation, b-plane miss distance"
         }
-        
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Mitigation calculation error: {str(e)}")
 
+@app.post("/simulate-mitigation/sweep")
+def simulate_mitigation_sweep(sweep: MitigationSweepRequest):
+    """
+    Minimum delta-v per lead time over a (lead time, delta-v) grid, evaluated in one vectorized pass
+    """
+    try:
+        if sweep.delta_v_ms is not None:
+            delta_v = sweep.delta_v_ms
+        else:
+            if not 0 < sweep.delta_v_min < sweep.delta_v_max or sweep.delta_v_points < 2:
+                raise ValueError("Need 0 < delta_v_min < delta_v_max and delta_v_points >= 2")
+            delta_v = np.logspace(np.log10(sweep.delta_v_min), np.log10(sweep.delta_v_max), sweep.delta_v_points)
+
+        result = min_delta_v_sweep(
+            sweep.lead_times_days,
+            delta_v,
+            sweep.velocity,
+            direction=sweep.direction,
+            margin=sweep.margin,
+            azimuth_deg=sweep.approach_azimuth,
+            elevation_deg=sweep.approach_elevation
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid mitigation sweep: {str(e)}")
+
+    try:
+        response = {
+            "lead_times_days": result["lead_times_days"].tolist(),
+            "min_delta_v_ms": [None if math.isnan(v) else v for v in result["min_delta_v_ms"].tolist()],
+            "capture_radius_km": result["capture_radius_km"],
+            "threshold_km": result["threshold_km"],
+            "v_infinity_km_s": result["v_infinity_km_s"],
+            "entry_velocity_km_s": result["entry_velocity_km_s"],
+            "grid_points": int(result["miss_distance_km"].size),
+        }
+        if sweep.include_grid:
+            response["delta_v_ms"] = result["delta_v_ms"].tolist()
+            response["miss_distance_km"] = result["miss_distance_km"].tolist()
+        return response
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Mitigation sweep error: {str(e)}")
+
+@app.websocket("/ws/scenario")
+async def scenario_stream(websocket: WebSocket):
+    """
+    Time-evolving impact scenarios (see simulation/scenario.py). Every JSON message is a
+    ScenarioRequest; the reply is a "scenario" JSON header (columns, frame dtype and layout,
+    phases in frame numbers, the final simulation result), binary messages of up to
+    frames_per_message frames, then {"event": "done"}. A bad request, or a message that is
+    not a JSON object, gets an "error" message and the socket stays open for the next one.
+    """
+    await websocket.accept()
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            try:
+                payload = json.loads(message["text"] if message.get("text") is not None else message["bytes"])
+                if not isinstance(payload, dict):
+                    raise ValueError("a request must be a JSON object")
+                req = ScenarioRequest(**payload)
+                if not 2 <= req.max_frames <= MAX_FRAMES:
+                    raise ValueError(f"max_frames must be between 2 and {MAX_FRAMES}")
+                if req.frames_per_message < 1:
+                    raise ValueError("frames_per_message must be positive")
+                scenario = await asyncio.to_thread(
+                    run_scenario, req.diameter, req.velocity, req.density, req.angle, req.lat, req.lon,
+                    req.model, approach_time=req.approach_time,
+                )
+                frames = decimate(scenario["columns"], req.max_frames)
+            except ValueError as e:
+                await websocket.send_json({"event": "error", "detail": f"Invalid scenario request: {str(e)}"})
+                continue
+            except Exception as e:
+                await websocket.send_json({"event": "error", "detail": f"Scenario error: {str(e)}"})
+                continue
+
+            await websocket.send_json({
+                "event": "scenario",
+                "columns": list(SCENARIO_COLUMNS),
+                "dtype": FRAME_DTYPE.str,
+                "header_format": FRAME_HEADER.format,
+                "frames": len(frames),
+                "samples": len(scenario["columns"]["time_s"]),
+                "phases": [
+                    {"name": phase["name"], "start": int(np.searchsorted(frames, phase["start"])),
+                     "stop": int(np.searchsorted(frames, phase["stop"]))}
+                    for phase in scenario["phases"]
+                ],
+                "impact_time_s": scenario["impact_time_s"],
+                "airburst": scenario["airburst"],
+                "entry_velocity_km_s": scenario["entry_velocity_km_s"],
+                "result": scenario["outcome"],
+            })
+            for first in range(0, len(frames), req.frames_per_message):
+                chunk = frames[first:first + req.frames_per_message]
+                await websocket.send_bytes(pack_frames(scenario["columns"], chunk, first))
+            await websocket.send_json({"event": "done", "frames": len(frames)})
+    except WebSocketDisconnect:
+        pass
+
 # --- NASA NEO Integration Endpoints ---
+SAMPLE_NEOS = [
+    {
+        "id": "2000433",
+        "name": "433 Eros (A898 PA)",
+        "diameter": 16800,
+        "velocity": 24.3,
+        "miss_distance": 26700000,
+        "date": "2024-01-15",
+        "hazardous": False
+    },
+    {
+        "id": "2001862",
+        "name": "1862 Apollo (1932 HA)",
+        "diameter": 1500,
+        "velocity": 22.5,
+        "miss_distance": 4500000,
+        "date": "2024-02-20",
+        "hazardous": True
+    }
+]
+
 @app.get("/nasa-asteroids")
-def get_nasa_asteroids():
+async def get_nasa_asteroids():
     """
-    Get list of near-Earth objects from NASA API - Enhanced version
+    Near-Earth objects approaching in the next 7 days. NeoWs gets one deadline-bounded
+    call (stale cached data is served while it refreshes); when it fails or its circuit
+    is open, the local catalog answers, then sample data.
     """
+    start = datetime.now().date()
+    end = start + timedelta(days=7)
     try:
-        # First try the enhanced version with date range
-        url = f"{NASA_NEO_BASE}/feed"
-        params = {
-            'start_date': datetime.now().strftime('%Y-%m-%d'),
-            'end_date': (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d'),
-            'api_key': NASA_API_KEY
-        }
-        
-        response = requests.get(url, params=params, timeout=15)
-        response.raise_for_status()
-        data = response.json()
+        data = await nasa.feed(start.isoformat(), end.isoformat(), timeout=NASA_ASTEROIDS_DEADLINE)
 
         neos = []
         for date, objs in data.get("near_earth_objects", {}).items():
             for obj in objs:
                 # Get close approach data
                 close_approach = obj.get("close_approach_data", [{}])[0]
-                
+
                 neos.append({
                     "id": obj["id"],
                     "name": obj["name"],
@@ -246,151 +714,496 @@ def get_nasa_asteroids():
                 })
 
         return {"neos": neos, "source": "NASA NEO API"}
-        
     except Exception as e:
-        # Fallback to simple version if enhanced fails
+        print(f"NASA API unavailable: {e!r}")
+
+    rows = []
+    if catalog is not None:
         try:
-            print(f"Enhanced NASA API failed, trying simple version: {e}")
-            url = f"https://api.nasa.gov/neo/rest/v1/feed?api_key={NASA_API_KEY}"
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-
-            asteroids = []
-            for date in data["near_earth_objects"]:
-                for asteroid in data["near_earth_objects"][date]:
-                    asteroids.append({
-                        "id": asteroid["id"],
-                        "name": asteroid["name"],
-                        "diameter_min": asteroid["estimated_diameter"]["meters"]["estimated_diameter_min"],
-                        "diameter_max": asteroid["estimated_diameter"]["meters"]["estimated_diameter_max"],
-                        "velocity": float(asteroid["close_approach_data"][0]["relative_velocity"]["kilometers_per_second"]),
-                        "miss_distance": float(asteroid["close_approach_data"][0]["miss_distance"]["kilometers"]),
-                        "approach_date": asteroid["close_approach_data"][0]["close_approach_date_full"],
-                        "hazardous": asteroid.get("is_potentially_hazardous_asteroid", False)
-                    })
-
-            return {"neos": asteroids, "source": "NASA NEO API (Simple)"}
-        except Exception as fallback_error:
-            # Return sample data if both API calls fail
-            print(f"Both NASA API calls failed: {fallback_error}")
-            return {
-                "neos": [
-                    {
-                        "id": "2000433",
-                        "name": "433 Eros (A898 PA)",
-                        "diameter": 16800,
-                        "velocity": 24.3,
-                        "miss_distance": 26700000,
-                        "date": "2024-01-15",
-                        "hazardous": False
-                    },
-                    {
-                        "id": "2001862", 
-                        "name": "1862 Apollo (1932 HA)",
-                        "diameter": 1500,
-                        "velocity": 22.5,
-                        "miss_distance": 4500000,
-                        "date": "2024-02-20",
-                        "hazardous": True
-                    }
-                ],
-                "source": "Sample Data (API Unavailable)"
-            }
+            rows = await asyncio.to_thread(catalog.query_feed, start.isoformat(), end.isoformat())
+        except Exception as e:
+            print(f"Local NEO catalog unavailable: {e}")
+    if rows:
+        metrics.count_fallback("nasa-asteroids", "catalog")
+        neos = [{
+            "id": row["id"],
+            "name": row["name"],
+            "diameter": row["diameter_max_m"],
+            "velocity": row["relative_velocity_km_s"] if row["relative_velocity_km_s"] is not None else 20.0,
+            "miss_distance": row["miss_distance_km"] if row["miss_distance_km"] is not None else 10000000.0,
+            "date": row["close_approach_date"],
+            "hazardous": row["hazardous"]
+        } for row in rows]
+        return {"neos": neos, "source": "Local NEO catalog (NASA API unavailable)"}
+
+    metrics.count_fallback("nasa-asteroids", "sample_data")
+    return {"neos": SAMPLE_NEOS, "source": "Sample Data (API Unavailable)"}
 
 @app.post("/simulate-impact-nasa")
 def simulate_impact_nasa(asteroid: NasaAsteroid):
     """
     Simulate impact using NASA asteroid data
     """
+    return memoized_response("simulate-impact-nasa", asteroid, compute_impact_nasa)
+
+def compute_impact_nasa(asteroid: NasaAsteroid):
     try:
-        # Use the run_simulation function from calculations
-        result = run_simulation(
+        columns = simulate_columns(
             diameter=asteroid.diameter,
             velocity=asteroid.velocity,
             density=3000,
+            angle=asteroid.angle,
             lat=0,
-            lon=0
+            lon=0,
+            model=asteroid.model
         )
 
         return {
             "source": "NASA",
             "asteroid": asteroid.dict(),
-            "simulation": result
+            "simulation": next(iter_batch_rows(columns))
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid simulation request: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"NASA simulation error: {str(e)}")
 
+async def fetch_neo_record(asteroid_id: str) -> dict:
+    """NeoWs /neo/{id} record, served from the local catalog when it has one"""
+    if catalog is not None:
+        with metrics.span("catalog_lookup"):
+            data = await asyncio.to_thread(catalog.get_lookup, asteroid_id)
+        if data is not None:
+            return data
+
+    data = await nasa.neo(asteroid_id, timeout=15)
+    if catalog is not None:
+        await asyncio.to_thread(catalog.store_lookup, data)
+    return data
+
+def parse_date_range(start_date: Optional[str], end_date: Optional[str]):
+    start = date.fromisoformat(start_date) if start_date else datetime.utcnow().date()
+    end = date.fromisoformat(end_date) if end_date else start + timedelta(days=1)
+    check_feed_range(start, end)
+    return start, end
+
+def iter_feed_records(data: dict, hazardous: Optional[bool] = None, min_diameter_m: Optional[float] = None,
+                      max_miss_distance_km: Optional[float] = None):
+    """Parse and filter /feed objects lazily, in approach-date order"""
+    neo_by_date = data.get("near_earth_objects", {})
+    # Objects are grouped by approach date, so walking the dates in order sorts the feed
+    for date_str in sorted(neo_by_date):
+        for o in neo_by_date[date_str]:
+            n = parse_feed_object(o)
+            if hazardous is not None and n["hazardous"] != hazardous:
+                continue
+            if min_diameter_m is not None and (n["diameter_max_m"] or 0) < min_diameter_m:
+                continue
+            if max_miss_distance_km is not None and (n["miss_distance_km"] is None or n["miss_distance_km"] > max_miss_distance_km):
+                continue
+            yield n
+
 @app.get("/nasa-neo-feed")
-def nasa_neo_feed(start_date: str = None, end_date: str = None):
+async def nasa_neo_feed(request: Request, start_date: str = None, end_date: str = None,
+                        hazardous: Optional[bool] = None, min_diameter_m: Optional[float] = None,
+                        max_miss_distance_km: Optional[float] = None, format: Optional[str] = None):
     """
-    Alternative NASA feed endpoint with date range
+    Alternative NASA feed endpoint with date range of any length.
+    The range is split into 7-day shards fetched concurrently; with the local catalog
+    enabled only shards not stored yet are fetched.
+    format=ndjson / json-stream emits each shard as soon as it and the earlier ones are in.
     """
-    if not start_date:
-        start = datetime.utcnow().date()
-        start_date = start.isoformat()
-    if not end_date:
-        end = datetime.utcnow().date() + timedelta(days=1)
-        end_date = end.isoformat()
+    try:
+        start, end = parse_date_range(start_date, end_date)
+        fmt = stream_format(request, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid request: {str(e)}")
+    start_date, end_date = start.isoformat(), end.isoformat()
+    header = {"start_date": start_date, "end_date": end_date}
+
+    filters = (hazardous, min_diameter_m, max_miss_distance_km)
+
+    if not fmt:
+        try:
+            neos = await collect_feed(start, end, filters)
+            return {
+                "start_date": start_date,
+                "end_date": end_date,
+                "count": len(neos),
+                "neos": neos
+            }
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"NASA feed fetch failed: {str(e)}")
+
+    if catalog is not None:
+        async def catalog_records():
+            async for shard_start, shard_end in iter_synced_shards(catalog, nasa, start, end):
+                rows = await asyncio.to_thread(
+                    catalog.query_feed, shard_start.isoformat(), shard_end.isoformat(), *filters
+                )
+                for row in rows:
+                    yield row
+        return streaming_response(fmt, catalog_records(), header, key="neos")
+
+    # No catalog: fetch 7-day shards concurrently, each shard already in date order
+    async def upstream_records():
+        async for _, _, data in nasa.iter_feed_range(start, end):
+            for record in iter_feed_records(data, *filters):
+                yield record
+    return streaming_response(fmt, upstream_records(), header, key="neos")
 
+async def collect_feed(start: date, end: date, filters: tuple) -> list:
+    """Filtered feed rows for a date range in approach-date order, via the catalog when enabled"""
+    if catalog is not None:
+        await sync_range(catalog, nasa, start, end)
+        return await asyncio.to_thread(catalog.query_feed, start.isoformat(), end.isoformat(), *filters)
+
+    shard_records = [
+        list(iter_feed_records(data, *filters))
+        async for _, _, data in nasa.iter_feed_range(start, end)
+    ]
+    # k-way merge of the sorted shards instead of a global sort
+    return list(heapq.merge(
+        *shard_records, key=lambda x: (x["close_approach_date"] or "9999-12-31")
+    ))
+
+@app.get("/nasa-neo-feed/entry")
+async def nasa_neo_feed_entry(start_date: str = None, end_date: str = None, density: float = 3000.0,
+                              angle: float = DEFAULT_ANGLE, hazardous: Optional[bool] = None,
+                              min_diameter_m: Optional[float] = None):
+    """
+    Atmospheric entry of every feed object as if it struck Earth: which would burst in the air,
+    where, and which would reach the ground. All objects are integrated together in one batch.
+    """
     try:
-        url = f"{NASA_NEO_BASE}/feed"
-        params = {
-            'start_date': start_date,
-            'end_date': end_date,
-            'api_key': NASA_API_KEY
-        }
-        
-        response = requests.get(url, params=params, timeout=15)
-        response.raise_for_status()
-        data = response.json()
+        start, end = parse_date_range(start_date, end_date)
+        if not 0 < angle <= 90:
+            raise ValueError("angle must be in (0, 90] degrees from horizontal")
+        if not density > 0:
+            raise ValueError("density must be positive")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid request: {str(e)}")
 
-        # Parse and format NEO data
-        neos = []
-        neo_by_date = data.get("near_earth_objects", {})
-        for date_str, objs in neo_by_date.items():
-            for o in objs:
-                cad = o.get("close_approach_data", [])
-                cad0 = cad[0] if len(cad) > 0 else None
-                diameter_max = o.get("estimated_diameter", {}).get("meters", {}).get("estimated_diameter_max")
-                diameter_min = o.get("estimated_diameter", {}).get("meters", {}).get("estimated_diameter_min")
-                
-                neos.append({
-                    "id": o.get("id"),
-                    "name": o.get("name"),
-                    "nasa_jpl_url": o.get("nasa_jpl_url"),
-                    "diameter_min_m": diameter_min,
-                    "diameter_max_m": diameter_max,
-                    "close_approach_date": cad0.get("close_approach_date") if cad0 else None,
-                    "relative_velocity_km_s": float(cad0["relative_velocity"]["kilometers_per_second"]) if cad0 and "relative_velocity" in cad0 else None,
-                    "miss_distance_km": float(cad0["miss_distance"]["kilometers"]) if cad0 and "miss_distance" in cad0 else None,
-                    "hazardous": o.get("is_potentially_hazardous_asteroid", False)
-                })
-        
-        # Sort by approach date
-        neos_sorted = sorted(neos, key=lambda x: (x["close_approach_date"] or "9999-12-31"))
+    try:
+        neos = await collect_feed(start, end, (hazardous, min_diameter_m, None))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"NASA feed fetch failed: {str(e)}")
+
+    # Log-midpoint of the estimated size range; approach speed plus Earth's pull at entry
+    usable = [n for n in neos if (n["diameter_min_m"] or n["diameter_max_m"]) and n["relative_velocity_km_s"]]
+    diameter = [math.sqrt((n["diameter_min_m"] or n["diameter_max_m"]) * (n["diameter_max_m"] or n["diameter_min_m"]))
+                for n in usable]
+    velocity = [math.hypot(n["relative_velocity_km_s"], EARTH_ESCAPE_SPEED) for n in usable]
+
+    try:
+        columns = await asyncio.to_thread(
+            run_batch_simulation, diameter, velocity, density, None, None, angle, "entry"
+        )
+        results = [
+            {
+                "id": n["id"],
+                "name": n["name"],
+                "close_approach_date": n["close_approach_date"],
+                "diameter_m": d,
+                "entry_velocity_km_s": v,
+                "energy_megatons": summary["energy_megatons"],
+                "airburst": summary["burst_altitude_km"] is not None,
+                "breakup_altitude_km": summary["breakup_altitude_km"],
+                "burst_altitude_km": summary["burst_altitude_km"],
+                "peak_deposition_altitude_km": summary["peak_deposition_altitude_km"],
+                "atmospheric_energy_megatons": summary["atmospheric_energy_megatons"],
+                "surface_velocity_ms": summary["surface_velocity_ms"],
+                "crater_diameter_km": summary["crater_diameter_km"],
+                "shockwave_radius_km": summary["impact_zones"]["shockwave_radius"],
+            }
+            for n, d, v, summary in zip(usable, diameter, velocity, iter_impact_summaries(columns))
+        ]
         return {
-            "start_date": start_date,
-            "end_date": end_date, 
-            "count": len(neos_sorted),
-            "neos": neos_sorted
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+            "density_kgm3": density,
+            "angle_deg": angle,
+            "count": len(results),
+            "skipped": len(neos) - len(usable),
+            "results": results
         }
-        
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"NASA feed fetch failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Entry simulation failed: {str(e)}")
+
+@app.post("/catalog/sync")
+async def catalog_sync(start_date: str = None, end_date: str = None):
+    """
+    Incremental catalog sync - fetches only the date windows not stored yet
+    """
+    if catalog is None:
+        raise HTTPException(status_code=404, detail="Local NEO catalog is disabled")
+    try:
+        start, end = parse_date_range(start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date range: {str(e)}")
+
+    try:
+        result = await sync_range(catalog, nasa, start, end)
+        return {"start_date": start.isoformat(), "end_date": end.isoformat(), **result}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Catalog sync failed: {str(e)}")
+
+@app.get("/catalog/stats")
+async def catalog_stats():
+    if catalog is None:
+        raise HTTPException(status_code=404, detail="Local NEO catalog is disabled")
+    return await asyncio.to_thread(catalog.stats)
+
+# --- Global risk heatmaps ---
+@app.post("/heatmaps")
+def create_heatmap(req: HeatmapRequest):
+    """
+    Global risk heatmap on a lat/lon grid, stored as tiles the map fetches one by one.
+    Identical requests return the stored heatmap.
+    """
+    if not 16 <= req.tile_size <= 2048:
+        raise HTTPException(status_code=400, detail="tile_size must be between 16 and 2048")
+
+    key = heatmap_key(req)
+    meta = heatmap_store.meta(key)
+    if meta is not None:
+        return meta
+
+    try:
+        return render_heatmap(req, key)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid heatmap request: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Heatmap generation error: {str(e)}")
+
+def heatmap_key(req: HeatmapRequest) -> str:
+    params = req.dict()
+    if req.metric == "exposure" and population is not None:
+        params["population"] = population.stats()
+    return heatmap_id(params)
+
+def render_heatmap(req: HeatmapRequest, key: str) -> dict:
+    """Build a heatmap and store its tiles, returning the stored meta"""
+    values = build_heatmap(
+        req.metric,
+        req.zone,
+        req.resolution,
+        impactors=[i.dict() for i in req.impactors],
+        scenarios=[s.dict() for s in req.scenarios],
+        population=population,
+        model=req.model
+    )
+    return heatmap_store.save(
+        key, values, {"metric": req.metric, "zone": req.zone, "resolution": req.resolution}, req.tile_size
+    )
+
+@app.get("/heatmaps/{heatmap_id}")
+def get_heatmap(heatmap_id: str):
+    """Grid size, tile layout and the list of non-empty tiles"""
+    meta = heatmap_store.meta(heatmap_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Heatmap not found")
+    return meta
+
+@app.get("/heatmaps/{heatmap_id}/tiles/{ty}/{tx}")
+def get_heatmap_tile(heatmap_id: str, ty: int, tx: int):
+    """
+    One tile as little-endian float32, row-major, north-west origin; shape in X-Tile-Shape.
+    Sent deflate-encoded; empty tiles are 204.
+    """
+    meta = heatmap_store.meta(heatmap_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="Heatmap not found")
+    try:
+        body, shape = heatmap_store.tile(meta, ty, tx)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Tile out of range")
+
+    headers = {
+        "X-Tile-Shape": f"{shape[0]},{shape[1]}",
+        "X-Tile-Dtype": "float32",
+        "Cache-Control": "public, max-age=31536000, immutable",
+    }
+    if body is None:
+        return Response(status_code=204, headers=headers)
+    headers["Content-Encoding"] = "deflate"
+    return Response(body, media_type="application/octet-stream", headers=headers)
+
+# --- Background jobs ---
+def run_batch_job(job, batch: BatchImpactRequest):
+    """Batch job: JOB_CHUNK_ROWS scenarios at a time, appended to the job's result columns"""
+    inputs = {
+        name: np.array([getattr(s, name) for s in batch.scenarios], dtype=np.float64)
+        for name in BATCH_INPUT_COLUMNS
+    }
+    n = len(batch.scenarios)
+    json_columns = ("population_exposure",) if population is not None else ()
+    with job.column_writer(batch_output_columns(batch.model), json_columns) as writer:
+        for start in range(0, n, JOB_CHUNK_ROWS):
+            stop = min(start + JOB_CHUNK_ROWS, n)
+            columns = run_batch_simulation(
+                *(inputs[name][start:stop] for name in BATCH_INPUT_COLUMNS), model=batch.model
+            )
+            if population is not None:
+                columns.update(population.exposure_columns(columns))
+            writer.append(columns)
+            job.report(stop, n)
+
+@app.post("/jobs/batch", status_code=202)
+async def submit_batch_job(batch: BatchImpactRequest):
+    """
+    Batch simulation as a background job. Returns the job at once; its rows are fetched
+    in pages from /jobs/{id}/results when done. Identical submissions share one job.
+    """
+    try:
+        get_model(batch.model)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    params = batch.dict()
+    if population is not None:
+        params["population"] = population.stats()
+    return jobs.submit("batch", params, lambda job: run_batch_job(job, batch))
+
+@app.post("/jobs/monte-carlo", status_code=202)
+async def submit_monte_carlo_job(mc: MonteCarloRequest):
+    """
+    Monte Carlo sweep as a background job, progress reported per chunk. Chunks are seeded
+    by index, so a seeded job answers exactly what /simulate/monte-carlo does at any size.
+    """
+    try:
+        validate_monte_carlo(mc.samples, mc.chunk_size, mc.model, mc.percentiles)
+        distributions = resolve_distributions(
+            {"diameter": mc.diameter, "velocity": mc.velocity, "density": mc.density, "angle": mc.angle}
+        )
+    except (ValueError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid Monte Carlo request: {str(e)}")
+
+    return jobs.submit("monte_carlo", mc.dict(), lambda job: run_monte_carlo(
+        distributions, mc.samples, mc.seed, mc.chunk_size, mc.percentiles, mc.model, progress=job.report
+    ))
+
+@app.post("/jobs/heatmaps", status_code=202)
+async def submit_heatmap_job(req: HeatmapRequest):
+    """Heatmap as a background job; the result is the stored heatmap's meta"""
+    if not 16 <= req.tile_size <= 2048:
+        raise HTTPException(status_code=400, detail="tile_size must be between 16 and 2048")
+
+    key = heatmap_key(req)
+    return jobs.submit("heatmap", {"heatmap_id": key}, lambda job: heatmap_store.meta(key) or render_heatmap(req, key))
+
+@app.post("/jobs/catalog-ranking", status_code=202)
+async def submit_catalog_ranking_job(req: CatalogRankingRequest):
+    """
+    Rank every NEO in the NeoWs catalog by expected damage weighted by approach distance,
+    keeping the top k. Resubmitting after a failure or cancel resumes from its checkpoint;
+    a finished ranking is returned until it expires, or re-run with refresh once NeoWs has
+    new objects.
+    """
+    try:
+        if not 1 <= req.k <= MAX_TOP_K:
+            raise ValueError(f"k must be between 1 and {MAX_TOP_K}")
+        if not 0 < req.angle <= 90:
+            raise ValueError("angle must be in (0, 90] degrees from horizontal")
+        if not req.density > 0:
+            raise ValueError("density must be positive")
+        get_model(req.model)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid ranking request: {str(e)}")
+
+    params = req.dict(exclude={"refresh"})
+    checkpoint = os.path.join(jobs.store.root, "checkpoints", f"{job_id('catalog_ranking', params)}.json")
+
+    async def run(job):
+        result = await rank_catalog(
+            nasa, req.k, req.density, req.angle, req.model, checkpoint_path=checkpoint, progress=job.report
+        )
+        # Only an unfinished run is resumed; the next one walks the catalog from the start
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        return result
+    return jobs.submit("catalog_ranking", params, run, force=req.refresh)
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Status and progress (0-1) of a job"""
+    state = jobs.get(job_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return state
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    """Cancel a queued or running job; finished jobs are left as they are"""
+    state = jobs.cancel(job_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return state
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-sent events: the job's state on every change, ending once it has finished"""
+    if jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        async for state in jobs.events(job_id):
+            yield f"event: {state['status']}\ndata: {json.dumps(state)}\n\n"
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/jobs/{job_id}/results")
+def get_job_results(job_id: str, request: Request, offset: int = 0, limit: int = 1000, format: Optional[str] = None):
+    """
+    Result of a finished job. Batch jobs are paged: rows [offset, offset + limit), read
+    from the stored columns, with next_offset null on the last page; pages come as
+    columns with format=columns / msgpack / arrow (or the matching Accept header).
+    """
+    try:
+        compact = columnar_format(request, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    state = jobs.get(job_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if state["status"] != DONE:
+        raise HTTPException(status_code=409, detail=f"Job is {state['status']}")
+    if state["rows"] is None:
+        return jobs.store.read_result(job_id)
+    if offset < 0 or not 1 <= limit <= JOB_PAGE_LIMIT:
+        raise HTTPException(status_code=400, detail=f"offset must be >= 0 and limit between 1 and {JOB_PAGE_LIMIT}")
+
+    try:
+        columns = jobs.store.read_columns(state, offset, limit)
+        count = len(columns[state["float_columns"][0]])
+        end = offset + count
+        page = {
+            "id": job_id,
+            "total": state["rows"],
+            "offset": offset,
+            "count": count,
+            "next_offset": end if end < state["rows"] else None,
+        }
+        if compact:
+            return columnar_response(compact, page, columns, state["float_columns"])
+        columns.update(label_columns(columns))
+        page["results"] = batch_to_rows(columns)
+        return page
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Job result read error: {str(e)}")
 
 @app.get("/simulate-impact-nasa/{asteroid_id}")
-def simulate_impact_nasa_by_id(asteroid_id: str, density: float = 3000.0, angle: float = 45.0):
+async def simulate_impact_nasa_by_id(asteroid_id: str, density: float = 3000.0, angle: float = DEFAULT_ANGLE,
+                                     model: str = DEFAULT_MODEL):
     """
     Fetch asteroid by NASA ID and run simulation
     """
     try:
-        url = f"{NASA_NEO_BASE}/neo/{asteroid_id}"
-        params = {'api_key': NASA_API_KEY}
-        
-        response = requests.get(url, params=params, timeout=15)
-        response.raise_for_status()
-        data = response.json()
+        get_model(model)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        data = await fetch_neo_record(asteroid_id)
 
         # Extract diameter
         diameters = data.get("estimated_diameter", {}).get("meters", {})
@@ -415,42 +1228,7 @@ def simulate_impact_nasa_by_id(asteroid_id: str, density: float = 3000.0, angle:
         except Exception:
             velocity_km_s = 20.0  # Default fallback
 
-        # Run simulation using ImpactCalculator
-        velocity_ms = velocity_km_s * 1000.0
-        
-        kinetic_energy = ImpactCalculator.calculate_kinetic_energy(diameter_m, velocity_ms, density)
-        crater = ImpactCalculator.calculate_crater_size(kinetic_energy)
-        magnitude = ImpactCalculator.calculate_seismic_magnitude(kinetic_energy)
-        comparisons = ImpactCalculator.energy_comparisons(kinetic_energy)
-        impact_zones = ImpactCalculator.calculate_impact_zones(
-            crater['radius'] / 1000,
-            kinetic_energy / (4.184e15)
-        )
-
-        # Impact classification
-        if diameter_m < 25:
-            impact_type = "airburst / local"
-        elif diameter_m < 100:
-            impact_type = "regional"
-        elif diameter_m < 1000:
-            impact_type = "continental"
-        else:
-            impact_type = "global"
-
-        result = {
-            "diameter_m": diameter_m,
-            "density_kgm3": density,
-            "velocity_ms": velocity_ms,
-            "mass_kg": (4.0/3.0) * math.pi * ((diameter_m/2.0)**3) * density,
-            "energy_joules": kinetic_energy,
-            "energy_megatons": kinetic_energy / (4.184e15),
-            "crater_diameter_km": crater['diameter'] / 1000,
-            "crater_radius_km": crater['radius'] / 1000,
-            "seismic_magnitude": magnitude,
-            "impact_type": impact_type,
-            "comparisons": comparisons,
-            "impact_zones": impact_zones
-        }
+        result = impact_summary(simulate_columns(diameter_m, velocity_km_s, density, angle, model=model))
 
         return {
             "asteroid": {
@@ -463,64 +1241,82 @@ def simulate_impact_nasa_by_id(asteroid_id: str, density: float = 3000.0, angle:
                 "velocity_km_s_used": velocity_km_s
             },
             "simulation": result,
+            "model": model,
             "source": "ImpactCalculator"
         }
-        
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid simulation request: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"NASA asteroid simulation failed: {str(e)}")
 
+@app.get("/simulate-impact-nasa/{asteroid_id}/monte-carlo")
+async def simulate_impact_nasa_monte_carlo(asteroid_id: str, samples: int = 100_000, seed: Optional[int] = None,
+                                           model: str = DEFAULT_MODEL):
+    """
+    Fetch asteroid by NASA ID and sweep its estimated diameter range instead of taking the max
+    """
+    if samples < 1 or samples > MAX_SAMPLES:
+        raise HTTPException(status_code=400, detail=f"samples must be between 1 and {MAX_SAMPLES}")
+
+    try:
+        data = await fetch_neo_record(asteroid_id)
+
+        diameters = data.get("estimated_diameter", {}).get("meters", {})
+        diameter_max = diameters.get("estimated_diameter_max")
+        diameter_min = diameters.get("estimated_diameter_min")
+        if not diameter_max and not diameter_min:
+            raise ValueError("No diameter available in NASA record")
+
+        cad = data.get("close_approach_data", [])
+        try:
+            velocity_km_s = float(cad[0]["relative_velocity"]["kilometers_per_second"])
+        except Exception:
+            velocity_km_s = 20.0  # Default fallback
+
+        result = await monte_carlo(
+            nasa_distributions(diameter_min, diameter_max, velocity_km_s),
+            samples=samples,
+            seed=seed,
+            model=model
+        )
+
+        return {
+            "asteroid": {
+                "id": data.get("id"),
+                "name": data.get("name"),
+                "diameter_min_m": diameter_min,
+                "diameter_max_m": diameter_max,
+                "velocity_km_s_used": velocity_km_s
+            },
+            "monte_carlo": result,
+            "source": "ImpactCalculator"
+        }
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"NASA Monte Carlo simulation failed: {str(e)}")
+
 @app.post("/simulate-impact")
 def simulate_impact_manual(inp: ManualImpactInput):
     """
     Alternative simulation endpoint with angle parameter
     """
+    return memoized_response("simulate-impact", inp, compute_impact_manual)
+
+def compute_impact_manual(inp: ManualImpactInput):
     try:
-        velocity_ms = inp.velocity * 1000
-        
-        kinetic_energy = ImpactCalculator.calculate_kinetic_energy(
-            inp.diameter, velocity_ms, inp.density
-        )
-        
-        crater = ImpactCalculator.calculate_crater_size(kinetic_energy)
-        magnitude = ImpactCalculator.calculate_seismic_magnitude(kinetic_energy)
-        comparisons = ImpactCalculator.energy_comparisons(kinetic_energy)
-        impact_zones = ImpactCalculator.calculate_impact_zones(
-            crater['radius'] / 1000,
-            kinetic_energy / (4.184e15)
-        )
+        columns = simulate_columns(inp.diameter, inp.velocity, inp.density, inp.angle, model=inp.model)
+        result = impact_summary(columns)
+        result["notes"] = f"Using the {inp.model} model"
 
-        # Impact classification
-        if inp.diameter < 25:
-            impact_type = "airburst / local"
-        elif inp.diameter < 100:
-            impact_type = "regional"
-        elif inp.diameter < 1000:
-            impact_type = "continental"
-        else:
-            impact_type = "global"
-
-        result = {
-            "diameter_m": inp.diameter,
-            "density_kgm3": inp.density,
-            "velocity_ms": velocity_ms,
-            "mass_kg": (4.0/3.0) * math.pi * ((inp.diameter/2.0)**3) * inp.density,
-            "energy_joules": kinetic_energy,
-            "energy_megatons": kinetic_energy / (4.184e15),
-            "crater_diameter_km": crater['diameter'] / 1000,
-            "crater_radius_km": crater['radius'] / 1000,
-            "seismic_magnitude": magnitude,
-            "impact_type": impact_type,
-            "comparisons": comparisons,
-            "impact_zones": impact_zones,
-            "notes": "Using ImpactCalculator model"
-        }
-        
         return {"input": inp.dict(), "result": result, "source": "ImpactCalculator"}
-        
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid simulation request: {str(e)}")
     except Exception as e:
-        # Fallback to basic simulation
-        result = simulate_impact_basic(inp.diameter, inp.velocity * 1000, inp.density, inp.angle)
-        return {"input": inp.dict(), "result": result, "source": "basic_model_fallback"}
+        raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
 
 if __name__ == "__main__":
     import uvicorn
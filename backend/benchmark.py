@@ -0,0 +1,378 @@
+# backend/benchmark.py
+"""
+Performance baseline for the calculator and the API hot paths.
+
+    python benchmark.py                      # full run, JSON to stdout
+    python benchmark.py --quick -o bench.json
+    python benchmark.py --sections micro,api --compare old.json -o new.json
+
+Sections:
+  micro    ImpactCalculator methods on scalars and arrays (ns per call / per element)
+  api      /simulate, /simulate-impact, /simulate-impact-nasa through an in-process
+           ASGI client, NASA replaced by the local stub (p50/p99 latency, requests/s)
+  scaling  batch-size and worker-count curves for the batch and Monte Carlo paths
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from simulation.calculations import (
+    ImpactCalculator, run_batch_simulation, run_simulation, seismic_magnitude_batch, severity_columns,
+)
+from simulation.models import MODELS
+
+SECTIONS = ("micro", "api", "scaling")
+ARRAY_SIZES = (1_000, 100_000)
+BATCH_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+API_REQUESTS = 2_000
+API_CONCURRENCY = 16
+
+# Metrics where a larger number is better; everything else is a time
+HIGHER_IS_BETTER = ("requests_per_s", "rows_per_s", "samples_per_s", "speedup")
+
+
+def time_call(fn, min_time: float = 0.2, repeat: int = 5) -> dict:
+    """
+    Calibrate a loop count so one run takes about min_time/repeat seconds, then time
+    `repeat` runs. Returns best and median seconds per call.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / repeat or number >= 1 << 24:
+            break
+        number *= 2 if elapsed <= 0 else max(2, min(10, int(min_time / repeat / elapsed) + 1))
+
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        runs.append((time.perf_counter() - start) / number)
+    return {"best_s": min(runs), "median_s": statistics.median(runs), "loops": number}
+
+
+def percentile(values: list, q: float) -> float:
+    return float(np.percentile(np.asarray(values), q))
+
+
+# --- Micro-benchmarks ---
+
+def bench_micro(quick: bool = False) -> list:
+    """Every ImpactCalculator method on a scalar, plus the vectorized paths on arrays"""
+    min_time = 0.05 if quick else 0.2
+    d, v, rho = 120.0, 19_000.0, 3000.0
+    energy = ImpactCalculator.calculate_kinetic_energy(d, v, rho)
+    crater_km = ImpactCalculator.calculate_crater_size(energy)['radius'] / 1000
+
+    scalar = {
+        "calculate_kinetic_energy": lambda: ImpactCalculator.calculate_kinetic_energy(d, v, rho),
+        "calculate_crater_size": lambda: ImpactCalculator.calculate_crater_size(energy),
+        "calculate_seismic_magnitude": lambda: ImpactCalculator.calculate_seismic_magnitude(energy),
+        "energy_comparisons": lambda: ImpactCalculator.energy_comparisons(energy),
+        "calculate_impact_zones": lambda: ImpactCalculator.calculate_impact_zones(crater_km, energy / 4.184e15),
+        "run_simulation": lambda: run_simulation(d, v / 1000, rho, 0.0, 0.0),
+    }
+    results = []
+    for name, fn in scalar.items():
+        t = time_call(fn, min_time)
+        results.append({"name": name, "input": "scalar", "size": 1,
+                        "ns_per_call": t["best_s"] * 1e9, "median_ns_per_call": t["median_s"] * 1e9})
+
+    rng = np.random.default_rng(0)
+    for size in ARRAY_SIZES[:1] if quick else ARRAY_SIZES:
+        diameters = 10 ** rng.uniform(0, 4, size)
+        velocities = rng.uniform(11_000, 72_000, size)
+        energies = ImpactCalculator.calculate_kinetic_energy(diameters, velocities, rho)
+        radii_km = ImpactCalculator.calculate_crater_size(energies)['radius'] / 1000
+        # The seismic and comparison methods branch on scalars; their batch
+        # counterparts are what the array paths actually run
+        vectorized = {
+            "calculate_kinetic_energy": lambda: ImpactCalculator.calculate_kinetic_energy(diameters, velocities, rho),
+            "calculate_crater_size": lambda: ImpactCalculator.calculate_crater_size(energies),
+            "seismic_magnitude_batch": lambda: seismic_magnitude_batch(energies),
+            "severity_columns": lambda: severity_columns(energies / 6.3e13),
+            "calculate_impact_zones": lambda: ImpactCalculator.calculate_impact_zones(radii_km, energies / 4.184e15),
+            "run_batch_simulation": lambda: run_batch_simulation(diameters, velocities / 1000, rho),
+        }
+        # Each model's kernel on its own, to price the fidelity a request asks for; the
+        # numerical entry integrator only at the smallest size, it runs hundreds of steps
+        angles = rng.uniform(15, 90, size)
+        for model in MODELS.values():
+            if model.name == "entry" and size > ARRAY_SIZES[0]:
+                continue
+            vectorized[f"kernel:{model.name}"] = (
+                lambda model=model: model.evaluate(diameters, velocities, rho, angles)
+            )
+        for name, fn in vectorized.items():
+            t = time_call(fn, min_time)
+            results.append({"name": name, "input": "array", "size": size,
+                            "ns_per_element": t["best_s"] * 1e9 / size,
+                            "median_ns_per_element": t["median_s"] * 1e9 / size})
+    return results
+
+
+# --- End-to-end API runs ---
+
+def api_cases(neo_ids: list) -> list:
+    """
+    (name, method, path or path factory, json body, NASA cache on) for each benchmarked
+    endpoint. The NASA lookup runs twice: answered from the response cache, and with every
+    request fetched from the stub.
+    """
+    lookup = lambda i: f"/simulate-impact-nasa/{neo_ids[i % len(neo_ids)]}"
+    return [
+        ("POST /simulate", "POST", "/simulate",
+         {"diameter": 120, "velocity": 19, "density": 3000, "lat": 40.7, "lon": -74.0}, True),
+        ("POST /simulate-impact", "POST", "/simulate-impact",
+         {"diameter": 120, "velocity": 19, "density": 3000, "angle": 45}, True),
+        ("POST /simulate-impact-nasa", "POST", "/simulate-impact-nasa",
+         {"id": "2000433", "name": "433 Eros (A898 PA)", "diameter": 120, "velocity": 19,
+          "miss_distance": 1e7, "date": "2025-01-01"}, True),
+        ("GET /simulate-impact-nasa/{id} (cached)", "GET", lookup, None, True),
+        ("GET /simulate-impact-nasa/{id} (fetch)", "GET", lookup, None, False),
+    ]
+
+
+async def drive(client, method: str, path, body, requests: int, concurrency: int) -> dict:
+    """Fire `requests` calls with `concurrency` in flight; per-request latency and throughput"""
+    latencies = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            url = path(i) if callable(path) else path
+            start = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "requests_per_s": requests / wall,
+        "p50_ms": percentile(latencies, 50) * 1e3,
+        "p99_ms": percentile(latencies, 99) * 1e3,
+        "mean_ms": statistics.fmean(latencies) * 1e3,
+    }
+
+
+async def run_api(requests: int, concurrency: int, memo: bool, stub_delay: float) -> list:
+    import httpx
+
+    import app as api
+    from nasa_client import NeoWsClient
+    from nasa_stub import NeoWsStub, neo_id_for
+
+    saved = api.nasa, api.catalog, api.response_memo.max_entries
+    results = []
+    with NeoWsStub(delay=stub_delay) as stub:
+        clients = {
+            True: NeoWsClient(stub.base_url, "BENCH_KEY", cache=api.nasa_cache, rate_limit=0),
+            False: NeoWsClient(stub.base_url, "BENCH_KEY", rate_limit=0),
+        }
+        api.catalog = None
+        api.response_memo.max_entries = saved[2] if memo else 0
+        neo_ids = [neo_id_for(datetime(2025, 1, 1).date(), i) for i in range(12)]
+        transport = httpx.ASGITransport(app=api.app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                for name, method, path, body, nasa_cache in api_cases(neo_ids):
+                    api.nasa = clients[nasa_cache]
+                    api.nasa_cache.clear()
+                    api.response_memo.clear()
+                    await drive(client, method, path, body, min(50, requests), concurrency)   # warm-up
+                    stats = await drive(client, method, path, body, requests, concurrency)
+                    results.append({"name": name, "memo": memo, **stats})
+        finally:
+            for client in clients.values():
+                await client.aclose()
+            api.nasa, api.catalog, api.response_memo.max_entries = saved
+    return results
+
+
+# --- Scaling curves ---
+
+async def run_scaling(quick: bool) -> dict:
+    from simulation.monte_carlo import run_monte_carlo
+    from simulation.parallel import SIM_WORKERS, parallel_batch_simulation, parallel_monte_carlo, shutdown_executor
+
+    rng = np.random.default_rng(0)
+    min_time = 0.05 if quick else 0.2
+    batch_sizes = BATCH_SIZES[:3] if quick else BATCH_SIZES
+
+    batch = []
+    for size in batch_sizes:
+        diameters = 10 ** rng.uniform(0, 4, size)
+        velocities = rng.uniform(11, 72, size)
+        t = time_call(lambda: run_batch_simulation(diameters, velocities, 3000.0), min_time, repeat=3)
+        batch.append({"rows": size, "seconds": t["best_s"], "rows_per_s": size / t["best_s"]})
+
+    worker_counts = sorted({1, 2, 4, 8, SIM_WORKERS} & set(range(1, SIM_WORKERS + 1)))
+    rows = batch_sizes[-1]
+    samples = 200_000 if quick else 2_000_000
+    diameters = 10 ** rng.uniform(0, 4, rows)
+    velocities = rng.uniform(11, 72, rows)
+    distributions = {"diameter": {"dist": "loguniform", "low": 10, "high": 1000}}
+
+    workers = []
+    try:
+        await parallel_batch_simulation(diameters[:1000], velocities[:1000], 3000.0)   # start the pool
+        start = time.perf_counter()
+        run_monte_carlo(distributions, samples, seed=0)
+        inline_mc = time.perf_counter() - start
+        inline_batch = min(entry["seconds"] for entry in batch if entry["rows"] == rows)
+
+        for count in worker_counts:
+            start = time.perf_counter()
+            await parallel_batch_simulation(diameters, velocities, 3000.0, workers=count)
+            batch_s = time.perf_counter() - start
+            start = time.perf_counter()
+            await parallel_monte_carlo(distributions, samples, seed=0, workers=count)
+            mc_s = time.perf_counter() - start
+            workers.append({
+                "workers": count,
+                "batch_rows": rows,
+                "batch_seconds": batch_s,
+                "rows_per_s": rows / batch_s,
+                "batch_speedup": inline_batch / batch_s,
+                "monte_carlo_samples": samples,
+                "monte_carlo_seconds": mc_s,
+                "samples_per_s": samples / mc_s,
+                "monte_carlo_speedup": inline_mc / mc_s,
+            })
+    finally:
+        shutdown_executor()
+
+    return {"batch_size": batch, "workers": workers, "pool_size": SIM_WORKERS}
+
+
+# --- Report ---
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def flatten(report: dict) -> dict:
+    """Metric path -> value, with list entries keyed by their identifying fields"""
+    flat = {}
+    ids = ("name", "input", "size", "memo", "rows", "workers")
+
+    def walk(prefix, value):
+        if isinstance(value, dict):
+            for k, v in value.items():
+                walk(f"{prefix}.{k}" if prefix else k, v)
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict):
+                    label = ",".join(f"{k}={item[k]}" for k in ids if k in item)
+                    walk(f"{prefix}[{label}]", {k: v for k, v in item.items() if k not in ids})
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix] = value
+
+    walk("", {k: v for k, v in report.items() if k in SECTIONS})
+    return flat
+
+
+def compare(old: dict, new: dict, threshold: float = 0.1) -> list:
+    """Metrics that got worse by more than `threshold` (relative) between two reports"""
+    old_flat, new_flat = flatten(old), flatten(new)
+    regressions = []
+    for key, value in new_flat.items():
+        before = old_flat.get(key)
+        if not before or key.endswith((".loops", ".requests", ".concurrency", ".errors", "_samples", "_rows")):
+            continue
+        change = (value - before) / before
+        worse = -change if key.rsplit(".", 1)[-1].startswith(HIGHER_IS_BETTER) else change
+        if worse > threshold:
+            regressions.append({"metric": key, "before": before, "after": value, "change": change})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", default=",".join(SECTIONS), help="comma-separated subset of " + ", ".join(SECTIONS))
+    parser.add_argument("--quick", action="store_true", help="smaller sizes and shorter timings")
+    parser.add_argument("--requests", type=int, default=None, help=f"requests per endpoint (default {API_REQUESTS})")
+    parser.add_argument("--concurrency", type=int, default=API_CONCURRENCY)
+    parser.add_argument("--memo", action="store_true", help="keep the response memo on during API runs")
+    parser.add_argument("--stub-delay", type=float, default=0.0, help="simulated NASA latency in seconds")
+    parser.add_argument("-o", "--output", help="write JSON here instead of stdout")
+    parser.add_argument("--compare", help="earlier JSON report; regressions over --threshold are listed")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    sections = [s.strip() for s in args.sections.split(",") if s.strip()]
+    unknown = set(sections) - set(SECTIONS)
+    if unknown:
+        parser.error(f"unknown sections: {', '.join(sorted(unknown))}")
+
+    report = {"environment": environment(), "quick": args.quick}
+    # The app opens its catalog and result store at import: keep them out of the source tree
+    data_dir = tempfile.mkdtemp(prefix="snap-dg-bench-")
+    os.environ["NEO_CATALOG_PATH"] = os.path.join(data_dir, "neo_catalog.sqlite3")
+    os.environ["RESULT_STORE_DIR"] = os.path.join(data_dir, "results")
+    try:
+        if "micro" in sections:
+            report["micro"] = bench_micro(args.quick)
+        if "api" in sections:
+            requests = args.requests or (200 if args.quick else API_REQUESTS)
+            report["api"] = asyncio.run(run_api(requests, args.concurrency, args.memo, args.stub_delay))
+        if "scaling" in sections:
+            report["scaling"] = asyncio.run(run_scaling(args.quick))
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            report["regressions"] = compare(json.load(f), report, args.threshold)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if report.get("regressions"):
+        for r in report["regressions"]:
+            print(f"regression: {r['metric']} {r['before']:.4g} -> {r['after']:.4g} ({r['change']:+.1%})",
+                  file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+# backend/cache.py
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    In-memory LRU cache with per-kind TTLs and a byte budget.
+    Concurrent misses on the same key share one fetch (single-flight).
+    Expired entries are kept for another `stale_ttl` seconds: get_or_fetch serves them
+    at once while one background fetch refreshes them (stale-while-revalidate).
+    Cached values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes: int, ttls: dict, default_ttl: float = 300.0, stale_ttl: float = 0.0):
+        self.max_bytes = max_bytes
+        self.ttls = dict(ttls)
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self._entries = OrderedDict()   # key -> (value, expires_at, size)
+        self._inflight = {}             # key -> asyncio.Future
+        self._refreshes = set()         # background refresh tasks, referenced until done
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_hits = 0
+        self.refresh_errors = 0
+
+    def ttl_for(self, kind: str) -> float:
+        return self.ttls.get(kind, self.default_ttl)
+
+    def _lookup(self, key):
+        """(value, fresh) for a cached key, (None, False) when absent or too stale to serve"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, False
+        value, expires_at, size = entry
+        now = time.monotonic()
+        if expires_at + self.stale_ttl <= now:
+            self._remove(key)
+            self.expirations += 1
+            return None, False
+        self._entries.move_to_end(key)
+        return value, expires_at > now
+
+    def get(self, key):
+        """Fresh cached value or None; refreshes the key's LRU position on a hit"""
+        value, fresh = self._lookup(key)
+        return value if fresh else None
+
+    def put(self, key, value, kind: str, size: int):
+        """Store a value of roughly `size` bytes, evicting least-recently-used entries as needed"""
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (value, time.monotonic() + self.ttl_for(kind), size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    async def get_or_fetch(self, key, kind: str, fetch):
+        """
+        Cached value for `key`, or the result of `await fetch()` which must return
+        (value, size_bytes). Only one fetch runs per key at a time.
+        """
+        value, fresh = self._lookup(key)
+        if fresh:
+            self.hits += 1
+            return value
+        if value is not None:
+            self.stale_hits += 1
+            if key not in self._inflight:
+                task = asyncio.create_task(self._refresh(key, kind, fetch, self._claim(key)))
+                self._refreshes.add(task)
+                task.add_done_callback(self._refreshes.discard)
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        return await self._fetch(key, kind, fetch, self._claim(key))
+
+    def _claim(self, key) -> asyncio.Future:
+        """Register the fetch of `key` as in flight, before any await can let another caller in"""
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        return future
+
+    async def _refresh(self, key, kind: str, fetch, future: asyncio.Future):
+        try:
+            await self._fetch(key, kind, fetch, future)
+        except Exception:
+            # The stale value keeps being served until it refreshes or ages out
+            self.refresh_errors += 1
+
+    async def _fetch(self, key, kind: str, fetch, future: asyncio.Future):
+        try:
+            value, size = await fetch()
+            self.put(key, value, kind, size)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an error nobody else awaited isn't logged as unhandled
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "stale_hits": self.stale_hits,
+            "refresh_errors": self.refresh_errors,
+            "hit_rate": (self.hits + self.coalesced + self.stale_hits) / (lookups + self.stale_hits)
+            if lookups + self.stale_hits else 0.0,
+        }
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self.bytes -= size
+
+
+def quantize(value, digits: int):
+    """Round floats to `digits` significant digits; other values pass through"""
+    if isinstance(value, float):
+        return float(f"{value:.{digits}g}")
+    return value
+
+
+class ResponseMemo:
+    """
+    Bounded LRU of already-serialized response bodies, keyed on endpoint plus
+    inputs quantized to a fixed number of significant digits
+    """
+
+    def __init__(self, max_entries: int, digits: int):
+        self.max_entries = max_entries
+        self.digits = digits
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()   # sync endpoints share it from the threadpool
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def quantize_inputs(self, inputs: dict) -> dict:
+        return {name: quantize(value, self.digits) for name, value in inputs.items()}
+
+    def key(self, endpoint: str, quantized: dict) -> tuple:
+        return (endpoint,) + tuple(sorted(quantized.items()))
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body: bytes):
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "digits": self.digits,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
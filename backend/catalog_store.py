@@ -0,0 +1,285 @@
+# backend/catalog_store.py
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+
+from nasa_client import FEED_WINDOW_DAYS, split_range
+
+# Location of the local catalog; set NEO_CATALOG_PATH="" to disable it
+NEO_CATALOG_PATH = os.getenv(
+    "NEO_CATALOG_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "neo_catalog.sqlite3")
+)
+# Dates from today onward are re-synced once their data is older than this (seconds)
+NEO_CATALOG_REFRESH = float(os.getenv("NEO_CATALOG_REFRESH", "21600"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    nasa_jpl_url TEXT,
+    diameter_min_m REAL,
+    diameter_max_m REAL,
+    hazardous INTEGER NOT NULL DEFAULT 0,
+    lookup_json TEXT              -- full /neo/{id} record once fetched
+);
+CREATE TABLE IF NOT EXISTS approaches (
+    neo_id TEXT NOT NULL REFERENCES objects(id),
+    close_approach_date TEXT NOT NULL,
+    relative_velocity_km_s REAL,
+    miss_distance_km REAL,
+    PRIMARY KEY (neo_id, close_approach_date)
+);
+CREATE TABLE IF NOT EXISTS synced_dates (
+    day TEXT PRIMARY KEY,
+    synced_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_approaches_date ON approaches(close_approach_date);
+CREATE INDEX IF NOT EXISTS idx_approaches_miss ON approaches(miss_distance_km);
+CREATE INDEX IF NOT EXISTS idx_objects_hazardous ON objects(hazardous);
+CREATE INDEX IF NOT EXISTS idx_objects_diameter ON objects(diameter_max_m);
+"""
+
+
+def parse_feed_object(o: dict) -> dict:
+    """Flatten one /feed object into the row format nasa_neo_feed returns"""
+    cad = o.get("close_approach_data", [])
+    cad0 = cad[0] if len(cad) > 0 else None
+    diameters = o.get("estimated_diameter", {}).get("meters", {})
+    return {
+        "id": o.get("id"),
+        "name": o.get("name"),
+        "nasa_jpl_url": o.get("nasa_jpl_url"),
+        "diameter_min_m": diameters.get("estimated_diameter_min"),
+        "diameter_max_m": diameters.get("estimated_diameter_max"),
+        "close_approach_date": cad0.get("close_approach_date") if cad0 else None,
+        "relative_velocity_km_s": float(cad0["relative_velocity"]["kilometers_per_second"]) if cad0 and "relative_velocity" in cad0 else None,
+        "miss_distance_km": float(cad0["miss_distance"]["kilometers"]) if cad0 and "miss_distance" in cad0 else None,
+        "hazardous": o.get("is_potentially_hazardous_asteroid", False)
+    }
+
+
+def date_range(start: date, end: date):
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+def windows(days: list, max_days: int = FEED_WINDOW_DAYS) -> list:
+    """Group sorted dates into contiguous (start, end) windows of at most max_days days"""
+    result = []
+    for day in days:
+        if result and (day - result[-1][1]).days == 1 and (day - result[-1][0]).days < max_days:
+            result[-1][1] = day
+        else:
+            result.append([day, day])
+    return [(a, b) for a, b in result]
+
+
+class NeoCatalog:
+    """
+    Local SQLite copy of NeoWs feed and lookup records with indexed queries.
+    One connection is shared behind a lock; calls are short and meant to run
+    in a worker thread from async code.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        return conn
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def reopen(self):
+        """New connection in a forked worker; SQLite connections must not be carried across fork()"""
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+
+    def ping(self):
+        with self._lock:
+            self._conn.execute("SELECT 1").fetchone()
+
+    # --- Sync bookkeeping ---
+
+    def missing_dates(self, start: date, end: date, now: float = None) -> list:
+        """Dates in [start, end] never synced, or synced too long ago if today or later"""
+        now = time.time() if now is None else now
+        today = date.today()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT day, synced_at FROM synced_dates WHERE day BETWEEN ? AND ?",
+                (start.isoformat(), end.isoformat()),
+            ).fetchall()
+        synced = {row["day"]: row["synced_at"] for row in rows}
+
+        missing = []
+        for day in date_range(start, end):
+            synced_at = synced.get(day.isoformat())
+            if synced_at is None or (day >= today and now - synced_at > NEO_CATALOG_REFRESH):
+                missing.append(day)
+        return missing
+
+    def store_feed(self, data: dict, start: date, end: date):
+        """Upsert every object of a /feed response and mark [start, end] as synced"""
+        now = time.time()
+        objects, approaches = [], []
+        for objs in data.get("near_earth_objects", {}).values():
+            for o in objs:
+                row = parse_feed_object(o)
+                objects.append((row["id"], row["name"], row["nasa_jpl_url"], row["diameter_min_m"],
+                                row["diameter_max_m"], int(bool(row["hazardous"]))))
+                if row["close_approach_date"]:
+                    approaches.append((row["id"], row["close_approach_date"],
+                                       row["relative_velocity_km_s"], row["miss_distance_km"]))
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """INSERT INTO objects (id, name, nasa_jpl_url, diameter_min_m, diameter_max_m, hazardous)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(id) DO UPDATE SET name=excluded.name, nasa_jpl_url=excluded.nasa_jpl_url,
+                       diameter_min_m=excluded.diameter_min_m, diameter_max_m=excluded.diameter_max_m,
+                       hazardous=excluded.hazardous""",
+                objects,
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO approaches VALUES (?, ?, ?, ?)", approaches
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO synced_dates VALUES (?, ?)",
+                [(day.isoformat(), now) for day in date_range(start, end)],
+            )
+
+    def store_lookup(self, data: dict):
+        """Keep the full /neo/{id} record so later lookups are served locally"""
+        diameters = data.get("estimated_diameter", {}).get("meters", {})
+        with self._lock, self._conn:
+            self._conn.execute(
+                """INSERT INTO objects (id, name, nasa_jpl_url, diameter_min_m, diameter_max_m, hazardous, lookup_json)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(id) DO UPDATE SET lookup_json=excluded.lookup_json""",
+                (data.get("id"), data.get("name"), data.get("nasa_jpl_url"),
+                 diameters.get("estimated_diameter_min"), diameters.get("estimated_diameter_max"),
+                 int(bool(data.get("is_potentially_hazardous_asteroid", False))), json.dumps(data)),
+            )
+
+    # --- Queries ---
+
+    @staticmethod
+    def _feed_query(start_date: str, end_date: str, hazardous: bool = None,
+                    min_diameter_m: float = None, max_miss_distance_km: float = None,
+                    limit: int = None):
+        sql = """SELECT o.id, o.name, o.nasa_jpl_url, o.diameter_min_m, o.diameter_max_m,
+                        a.close_approach_date, a.relative_velocity_km_s, a.miss_distance_km, o.hazardous
+                 FROM approaches a JOIN objects o ON o.id = a.neo_id
+                 WHERE a.close_approach_date BETWEEN ? AND ?"""
+        args = [start_date, end_date]
+        if hazardous is not None:
+            sql += " AND o.hazardous = ?"
+            args.append(int(hazardous))
+        if min_diameter_m is not None:
+            sql += " AND o.diameter_max_m >= ?"
+            args.append(min_diameter_m)
+        if max_miss_distance_km is not None:
+            sql += " AND a.miss_distance_km <= ?"
+            args.append(max_miss_distance_km)
+        sql += " ORDER BY a.close_approach_date, o.id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(limit)
+        return sql, args
+
+    def query_feed(self, *args, **kwargs) -> list:
+        """Close approaches in [start_date, end_date] ordered by date, in nasa_neo_feed's row format"""
+        sql, params = self._feed_query(*args, **kwargs)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(row, hazardous=bool(row["hazardous"])) for row in rows]
+
+    def get_lookup(self, asteroid_id: str):
+        """Stored /neo/{id} record, or None if it was never fetched"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT lookup_json FROM objects WHERE id = ?", (asteroid_id,)
+            ).fetchone()
+        if row is None or row["lookup_json"] is None:
+            return None
+        return json.loads(row["lookup_json"])
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = self._conn.execute(
+                """SELECT (SELECT COUNT(*) FROM objects) AS objects,
+                          (SELECT COUNT(*) FROM approaches) AS approaches,
+                          (SELECT COUNT(*) FROM objects WHERE lookup_json IS NOT NULL) AS lookups,
+                          (SELECT COUNT(*) FROM synced_dates) AS synced_dates,
+                          (SELECT MIN(day) FROM synced_dates) AS first_date,
+                          (SELECT MAX(day) FROM synced_dates) AS last_date"""
+            ).fetchone()
+        return dict(counts, path=self.path)
+
+
+def plan_sync(shards: list, missing: list):
+    """
+    Fetch windows for the missing dates, never straddling a shard boundary, plus the
+    index of the shard each window belongs to
+    """
+    fetch_windows, owners = [], []
+    for i, (shard_start, shard_end) in enumerate(shards):
+        for window in windows([day for day in missing if shard_start <= day <= shard_end]):
+            fetch_windows.append(window)
+            owners.append(i)
+    return fetch_windows, owners
+
+
+async def sync_range(catalog: NeoCatalog, client, start: date, end: date) -> dict:
+    """Fetch only the date windows in [start, end] the catalog doesn't hold yet, concurrently"""
+    missing = await asyncio.to_thread(catalog.missing_dates, start, end)
+    fetch_windows, _ = plan_sync(split_range(start, end), missing)
+
+    fetched = []
+    async for j, data in client.iter_feed_windows(fetch_windows):
+        window_start, window_end = fetch_windows[j]
+        await asyncio.to_thread(catalog.store_feed, data, window_start, window_end)
+        fetched.append((window_start.isoformat(), window_end.isoformat()))
+    return {"missing_days": len(missing), "windows_fetched": sorted(fetched)}
+
+
+async def iter_synced_shards(catalog: NeoCatalog, client, start: date, end: date):
+    """
+    Sync [start, end] like sync_range, yielding each 7-day (shard_start, shard_end)
+    in date order as soon as it and every earlier shard is stored
+    """
+    shards = split_range(start, end)
+    missing = await asyncio.to_thread(catalog.missing_dates, start, end)
+    fetch_windows, owners = plan_sync(shards, missing)
+
+    pending = [0] * len(shards)
+    for i in owners:
+        pending[i] += 1
+
+    next_index = 0
+    while next_index < len(shards) and pending[next_index] == 0:
+        yield shards[next_index]
+        next_index += 1
+
+    async for j, data in client.iter_feed_windows(fetch_windows):
+        window_start, window_end = fetch_windows[j]
+        await asyncio.to_thread(catalog.store_feed, data, window_start, window_end)
+        pending[owners[j]] -= 1
+        while next_index < len(shards) and pending[next_index] == 0:
+            yield shards[next_index]
+            next_index += 1
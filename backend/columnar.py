@@ -0,0 +1,142 @@
+# backend/columnar.py
+import importlib.util
+import json
+from typing import Optional
+
+import msgpack
+import numpy as np
+from fastapi import Request, Response
+
+from simulation.calculations import ZONE_STYLES, label_codes
+from simulation.exposure import EXPOSURE_ZONES
+
+COLUMNAR_FORMATS = ("columns", "msgpack", "arrow")
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+# Arrow IPC output is only offered when pyarrow is installed; it is imported on first use
+ARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+FLOAT_DTYPE = "<f8"
+CODE_DTYPE = "|u1"
+
+
+def columnar_format(request: Request, format: Optional[str], other_formats: tuple = ("json",)) -> Optional[str]:
+    """
+    Compact output asked for via ?format=columns|msgpack|arrow or the Accept header, else None
+    (also for other_formats, which the caller serves itself). Any other ?format= is a ValueError.
+    An Arrow Accept header is ignored (plain JSON is served) when pyarrow isn't installed.
+    """
+    if format:
+        if format in other_formats:
+            return None
+        if format not in COLUMNAR_FORMATS:
+            raise ValueError(f"Unknown format '{format}', expected {', '.join(other_formats + COLUMNAR_FORMATS)}")
+        if format == "arrow" and not ARROW_AVAILABLE:
+            raise ValueError("Arrow output needs pyarrow installed on the server")
+        return format
+    accept = request.headers.get("accept", "")
+    if ARROW_MEDIA_TYPE in accept and ARROW_AVAILABLE:
+        return "arrow"
+    if any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES):
+        return "msgpack"
+    return None
+
+
+def flatten_exposure(exposures: list) -> dict:
+    """population_exposure objects as float columns per zone, NaN where there is no location"""
+    n = len(exposures)
+    columns = {}
+    for zone, _ in EXPOSURE_ZONES:
+        population, area = np.full(n, np.nan), np.full(n, np.nan)
+        for i, exposure in enumerate(exposures):
+            if exposure is not None:
+                population[i] = exposure[zone]["population"]
+                area[i] = exposure[zone]["area_km2"]
+        columns[f"population_{zone}"] = population
+        columns[f"exposed_area_{zone}_km2"] = area
+    return columns
+
+
+def compact_columns(columns: dict, float_columns) -> tuple:
+    """
+    Struct-of-arrays form of batch columns: (float columns, dictionary-encoded labels).
+    Population exposure is flattened into float columns; zone radii stay plain columns.
+    """
+    floats = {name: np.asarray(columns[name], dtype=np.float64) for name in float_columns}
+    if "population_exposure" in columns:
+        floats.update(flatten_exposure(columns["population_exposure"]))
+    labels = {
+        name: {"categories": categories.tolist(), "codes": codes}
+        for name, (categories, codes) in label_codes(columns).items()
+    }
+    return floats, labels
+
+
+def _json_values(values: np.ndarray) -> list:
+    missing = np.isnan(values)
+    return np.where(missing, None, values).tolist() if missing.any() else values.tolist()
+
+
+def encode_columns_json(header: dict, floats: dict, labels: dict) -> bytes:
+    """Columnar JSON: arrays as lists, NaN as null"""
+    payload = dict(header)
+    payload["zones"] = ZONE_STYLES
+    payload["columns"] = {name: _json_values(values) for name, values in floats.items()}
+    payload["labels"] = {
+        name: {"categories": label["categories"], "codes": label["codes"].tolist()} for name, label in labels.items()
+    }
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_columns_msgpack(header: dict, floats: dict, labels: dict) -> bytes:
+    """Columnar MessagePack: every array is a bin of raw little-endian values, dtypes given once"""
+    payload = dict(header)
+    payload["zones"] = ZONE_STYLES
+    payload["dtypes"] = {"columns": FLOAT_DTYPE, "codes": CODE_DTYPE}
+    payload["columns"] = floats
+    payload["labels"] = labels
+    return msgpack.packb(payload, default=_pack_array)
+
+
+def _pack_array(obj):
+    """NumPy arrays go into MessagePack as bin values of their raw little-endian bytes"""
+    if isinstance(obj, np.ndarray):
+        return np.ascontiguousarray(obj, dtype=obj.dtype.newbyteorder("<")).tobytes()
+    raise TypeError(f"Cannot MessagePack-encode {type(obj).__name__}")
+
+
+def encode_columns_arrow(header: dict, floats: dict, labels: dict) -> bytes:
+    """Arrow IPC stream of one record batch; labels as dictionary arrays, the rest in schema metadata"""
+    import pyarrow
+    import pyarrow.ipc
+
+    arrays = {name: pyarrow.array(values, type=pyarrow.float64()) for name, values in floats.items()}
+    for name, label in labels.items():
+        arrays[name] = pyarrow.DictionaryArray.from_arrays(
+            pyarrow.array(label["codes"], type=pyarrow.uint8()), pyarrow.array(label["categories"], type=pyarrow.string())
+        )
+    metadata = {key: json.dumps(value) for key, value in header.items()}
+    metadata["zones"] = json.dumps(ZONE_STYLES)
+    table = pyarrow.table(arrays).replace_schema_metadata(metadata)
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+ENCODERS = {
+    "columns": (encode_columns_json, "application/json"),
+    "msgpack": (encode_columns_msgpack, MSGPACK_MEDIA_TYPES[0]),
+    "arrow": (encode_columns_arrow, ARROW_MEDIA_TYPE),
+}
+
+
+def columnar_response(fmt: str, header: dict, columns: dict, float_columns) -> Response:
+    """
+    Batch columns as one compact response: `header` fields, zone metadata once, then
+    float columns and dictionary-encoded label columns (categories + uint8 codes)
+    """
+    floats, labels = compact_columns(columns, float_columns)
+    encode, media_type = ENCODERS[fmt]
+    return Response(encode(header, floats, labels), media_type=media_type, headers={"Vary": "Accept"})
@@ -0,0 +1,13 @@
+import os
+import shutil
+import tempfile
+
+# The app opens its on-disk stores at import; point them at a scratch directory
+# so test runs leave nothing in the source tree
+DATA_DIR = tempfile.mkdtemp(prefix="snap-dg-tests-")
+os.environ["NEO_CATALOG_PATH"] = os.path.join(DATA_DIR, "neo_catalog.sqlite3")
+os.environ["RESULT_STORE_DIR"] = os.path.join(DATA_DIR, "results")
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
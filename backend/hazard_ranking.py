@@ -0,0 +1,184 @@
+# backend/hazard_ranking.py
+import asyncio
+import heapq
+import json
+import math
+import os
+
+import numpy as np
+
+from nasa_client import BROWSE_PAGE_SIZE
+from simulation.calculations import DEFAULT_ANGLE, run_batch_simulation
+from simulation.deflection import EARTH_ESCAPE_SPEED, EARTH_RADIUS_KM
+from simulation.models import DEFAULT_MODEL
+
+DEFAULT_TOP_K = 100
+MAX_TOP_K = 10_000
+# Browse pages simulated together; the checkpoint is written after each such chunk
+RANKING_CHUNK_PAGES = int(os.getenv("RANKING_CHUNK_PAGES", "50"))
+
+CATALOG_COLUMNS = ("id", "name", "diameter_m", "velocity_km_s", "miss_distance_km", "close_approach_date", "hazardous")
+
+
+def new_columns() -> dict:
+    return {name: [] for name in CATALOG_COLUMNS}
+
+
+def parse_browse_objects(objects: list, columns: dict) -> int:
+    """
+    Append /neo/browse objects to column lists, each at its closest Earth approach.
+    Returns how many were skipped for lacking a size or an Earth approach.
+    """
+    skipped = 0
+    for o in objects:
+        diameters = o.get("estimated_diameter", {}).get("meters", {})
+        low, high = diameters.get("estimated_diameter_min"), diameters.get("estimated_diameter_max")
+        closest, closest_km = None, math.inf
+        for approach in o.get("close_approach_data", ()):
+            if approach.get("orbiting_body", "Earth") != "Earth":
+                continue
+            miss_km = float(approach["miss_distance"]["kilometers"])
+            if miss_km < closest_km:
+                closest, closest_km = approach, miss_km
+        if closest is None or not (low or high):
+            skipped += 1
+            continue
+
+        columns["id"].append(o.get("id"))
+        columns["name"].append(o.get("name"))
+        columns["diameter_m"].append(math.sqrt((low or high) * (high or low)))   # log-midpoint of the size range
+        columns["velocity_km_s"].append(float(closest["relative_velocity"]["kilometers_per_second"]))
+        columns["miss_distance_km"].append(closest_km)
+        columns["close_approach_date"].append(closest.get("close_approach_date"))
+        columns["hazardous"].append(bool(o.get("is_potentially_hazardous_asteroid", False)))
+    return skipped
+
+
+def hazard_scores(columns: dict, density: float, angle: float, model: str):
+    """
+    Expected damage of every row: land area inside the shockwave zone were it to strike
+    (at its approach speed plus Earth's pull), times (R_earth / miss distance)², the
+    share of the sky at that distance Earth covers. Returns (simulation columns, scores).
+    """
+    velocity = np.hypot(np.asarray(columns["velocity_km_s"], dtype=np.float64), EARTH_ESCAPE_SPEED)
+    simulated = run_batch_simulation(columns["diameter_m"], velocity, density, angle=angle, model=model)
+    damage_km2 = np.pi * simulated["shockwave_radius"] ** 2
+    miss_km = np.maximum(np.asarray(columns["miss_distance_km"], dtype=np.float64), EARTH_RADIUS_KM)
+    return simulated, damage_km2 * (EARTH_RADIUS_KM / miss_km) ** 2
+
+
+class TopK:
+    """The k highest-scoring records seen so far, kept as a min-heap on score"""
+
+    def __init__(self, k: int, records=()):
+        self.k = k
+        self._heap = []
+        self._seq = 0   # tie-break: among equal scores the first one seen stays
+        for record in records:
+            self.push(record["score"], record)
+
+    def __len__(self):
+        return len(self._heap)
+
+    def threshold(self) -> float:
+        """Score a new record must beat to get in"""
+        return self._heap[0][0] if len(self._heap) == self.k else -math.inf
+
+    def push(self, score: float, record: dict):
+        item = (score, self._seq, record)
+        self._seq += 1
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, item)
+        elif score > self._heap[0][0]:
+            heapq.heapreplace(self._heap, item)
+
+    def push_batch(self, scores: np.ndarray, make_record):
+        """Offer a chunk of scores; records are only built for rows that can get in"""
+        candidates = np.flatnonzero(scores > self.threshold())
+        if candidates.size > self.k:
+            candidates = candidates[np.argpartition(scores[candidates], -self.k)[-self.k:]]
+        for i in np.sort(candidates):
+            self.push(float(scores[i]), make_record(i))
+
+    def records(self) -> list:
+        """Best first"""
+        return [record for _, _, record in sorted(self._heap, key=lambda item: (-item[0], item[1]))]
+
+
+def load_checkpoint(path: str, params: dict):
+    try:
+        with open(path) as f:
+            checkpoint = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    return checkpoint if checkpoint.get("params") == params else None
+
+
+def save_checkpoint(path: str, checkpoint: dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+
+def rank_chunk(columns: dict, top: TopK, density: float, angle: float, model: str):
+    simulated, scores = hazard_scores(columns, density, angle, model)
+
+    def record(i):
+        return {
+            "id": columns["id"][i],
+            "name": columns["name"][i],
+            "hazardous": columns["hazardous"][i],
+            "close_approach_date": columns["close_approach_date"][i],
+            "miss_distance_km": columns["miss_distance_km"][i],
+            "diameter_m": columns["diameter_m"][i],
+            "velocity_km_s": float(simulated["velocity_ms"][i] / 1000),
+            "energy_megatons": float(simulated["kinetic_energy_megatons"][i]),
+            "shockwave_radius_km": float(simulated["shockwave_radius"][i]),
+            "score": float(scores[i]),
+        }
+    top.push_batch(scores, record)
+
+
+async def rank_catalog(client, k: int = DEFAULT_TOP_K, density: float = 3000.0, angle: float = DEFAULT_ANGLE,
+                       model: str = DEFAULT_MODEL, checkpoint_path: str = None, progress=None,
+                       page_size: int = BROWSE_PAGE_SIZE, chunk_pages: int = RANKING_CHUNK_PAGES) -> dict:
+    """
+    Rank the whole NeoWs catalog by hazard_scores, keeping the top k. Pages are fetched
+    concurrently and parsed into columns; every chunk_pages pages are simulated in one
+    vectorized batch. With checkpoint_path the cursor and the ranking so far are saved
+    after each chunk, and a later run with the same parameters resumes from there.
+    progress(pages_done, total_pages) is called after each chunk.
+    """
+    params = {"k": k, "density": density, "angle": angle, "model": model, "page_size": page_size}
+    checkpoint = (load_checkpoint(checkpoint_path, params) if checkpoint_path else None) or {
+        "params": params, "next_page": 0, "total_pages": None, "ranked": 0, "skipped": 0, "top": [],
+    }
+    top = TopK(k, checkpoint["top"])
+
+    if checkpoint["total_pages"] is None or checkpoint["next_page"] < checkpoint["total_pages"]:
+        columns, pages = new_columns(), 0
+        async for page, total, data in client.iter_browse(checkpoint["next_page"], page_size):
+            checkpoint["skipped"] += parse_browse_objects(data.get("near_earth_objects", []), columns)
+            pages += 1
+            if pages < chunk_pages and page + 1 < total:
+                continue
+
+            if columns["id"]:
+                await asyncio.to_thread(rank_chunk, columns, top, density, angle, model)
+            checkpoint.update(next_page=page + 1, total_pages=total, top=top.records(),
+                              ranked=checkpoint["ranked"] + len(columns["id"]))
+            if checkpoint_path:
+                save_checkpoint(checkpoint_path, checkpoint)
+            if progress is not None:
+                progress(page + 1, total)
+            columns, pages = new_columns(), 0
+
+    return {
+        "params": params,
+        "total_pages": checkpoint["total_pages"],
+        "ranked": checkpoint["ranked"],
+        "skipped": checkpoint["skipped"],
+        "top": top.records(),
+    }
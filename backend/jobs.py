@@ -0,0 +1,367 @@
+# backend/jobs.py
+import asyncio
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import time
+from typing import Callable, Optional
+
+import numpy as np
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))          # jobs running at once, the rest wait queued
+JOB_PAGE_LIMIT = int(os.getenv("JOB_PAGE_LIMIT", "10000"))  # most rows one results page returns
+# Running jobs write their progress to disk at most this often (s), for the other server workers
+JOB_STATE_INTERVAL = float(os.getenv("JOB_STATE_INTERVAL", "1.0"))
+# Finished jobs (state and results) are removed this long (s) after they finish
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", str(24 * 3600)))
+JOB_SWEEP_INTERVAL = 60.0   # s between looks for expired jobs
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+COLUMN_DTYPE = np.dtype("<f8")
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job once it has been cancelled"""
+
+
+def process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def job_id(kind: str, params: dict) -> str:
+    """Content address of a job: identical submissions map to the same job"""
+    blob = json.dumps({"kind": kind, "params": params}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode()).hexdigest()[:24]
+
+
+class ColumnWriter:
+    """
+    Appends result columns chunk by chunk: float columns as raw little-endian float64,
+    JSON columns as one line per row plus an int64 offset index for random access
+    """
+
+    def __init__(self, directory: str, float_columns, json_columns=()):
+        self.directory = directory
+        self.float_columns = tuple(float_columns)
+        self.json_columns = tuple(json_columns)
+        self.rows = 0
+        self._files = {name: open(os.path.join(directory, f"{name}.f64"), "wb") for name in self.float_columns}
+        self._lines = {name: open(os.path.join(directory, f"{name}.ndjson"), "wb") for name in self.json_columns}
+        self._offsets = {name: [0] for name in self.json_columns}
+
+    def append(self, columns: dict):
+        n = len(columns[self.float_columns[0]])
+        for name, f in self._files.items():
+            f.write(np.ascontiguousarray(columns[name], dtype=COLUMN_DTYPE).tobytes())
+        for name, f in self._lines.items():
+            offsets = self._offsets[name]
+            for value in columns[name]:
+                line = json.dumps(value, separators=(",", ":")).encode() + b"\n"
+                f.write(line)
+                offsets.append(offsets[-1] + len(line))
+        self.rows += n
+
+    def close(self):
+        for f in (*self._files.values(), *self._lines.values()):
+            f.close()
+        for name, offsets in self._offsets.items():
+            np.asarray(offsets, dtype="<i8").tofile(os.path.join(self.directory, f"{name}.idx"))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class JobStore:
+    """
+    Jobs on disk: {root}/{id}/job.json holds the state, the result is either result.json
+    or columns written by ColumnWriter. Column pages are read through memory maps, so a
+    page costs only the rows it holds.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _dir(self, job_id: str) -> str:
+        if not job_id.isalnum():
+            raise KeyError(job_id)
+        return os.path.join(self.root, job_id)
+
+    def reset(self, job_id: str) -> str:
+        """Empty directory for a (re)submitted job"""
+        directory = self._dir(job_id)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+        return directory
+
+    def remove(self, job_id: str):
+        shutil.rmtree(self._dir(job_id), ignore_errors=True)
+
+    def states(self):
+        """State of every job on disk, whichever process ran it"""
+        try:
+            entries = list(os.scandir(self.root))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if entry.is_dir():
+                state = self.load_state(entry.name)
+                if state is not None:
+                    yield state
+
+    def save_state(self, state: dict):
+        directory = self._dir(state["id"])
+        tmp = os.path.join(directory, "job.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, os.path.join(directory, "job.json"))
+
+    def load_state(self, job_id: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(self._dir(job_id), "job.json")) as f:
+                return json.load(f)
+        except (KeyError, FileNotFoundError):
+            return None
+
+    def request_cancel(self, job_id: str):
+        """Cancel marker, seen by whichever server worker runs the job"""
+        open(os.path.join(self._dir(job_id), "cancel"), "w").close()
+
+    def cancel_requested(self, job_id: str) -> bool:
+        return os.path.exists(os.path.join(self._dir(job_id), "cancel"))
+
+    def column_writer(self, job_id: str, float_columns, json_columns=()) -> ColumnWriter:
+        return ColumnWriter(self._dir(job_id), float_columns, json_columns)
+
+    def write_result(self, job_id: str, result: dict):
+        with open(os.path.join(self._dir(job_id), "result.json"), "w") as f:
+            json.dump(result, f)
+
+    def read_result(self, job_id: str) -> dict:
+        with open(os.path.join(self._dir(job_id), "result.json")) as f:
+            return json.load(f)
+
+    def read_columns(self, state: dict, offset: int, limit: int) -> dict:
+        """Rows [offset, offset + limit) of a columnar result, as arrays and lists"""
+        directory = self._dir(state["id"])
+        rows = state["rows"]
+        start, stop = min(offset, rows), min(offset + limit, rows)
+        columns = {}
+        for name in state["float_columns"]:
+            if rows:
+                values = np.memmap(os.path.join(directory, f"{name}.f64"), dtype=COLUMN_DTYPE, mode="r", shape=(rows,))
+                columns[name] = np.array(values[start:stop])
+            else:
+                columns[name] = np.empty(0, dtype=COLUMN_DTYPE)
+        for name in state["json_columns"]:
+            offsets = np.fromfile(os.path.join(directory, f"{name}.idx"), dtype="<i8")
+            with open(os.path.join(directory, f"{name}.ndjson"), "rb") as f:
+                f.seek(int(offsets[start]))
+                data = f.read(int(offsets[stop] - offsets[start]))
+            columns[name] = [json.loads(line) for line in data.splitlines()]
+        return columns
+
+
+class Job:
+    """
+    One submitted job. `run(job)` executes in a worker thread, or on the event loop when
+    it is a coroutine function, and reports progress through the job.
+    """
+
+    def __init__(self, job_id: str, kind: str, store: JobStore):
+        self.id = job_id
+        self.kind = kind
+        self.store = store
+        self.status = QUEUED
+        self.progress = 0.0
+        self.error = None
+        self.rows = None
+        self.float_columns = ()
+        self.json_columns = ()
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_requested = False
+        self.writer = None
+        self.task = None
+        self._saved_at = 0.0
+        self.changed = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+
+    def state(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "pid": os.getpid(),
+            "status": self.status,
+            "progress": self.progress,
+            "error": self.error,
+            "rows": self.rows,
+            "float_columns": list(self.float_columns),
+            "json_columns": list(self.json_columns),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+    def report(self, done: int, total: int):
+        """Progress from the worker thread; raises JobCancelled once the job is cancelled"""
+        if self.cancel_requested or self.store.cancel_requested(self.id):
+            raise JobCancelled()
+        self.progress = done / total if total else 1.0
+        self._loop.call_soon_threadsafe(self.notify)
+        now = time.monotonic()
+        if now - self._saved_at >= JOB_STATE_INTERVAL:
+            self._saved_at = now
+            self.store.save_state(self.state())
+
+    def column_writer(self, float_columns, json_columns=()) -> ColumnWriter:
+        """Writer for a columnar result; the job's result is whatever it holds when run returns"""
+        self.float_columns, self.json_columns = tuple(float_columns), tuple(json_columns)
+        self.writer = self.store.column_writer(self.id, float_columns, json_columns)
+        return self.writer
+
+    def notify(self):
+        """Wake everyone waiting on the current `changed` event (event loop thread only)"""
+        event, self.changed = self.changed, asyncio.Event()
+        event.set()
+
+
+class JobManager:
+    """
+    Background jobs with bounded concurrency. Submissions are deduplicated by input hash:
+    a job that is queued, running or done is returned instead of starting another.
+    Finished jobs are dropped from memory and disk `retention` seconds after finishing.
+    """
+
+    def __init__(self, store: JobStore, workers: int = JOB_WORKERS, retention: float = JOB_RETENTION):
+        self.store = store
+        self.workers = max(1, workers)
+        self.retention = retention
+        self.jobs = {}            # id -> Job started by this process
+        self._slots = None        # semaphore, created on the serving event loop
+        self._swept_at = 0.0
+
+    def expire(self, now: float = None) -> int:
+        """Remove jobs finished more than `retention` ago, also other workers'; returns how many"""
+        cutoff = (now or time.time()) - self.retention
+        for key, job in list(self.jobs.items()):
+            if job.status in FINISHED and job.finished_at < cutoff:
+                del self.jobs[key]
+        removed = 0
+        for state in self.store.states():
+            if state["status"] in FINISHED and (state["finished_at"] or state["created_at"]) < cutoff:
+                self.store.remove(state["id"])
+                removed += 1
+        return removed
+
+    def get(self, job_id: str) -> Optional[dict]:
+        job = self.jobs.get(job_id)
+        if job is not None:
+            return job.state()
+        state = self.store.load_state(job_id)
+        if state is not None and state["status"] not in FINISHED and not process_alive(state["pid"]):
+            # Left unfinished by a process that is gone; one still alive is another server worker
+            state.update(status=FAILED, error="interrupted")
+        return state
+
+    def submit(self, kind: str, params: dict, run: Callable, force: bool = False) -> dict:
+        """Queue `run(job)` unless the same job is already queued, running or (without force) done"""
+        if time.monotonic() - self._swept_at >= JOB_SWEEP_INTERVAL:
+            self._swept_at = time.monotonic()
+            self.expire()
+        key = job_id(kind, params)
+        existing = self.get(key)
+        if existing is not None and existing["status"] not in (FAILED, CANCELLED) and not (force and existing["status"] == DONE):
+            return existing
+
+        self.store.reset(key)
+        job = Job(key, kind, self.store)
+        self.jobs[key] = job
+        self.store.save_state(job.state())
+        job.task = asyncio.get_running_loop().create_task(self._run(job, run))
+        return job.state()
+
+    async def _run(self, job: Job, run: Callable):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        try:
+            async with self._slots:
+                if job.cancel_requested or self.store.cancel_requested(job.id):
+                    raise JobCancelled()
+                job.status, job.started_at = RUNNING, time.time()
+                self.store.save_state(job.state())
+                job.notify()
+                if inspect.iscoroutinefunction(run):
+                    result = await run(job)
+                else:
+                    result = await asyncio.to_thread(run, job)
+            if job.writer is not None:
+                job.rows = job.writer.rows
+            if result is not None:
+                self.store.write_result(job.id, result)
+            job.status, job.progress = DONE, 1.0
+        except (JobCancelled, asyncio.CancelledError):
+            job.status = CANCELLED
+        except Exception as e:
+            job.status, job.error = FAILED, str(e)
+        job.finished_at = time.time()
+        self.store.save_state(job.state())
+        job.notify()
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        """
+        Cancel a queued or running job; a running one stops at its next progress report,
+        also when another server worker runs it.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            state = self.get(job_id)
+            if state is not None and state["status"] not in FINISHED:
+                self.store.request_cancel(job_id)
+            return state
+        if job.status not in FINISHED:
+            job.cancel_requested = True
+            if job.status == QUEUED:
+                job.task.cancel()
+        return job.state()
+
+    def cancel_all(self):
+        for job_id in list(self.jobs):
+            self.cancel(job_id)
+
+    async def events(self, job_id: str):
+        """Yield the job's state now and after every change, until it finishes"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            # Not ours: follow the state another worker writes to disk
+            previous = None
+            while True:
+                state = self.get(job_id)
+                if state is None:
+                    return
+                if state != previous:
+                    yield state
+                    previous = state
+                if state["status"] in FINISHED:
+                    return
+                await asyncio.sleep(JOB_STATE_INTERVAL / 2)
+        while True:
+            changed = job.changed
+            state = job.state()
+            yield state
+            if state["status"] in FINISHED:
+                return
+            await changed.wait()
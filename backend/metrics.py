@@ -0,0 +1,246 @@
+# backend/metrics.py
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+# Instrumentation switch; when off spans are a shared no-op and the middleware isn't installed
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() not in ("0", "false", "no", "off")
+# Per-request Server-Timing header listing every span (opt-in: it exposes internals)
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0").lower() in ("1", "true", "yes", "on")
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Stats keys that only ever grow; they are exported as counters, everything else as gauges
+MONOTONIC_STATS = {
+    "hits", "misses", "coalesced", "evictions", "expirations", "stale_hits", "refresh_errors",
+    "opened", "rejected", "hedged",
+}
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, in the Prometheus exposition layout"""
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}   # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def count(self, *labels) -> int:
+        series = self._series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets + ("+Inf",), series[:-1]):
+                    cumulative += n
+                    lines.append(f"{self.name}_bucket{_labels(names, labels + (bound,))} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {series[-1]}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, *args, **kwargs) -> Counter:
+        metric = Counter(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        metric = Histogram(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def stats(self, prefix: str, help: str, stats_fn):
+        """Export a component's stats() dict at scrape time, one metric per numeric key"""
+        self._collectors.append((prefix, help, stats_fn))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for prefix, help, stats_fn in self._collectors:
+            for key, value in stats_fn().items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                kind = "counter" if key in MONOTONIC_STATS else "gauge"
+                name = f"{prefix}_{key}_total" if kind == "counter" else f"{prefix}_{key}"
+                lines += [f"# HELP {name} {help}: {key}", f"# TYPE {name} {kind}", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "Request latency up to the end of the response body",
+    ("method", "route", "status"),
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    "stage_duration_seconds", "Time spent in instrumented stages (upstream fetches, model kernels)",
+    ("stage",),
+)
+UPSTREAM_REQUESTS = REGISTRY.counter(
+    "nasa_upstream_requests_total", "NeoWs requests by endpoint and outcome", ("endpoint", "outcome"),
+)
+FALLBACKS = REGISTRY.counter(
+    "fallbacks_total", "Responses served by a fallback path", ("endpoint", "reason"),
+)
+
+# Spans of the request being handled; a list shared by the request's task and worker threads
+_request_spans = ContextVar("request_spans", default=None)
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+def observe(name: str, elapsed: float):
+    """Record a stage timed elsewhere (another process, a library hook) like a finished span"""
+    STAGE_SECONDS.observe(elapsed, name)
+    spans = _request_spans.get()
+    if spans is not None:
+        spans.append((name, elapsed))
+
+
+def span(name: str):
+    """`with span("stage"):` times the block into stage_duration_seconds (no-op when disabled)"""
+    if not METRICS_ENABLED:
+        return NULL_SPAN
+    return _Span(name)
+
+
+def count_upstream(endpoint: str, outcome: str):
+    if METRICS_ENABLED:
+        UPSTREAM_REQUESTS.inc(endpoint, outcome)
+
+
+def count_fallback(endpoint: str, reason: str):
+    if METRICS_ENABLED:
+        FALLBACKS.inc(endpoint, reason)
+
+
+def server_timing(spans: list, total: float) -> bytes:
+    """Server-Timing value: per-stage totals (repeated stages summed) plus the app time"""
+    totals = {}
+    for name, elapsed in spans:
+        totals[name] = totals.get(name, 0.0) + elapsed
+    entries = [f"{name};dur={elapsed * 1000:.3f}" for name, elapsed in totals.items()]
+    entries.append(f"app;dur={total * 1000:.3f}")
+    return ", ".join(entries).encode("latin-1")
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request by method, route template and status.
+    The route comes from the matched route, so path parameters don't explode label cardinality.
+    """
+
+    def __init__(self, app, server_timing: bool = None):
+        self.app = app
+        self.server_timing = server_timing   # None follows SERVER_TIMING
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        spans = []
+        token = _request_spans.set(spans)
+        status = 500
+        add_header = SERVER_TIMING if self.server_timing is None else self.server_timing
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if add_header:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", server_timing(spans, time.perf_counter() - start)))
+                    message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_spans.reset(token)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            REQUEST_SECONDS.observe(time.perf_counter() - start, scope["method"], route, str(status))
+
+
+def render() -> str:
+    return REGISTRY.render()
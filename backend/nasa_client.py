@@ -0,0 +1,375 @@
+# backend/nasa_client.py
+import asyncio
+import os
+import random
+import time
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+
+import httpx
+
+from cache import TTLCache
+from metrics import count_upstream, span
+
+# Connection pool sizing; every endpoint shares the same keep-alive pool
+NASA_MAX_CONNECTIONS = int(os.getenv("NASA_MAX_CONNECTIONS", "20"))
+NASA_MAX_KEEPALIVE = int(os.getenv("NASA_MAX_KEEPALIVE", "10"))
+NASA_MAX_PER_HOST = int(os.getenv("NASA_MAX_PER_HOST", "8"))
+NASA_TIMEOUT = float(os.getenv("NASA_TIMEOUT", "15"))
+
+# Response cache: budget in response bytes and per-kind TTLs in seconds
+NASA_CACHE_MAX_BYTES = int(os.getenv("NASA_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+NASA_CACHE_TTLS = {
+    "feed": float(os.getenv("NASA_CACHE_FEED_TTL", "3600")),
+    "neo": float(os.getenv("NASA_CACHE_NEO_TTL", "86400")),
+}
+# How long past its TTL a response is still served while being refreshed in the background (s)
+NASA_CACHE_STALE = float(os.getenv("NASA_CACHE_STALE", "86400"))
+
+# Upstream rate limit (requests/s, 0 disables) and retry policy for feed shards
+NASA_RATE_LIMIT = float(os.getenv("NASA_RATE_LIMIT", "10"))
+NASA_RATE_BURST = int(os.getenv("NASA_RATE_BURST", "10"))
+NASA_RETRIES = int(os.getenv("NASA_RETRIES", "3"))
+NASA_BACKOFF = float(os.getenv("NASA_BACKOFF", "0.5"))
+
+# Circuit breaker: consecutive failures that open it, seconds until one probe is let through
+NASA_BREAKER_FAILURES = int(os.getenv("NASA_BREAKER_FAILURES", "5"))
+NASA_BREAKER_RESET = float(os.getenv("NASA_BREAKER_RESET", "30"))
+# A backup request is sent when the first hasn't answered after this many seconds (0 disables)
+NASA_HEDGE_DELAY = float(os.getenv("NASA_HEDGE_DELAY", "2"))
+
+FEED_WINDOW_DAYS = 7   # NeoWs /feed limit per request
+# Longest /feed range served; every 7-day shard of it is one request against the rate-limited key
+MAX_FEED_DAYS = int(os.getenv("NASA_MAX_FEED_DAYS", "366"))
+BROWSE_PAGE_SIZE = 20  # NeoWs /neo/browse limit per page
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def check_feed_range(start: date, end: date, max_days: int = MAX_FEED_DAYS):
+    """ValueError unless [start, end] is a forward range of at most max_days dates"""
+    if end < start:
+        raise ValueError("end_date must not be before start_date")
+    if (end - start).days + 1 > max_days:
+        raise ValueError(f"Date range spans {(end - start).days + 1} days, the limit is {max_days}")
+
+
+def split_range(start: date, end: date, days: int = FEED_WINDOW_DAYS, max_days: int = MAX_FEED_DAYS) -> list:
+    """Split [start, end] into consecutive (start, end) shards of at most `days` dates"""
+    check_feed_range(start, end, max_days)
+    shards = []
+    shard_start = start
+    while shard_start <= end:
+        shard_end = min(shard_start + timedelta(days=days - 1), end)
+        shards.append((shard_start, shard_end))
+        shard_start = shard_end + timedelta(days=1)
+    return shards
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling NeoWs while the circuit breaker is open"""
+
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitBreaker:
+    """
+    Fails fast after `failures` consecutive upstream failures (transport errors, timeouts,
+    429 and 5xx; other 4xx mean the upstream is up). After `reset_timeout` seconds one
+    probe request is let through: success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failures: int = NASA_BREAKER_FAILURES, reset_timeout: float = NASA_BREAKER_RESET):
+        self.failure_threshold = max(1, failures)
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opened = 0
+        self.rejected = 0
+        self._probing = False
+
+    def _allow(self):
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+        if self.state == OPEN or (self.state == HALF_OPEN and self._probing):
+            self.rejected += 1
+            raise CircuitOpenError(f"NeoWs circuit open after {self.failures} consecutive failures")
+        if self.state == HALF_OPEN:
+            self._probing = True
+
+    def _record(self, failed: bool):
+        self._probing = False
+        if not failed:
+            self.state, self.failures = CLOSED, 0
+            return
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.opened += 1
+            self.state, self.opened_at = OPEN, time.monotonic()
+
+    async def call(self, fetch):
+        """Await fetch() unless the circuit is open, recording the outcome"""
+        self._allow()
+        try:
+            result = await fetch()
+        except asyncio.CancelledError:
+            self._probing = False   # abandoned by the caller: no verdict on the upstream
+            raise
+        except Exception as e:
+            self._record(is_retryable(e))
+            raise
+        self._record(False)
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "open": int(self.state == OPEN),
+            "consecutive_failures": self.failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+class RateLimiter:
+    """Async token bucket: `rate` requests per second with bursts of up to `burst`"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = None
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def reset(self):
+        self._lock = None
+
+
+class NeoWsClient:
+    """
+    Async NASA NeoWs client on one pooled keep-alive session.
+    Concurrent requests are capped per host; the session is created lazily on
+    first use so it binds to the running event loop. Every request goes through a
+    circuit breaker, is hedged after `hedge_delay` and bounded by its timeout overall.
+    """
+
+    def __init__(self, base_url: str, api_key: str, max_connections: int = NASA_MAX_CONNECTIONS,
+                 max_keepalive: int = NASA_MAX_KEEPALIVE, max_per_host: int = NASA_MAX_PER_HOST,
+                 timeout: float = NASA_TIMEOUT, cache: TTLCache = None,
+                 rate_limit: float = NASA_RATE_LIMIT, rate_burst: int = NASA_RATE_BURST,
+                 retries: int = NASA_RETRIES, backoff: float = NASA_BACKOFF,
+                 breaker: CircuitBreaker = None, hedge_delay: float = NASA_HEDGE_DELAY):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.cache = cache
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge_delay = hedge_delay
+        self.hedged = 0
+        self._rate_limiter = RateLimiter(rate_limit, rate_burst)
+        self._session = None
+        self._host_limits = {}
+
+    def _get_session(self) -> httpx.AsyncClient:
+        if self._session is None:
+            self._session = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive,
+                ),
+                timeout=self.timeout,
+            )
+        return self._session
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.max_per_host)
+        return self._host_limits[host]
+
+    async def get_json(self, path: str, params: dict = None, timeout: float = None, kind: str = None) -> dict:
+        """
+        GET {base_url}{path} with the API key attached, raising on non-2xx responses.
+        Responses of a given `kind` go through the cache when one is configured.
+        """
+        if self.cache is None or kind is None:
+            data, _ = await self._fetch(path, params, timeout)
+            return data
+
+        key = (kind, path, tuple(sorted((params or {}).items())))
+        return await self.cache.get_or_fetch(key, kind, lambda: self._fetch(path, params, timeout))
+
+    async def _fetch(self, path: str, params: dict, timeout: float):
+        """(data, size) of one GET, all attempts included done within `timeout` seconds"""
+        url = f"{self.base_url}{path}"
+        params = dict(params or {}, api_key=self.api_key)
+        endpoint = path.split("/")[1]   # "feed" / "neo", without the object id
+        timeout = timeout if timeout is not None else self.timeout
+
+        try:
+            response = await self.breaker.call(
+                lambda: asyncio.wait_for(self._hedged(url, params, timeout), timeout)
+            )
+            with span("nasa_parse"):
+                data = response.json()
+        except Exception:
+            count_upstream(endpoint, "error")
+            raise
+        count_upstream(endpoint, "ok")
+        return data, len(response.content)
+
+    async def _get(self, url: str, params: dict, timeout: float) -> httpx.Response:
+        with span("nasa_wait"):
+            await self._rate_limiter.acquire()
+        async with self._host_limit(url):
+            with span("nasa_fetch"):
+                response = await self._get_session().get(url, params=params, timeout=timeout)
+        response.raise_for_status()
+        return response
+
+    async def _hedged(self, url: str, params: dict, timeout: float) -> httpx.Response:
+        """
+        GET that sends one backup request when the first hasn't answered within
+        hedge_delay; the first response wins and the other request is cancelled
+        """
+        attempts = [asyncio.create_task(self._get(url, params, timeout))]
+        hedge = self.hedge_delay if self.hedge_delay > 0 else None
+        try:
+            while True:
+                done, _ = await asyncio.wait(attempts, timeout=hedge, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    self.hedged += 1
+                    hedge = None
+                    attempts.append(asyncio.create_task(self._get(url, params, timeout)))
+                    continue
+                for task in done:
+                    attempts.remove(task)
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+                if not attempts:
+                    raise error
+        finally:
+            for task in attempts:
+                task.cancel()
+
+    def stats(self) -> dict:
+        """Circuit breaker state and hedged request count"""
+        return dict(self.breaker.stats(), hedged=self.hedged)
+
+    async def feed(self, start_date: str = None, end_date: str = None, timeout: float = None) -> dict:
+        """/feed for a date range (NeoWs defaults to the next 7 days when omitted)"""
+        params = {}
+        if start_date:
+            params['start_date'] = start_date
+        if end_date:
+            params['end_date'] = end_date
+        return await self.get_json("/feed", params, timeout, kind="feed")
+
+    async def with_retry(self, call):
+        """Await call() with exponential backoff (plus jitter) on transport errors, 429 and 5xx"""
+        for attempt in range(self.retries + 1):
+            try:
+                return await call()
+            except Exception as e:
+                if attempt == self.retries or not is_retryable(e):
+                    raise
+                await asyncio.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random()))
+
+    async def feed_with_retry(self, start_date: str, end_date: str) -> dict:
+        return await self.with_retry(lambda: self.feed(start_date, end_date))
+
+    async def iter_feed_windows(self, windows: list):
+        """
+        Fetch (start, end) date windows concurrently, bounded by the per-host cap and
+        rate limit. Yields (index, data) in completion order.
+        """
+        async def fetch(i, window_start, window_end):
+            return i, await self.feed_with_retry(window_start.isoformat(), window_end.isoformat())
+
+        tasks = [asyncio.create_task(fetch(i, a, b)) for i, (a, b) in enumerate(windows)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def iter_feed_range(self, start: date, end: date):
+        """
+        /feed over an arbitrary range: 7-day shards fetched concurrently, yielded as
+        (shard_start, shard_end, data) in date order as soon as every earlier shard is in
+        """
+        shards = split_range(start, end)
+        done = {}
+        next_index = 0
+        async for i, data in self.iter_feed_windows(shards):
+            done[i] = data
+            while next_index in done:
+                yield shards[next_index][0], shards[next_index][1], done.pop(next_index)
+                next_index += 1
+
+    async def neo(self, asteroid_id: str, timeout: float = None) -> dict:
+        """/neo/{id} lookup for a single object"""
+        return await self.get_json(f"/neo/{asteroid_id}", timeout=timeout, kind="neo")
+
+    async def browse(self, page: int, size: int = BROWSE_PAGE_SIZE) -> dict:
+        """One /neo/browse page of the whole catalog, with retries; not cached"""
+        return await self.with_retry(lambda: self.get_json("/neo/browse", {"page": page, "size": size}))
+
+    async def iter_browse(self, start_page: int = 0, size: int = BROWSE_PAGE_SIZE, window: int = None):
+        """
+        Page through /neo/browse from start_page with up to `window` pages in flight
+        (default twice the per-host cap). Yields (page, total_pages, data) in page order.
+        """
+        first = await self.browse(start_page, size)
+        total = first["page"]["total_pages"]
+        yield start_page, total, first
+
+        window = window or 2 * self.max_per_host
+        pending = {}
+        next_fetch = start_page + 1
+        try:
+            for page in range(start_page + 1, total):
+                while next_fetch < total and next_fetch < page + window:
+                    pending[next_fetch] = asyncio.create_task(self.browse(next_fetch, size))
+                    next_fetch += 1
+                yield page, total, await pending.pop(page)
+        finally:
+            for task in pending.values():
+                task.cancel()
+
+    async def aclose(self):
+        if self._session is not None:
+            await self._session.aclose()
+        self._session = None
+        self._host_limits = {}
+        self._rate_limiter.reset()
@@ -0,0 +1,190 @@
+# backend/nasa_stub.py
+"""
+Local stand-in for the NASA NeoWs API, used by tests and benchmarks.
+Run standalone with `python nasa_stub.py` and point NASA_NEO_BASE at
+http://localhost:8001/neo/rest/v1
+"""
+import json
+import random
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+BASE_PATH = "/neo/rest/v1"
+NEOS_PER_DAY = 12
+CATALOG_SIZE = 35_000   # objects behind /neo/browse, about the real catalog
+
+
+def make_neo(neo_id: str, approach_date: str) -> dict:
+    """Deterministic NeoWs-shaped record for an id"""
+    rng = random.Random(neo_id)
+    diameter_min = rng.uniform(5, 2000)
+    return {
+        "id": neo_id,
+        "neo_reference_id": neo_id,
+        "name": f"({neo_id[-4:]} STUB)",
+        "nasa_jpl_url": f"https://ssd.jpl.nasa.gov/tools/sbdb_lookup.html#/?sstr={neo_id}",
+        "estimated_diameter": {
+            "meters": {
+                "estimated_diameter_min": diameter_min,
+                "estimated_diameter_max": diameter_min * 2.236,
+            }
+        },
+        "is_potentially_hazardous_asteroid": rng.random() < 0.1,
+        "close_approach_data": [{
+            "close_approach_date": approach_date,
+            "close_approach_date_full": f"{approach_date} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}",
+            "relative_velocity": {"kilometers_per_second": f"{rng.uniform(4, 40):.6f}"},
+            "miss_distance": {"kilometers": f"{rng.uniform(2e5, 7e7):.3f}"},
+            "orbiting_body": "Earth",
+        }],
+    }
+
+
+def make_catalog_neo(index: int) -> dict:
+    """Browse-shaped record: several close approaches, not all of them to Earth"""
+    neo_id = f"2{index:07d}"
+    neo = make_neo(neo_id, "2030-01-01")
+    rng = random.Random(f"{neo_id}-approaches")
+    neo["close_approach_data"] = [
+        {
+            "close_approach_date": f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "relative_velocity": {"kilometers_per_second": f"{rng.uniform(4, 40):.6f}"},
+            "miss_distance": {"kilometers": f"{rng.uniform(1e4, 7e7):.3f}"},
+            "orbiting_body": "Earth" if rng.random() < 0.8 else "Mars",
+        }
+        for year in sorted(rng.sample(range(1950, 2200), rng.randint(0, 4)))
+    ]
+    return neo
+
+
+def browse_payload(page: int, size: int, catalog_size: int) -> dict:
+    total_pages = -(-catalog_size // size)
+    indices = range(page * size, min((page + 1) * size, catalog_size))
+    return {
+        "page": {"size": size, "total_elements": catalog_size, "total_pages": total_pages, "number": page},
+        "near_earth_objects": [make_catalog_neo(i) for i in indices],
+    }
+
+
+def neo_id_for(day: date, index: int) -> str:
+    return f"3{day.toordinal():07d}{index:02d}"
+
+
+def feed_payload(start_date: str, end_date: str) -> dict:
+    start = date.fromisoformat(start_date)
+    end = date.fromisoformat(end_date)
+    by_date = {}
+    day = start
+    while day <= end:
+        by_date[day.isoformat()] = [make_neo(neo_id_for(day, i), day.isoformat()) for i in range(NEOS_PER_DAY)]
+        day += timedelta(days=1)
+    return {
+        "element_count": sum(len(v) for v in by_date.values()),
+        "near_earth_objects": by_date,
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, like the real API
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+        if server.delay:
+            time.sleep(server.delay)
+
+        parts = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        path = parts.path[len(BASE_PATH):] if parts.path.startswith(BASE_PATH) else parts.path
+
+        with server.lock:
+            failing = server.fail or server.fail_next > 0
+            server.fail_next = max(0, server.fail_next - 1)
+        if failing:
+            return self._send(503, {"error": "stub configured to fail"})
+
+        if path == "/feed":
+            start = query.get("start_date", date.today().isoformat())
+            end = query.get("end_date", (date.fromisoformat(start) + timedelta(days=7)).isoformat())
+            if (date.fromisoformat(end) - date.fromisoformat(start)).days > 7:
+                return self._send(400, {"error_message": "Date Format Exception - Expected format (yyyy-mm-dd) - The Feed date limit is only 7 Days"})
+            return self._send(200, feed_payload(start, end))
+
+        if path == "/neo/browse":
+            size = int(query.get("size", 20))
+            if size > 20:
+                return self._send(400, {"error_message": "size must be at most 20"})
+            return self._send(200, browse_payload(int(query.get("page", 0)), size, server.catalog_size))
+
+        if path.startswith("/neo/") and path.count("/") == 2:
+            neo_id = path.rsplit("/", 1)[1]
+            return self._send(200, make_neo(neo_id, date.today().isoformat()))
+
+        self._send(404, {"error": "not found"})
+
+    def _send(self, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class NeoWsStub:
+    """Stub server on a background thread; use as a context manager"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, delay: float = 0.0, catalog_size: int = CATALOG_SIZE):
+        self.server = ThreadingHTTPServer((host, port), StubHandler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.request_count = 0
+        self.server.delay = delay
+        self.server.catalog_size = catalog_size
+        self.server.fail = False
+        self.server.fail_next = 0
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}{BASE_PATH}"
+
+    @property
+    def request_count(self) -> int:
+        return self.server.request_count
+
+    def set_failing(self, fail: bool):
+        self.server.fail = fail
+
+    def fail_next(self, count: int):
+        """Answer the next `count` requests with 503"""
+        self.server.fail_next = count
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    stub = NeoWsStub(host="0.0.0.0", port=8001)
+    print(f"🛰️  NeoWs stub serving at {stub.base_url}")
+    stub.server.serve_forever()
@@ -0,0 +1,125 @@
+# backend/serve.py
+"""
+Production server. The app is imported once in a master process, which then forks
+WEB_WORKERS workers accepting on one shared listening socket. Everything loaded at
+import — code, the lookup grid and population raster (memory-mapped .npy files are
+shared through the page cache anyway), the model registry — stays shared copy-on-write
+between workers instead of being rebuilt per process, and a worker starts in
+milliseconds. Dead workers are replaced; SIGTERM / Ctrl+C drains them all.
+
+NumPy, the simulation package and the catalog / NASA clients are imported eagerly on
+purpose: imported lazily, each worker would load its own private copy on its first
+request, which is the per-worker RSS and first-request latency this preloading avoids.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "0")) or (os.cpu_count() or 1)
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+BACKLOG = int(os.getenv("LISTEN_BACKLOG", "2048"))
+RESPAWN_DELAY = 1.0   # s, between replacing workers that keep dying
+
+
+def bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(BACKLOG)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app_module, sock: socket.socket, log_level: str):
+    import uvicorn
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    app_module.after_fork()
+    config = uvicorn.Config(app_module.app, lifespan="on", log_level=log_level, access_log=False)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def spawn(app_module, sock: socket.socket, log_level: str) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            run_worker(app_module, sock, log_level)
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Impactor-2025 API, pre-forked production server")
+    parser.add_argument("--workers", type=int, default=WEB_WORKERS)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args(argv)
+    workers = max(1, args.workers)
+
+    # Each worker has its own simulation process pool: split the cores unless configured
+    os.environ.setdefault("SIM_WORKERS", str(max(1, (os.cpu_count() or 1) // workers)))
+
+    started = time.perf_counter()
+    import app as app_module
+
+    if not hasattr(os, "fork"):
+        import uvicorn
+        print("fork() unavailable, serving from a single process")
+        uvicorn.run(app_module.app, host=args.host, port=args.port, log_level=args.log_level)
+        return
+
+    sock = bind(args.host, args.port)
+    # The master never serves: no SQLite connection may cross the fork
+    if app_module.catalog is not None:
+        app_module.catalog.close()
+    # Objects from the import move to a permanent generation, so the workers' garbage
+    # collections don't write to (and so un-share) their pages
+    gc.collect()
+    gc.freeze()
+    print(f"🚀 App loaded in {time.perf_counter() - started:.2f}s; "
+          f"{workers} workers on http://{args.host}:{args.port} (ready: /ready)", flush=True)
+
+    children = {spawn(app_module, sock, args.log_level) for _ in range(workers)}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping:
+            print(f"Worker {pid} exited ({os.waitstatus_to_exitcode(status)}), starting a new one", file=sys.stderr)
+            time.sleep(RESPAWN_DELAY)
+            if not stopping:
+                children.add(spawn(app_module, sock, args.log_level))
+    sock.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,106 @@
+import time
+from contextlib import contextmanager
+
 import numpy as np
 
+from simulation import models
+from simulation.models import (
+    DEFAULT_MODEL, IMPACT_TYPE_THRESHOLDS, IMPACT_TYPES, ZONE_MULTIPLIERS, get_model, impact_types, projectile_mass,
+)
+
+# Receives (stage, seconds) for the model kernel and the column derivation of every
+# run_batch_simulation call, i.e. once per batch chunk or shard. The server installs its
+# metrics here; unset, nothing is timed
+_stage_observer = None
+
+
+def set_stage_observer(observer):
+    global _stage_observer
+    _stage_observer = observer
+
+
+def observe_stage(name: str, elapsed: float):
+    """Pass a stage timed elsewhere (e.g. in a pool worker) to the installed observer"""
+    if _stage_observer is not None:
+        _stage_observer(name, elapsed)
+
+
+@contextmanager
+def stage(name: str):
+    """Time the block into the installed stage observer, if any"""
+    if _stage_observer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - start)
+
+
+# Impact angle (degrees from horizontal) when a scenario doesn't give one; the most likely angle
+DEFAULT_ANGLE = 45.0
+
+# Severity buckets on Hiroshima-equivalents, shared by the scalar and batch paths
+SEVERITY_THRESHOLDS = np.array([10, 1000, 100000, 1000000], dtype=np.float64)
+SEVERITY_LEVELS = np.array(["MINOR", "MODERATE", "MAJOR", "CATASTROPHIC", "EXTINCTION LEVEL"])
+RISK_LEVELS = np.array(["Low", "Medium", "High", "Extreme", "Maximum"])
+SEVERITY_DESCRIPTIONS = np.array([
+    "Local damage only",
+    "City-level destruction",
+    "Regional catastrophe",
+    "Continental-scale disaster",
+    "Global mass extinction event",
+])
+
+# Display metadata of each damage zone and the radius column it takes its size from
+ZONE_STYLES = {
+    'crater_zone': {
+        'radius_column': 'epicenter',
+        'description': 'Complete destruction - vaporization',
+        'color': '#ff0000',
+        'intensity': 1.0
+    },
+    'thermal_zone': {
+        'radius_column': 'thermal_radius',
+        'description': 'Fireball & thermal radiation - everything burns',
+        'color': '#ff4400',
+        'intensity': 0.8
+    },
+    'shockwave_zone': {
+        'radius_column': 'shockwave_radius',
+        'description': 'Destructive shockwave - buildings destroyed',
+        'color': '#ff8800',
+        'intensity': 0.6
+    },
+    'earthquake_zone': {
+        'radius_column': 'earthquake_radius',
+        'description': 'Severe earthquakes - widespread damage',
+        'color': '#ffaa00',
+        'intensity': 0.4
+    },
+    'ejecta_zone': {
+        'radius_column': 'ejecta_radius',
+        'description': 'Debris fallout - moderate damage',
+        'color': '#ffff00',
+        'intensity': 0.2
+    },
+}
+
+# Radius columns every result's impact_zones carries, in km
+ZONE_RADIUS_COLUMNS = ('epicenter',) + tuple(ZONE_MULTIPLIERS)
+
+
 class ImpactCalculator:
     @staticmethod
     def calculate_kinetic_energy(diameter: float, velocity: float, density: float) -> float:
         """Calculate kinetic energy in joules"""
-        radius = diameter / 2  # meters
-        volume = (4/3) * np.pi * (radius ** 3)  # m³
-        mass = density * volume  # kg
-        kinetic_energy = 0.5 * mass * (velocity ** 2)  # joules
-        return kinetic_energy
+        return models.kinetic_energy(diameter, velocity, density)
 
     @staticmethod
     def calculate_crater_size(kinetic_energy: float, target_density: float = 2500) -> dict:
-        """Calculate crater dimensions using Pi-group scaling"""
-        energy_kt = kinetic_energy / (4.184e12)  # Convert to kilotons of TNT
-        
-        # For simple craters (small impacts)
-        diameter_m = 0.8 * (energy_kt ** 0.294) * 1000  # meters
-        depth_m = diameter_m / 5  # Simple depth estimate
-        
+        """Crater dimensions of the fast model (energy power law)"""
+        diameter_m, depth_m = models.energy_crater(kinetic_energy)
         return {
             'diameter': diameter_m,
             'depth': depth_m,
@@ -32,8 +114,7 @@ class ImpactCalculator:
         if energy_joules <= 0:
             return 0
         
-        magnitude = (2/3) * np.log10(energy_joules) - 5.87
-        return round(magnitude, 1)
+        return round(float(seismic_magnitude(energy_joules)), 1)
 
     @staticmethod
     def energy_comparisons(kinetic_energy: float) -> dict:
@@ -46,29 +127,8 @@ class ImpactCalculator:
         annual_energy_consumption = 5.8e20  # joules (global, 2020)
         
         hiroshima_equivalent = kinetic_energy / hiroshima_bomb
-        
-        # Severity classification
-        if hiroshima_equivalent < 10:
-            severity = "MINOR"
-            risk_level = "Low"
-            description = "Local damage only"
-        elif hiroshima_equivalent < 1000:
-            severity = "MODERATE" 
-            risk_level = "Medium"
-            description = "City-level destruction"
-        elif hiroshima_equivalent < 100000:
-            severity = "MAJOR"
-            risk_level = "High" 
-            description = "Regional catastrophe"
-        elif hiroshima_equivalent < 1000000:
-            severity = "CATASTROPHIC"
-            risk_level = "Extreme"
-            description = "Continental-scale disaster"
-        else:
-            severity = "EXTINCTION LEVEL"
-            risk_level = "Maximum"
-            description = "Global mass extinction event"
-        
+        labels = severity_columns(hiroshima_equivalent)
+
         return {
             'hiroshima_bombs': hiroshima_equivalent,
             'megaton_bombs': kinetic_energy / megaton_bomb,
@@ -76,9 +136,9 @@ class ImpactCalculator:
             'tsar_bombas': kinetic_energy / tsar_bomba,
             'chicxulub_fraction': kinetic_energy / chicxulub_impact,
             'global_energy_seconds': kinetic_energy / (annual_energy_consumption / (365*24*3600)),
-            'severity_level': severity,
-            'risk_level': risk_level,
-            'description': description,
+            'severity_level': str(labels['severity_level']),
+            'risk_level': str(labels['risk_level']),
+            'description': str(labels['description']),
             'hiroshima_equivalent': hiroshima_equivalent
         }
 
@@ -93,70 +153,259 @@ class ImpactCalculator:
         earthquake_radius = base_radius * 15  # Significant seismic effects
         ejecta_radius = base_radius * 8  # Debris and ejecta
         
-        return {
+        return impact_zones({
             'epicenter': base_radius,
             'thermal_radius': thermal_radius,
-            'shockwave_radius': shockwave_radius, 
+            'shockwave_radius': shockwave_radius,
             'earthquake_radius': earthquake_radius,
             'ejecta_radius': ejecta_radius,
-            'crater_zone': {
-                'radius': base_radius,
-                'description': 'Complete destruction - vaporization',
-                'color': '#ff0000',
-                'intensity': 1.0
-            },
-            'thermal_zone': {
-                'radius': thermal_radius,
-                'description': 'Fireball & thermal radiation - everything burns',
-                'color': '#ff4400', 
-                'intensity': 0.8
-            },
-            'shockwave_zone': {
-                'radius': shockwave_radius,
-                'description': 'Destructive shockwave - buildings destroyed',
-                'color': '#ff8800',
-                'intensity': 0.6
-            },
-            'earthquake_zone': {
-                'radius': earthquake_radius,
-                'description': 'Severe earthquakes - widespread damage',
-                'color': '#ffaa00',
-                'intensity': 0.4
-            },
-            'ejecta_zone': {
-                'radius': ejecta_radius,
-                'description': 'Debris fallout - moderate damage',
-                'color': '#ffff00',
-                'intensity': 0.2
-            }
+        })
+
+
+def impact_zones(radii: dict) -> dict:
+    """The impact_zones of a result: zone radii by column name plus one styled entry per zone"""
+    zones = dict(radii)
+    for name, style in ZONE_STYLES.items():
+        zones[name] = {
+            'radius': zones[style['radius_column']],
+            'description': style['description'],
+            'color': style['color'],
+            'intensity': style['intensity']
         }
+    return zones
 
 
 # Add the missing run_simulation function for NASA asteroid simulations
-def run_simulation(diameter: float, velocity: float, density: float, lat: float, lon: float):
-    """Compatibility function for NASA asteroid simulations"""
-    velocity_ms = velocity * 1000
-    
-    kinetic_energy = ImpactCalculator.calculate_kinetic_energy(diameter, velocity_ms, density)
-    crater = ImpactCalculator.calculate_crater_size(kinetic_energy)
-    magnitude = ImpactCalculator.calculate_seismic_magnitude(kinetic_energy)
-    comparisons = ImpactCalculator.energy_comparisons(kinetic_energy)
-    impact_zones = ImpactCalculator.calculate_impact_zones(
-        crater['radius'] / 1000,
-        kinetic_energy / (4.184e15)
-    )
-    
+def run_simulation(diameter: float, velocity: float, density: float, lat: float, lon: float,
+                   angle: float = DEFAULT_ANGLE, model: str = DEFAULT_MODEL):
+    """Compatibility function for NASA asteroid simulations; one row of run_batch_simulation"""
+    columns = run_batch_simulation([diameter], [velocity], [density], [lat], [lon], [angle], model)
+    return next(iter_batch_rows(columns))
+
+
+def seismic_magnitude(kinetic_energy) -> np.ndarray:
+    """Seismic magnitude of an impact energy in joules, unrounded (zero for non-positive energy)"""
+    kinetic_energy = np.asarray(kinetic_energy, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(kinetic_energy > 0, (2/3) * np.log10(kinetic_energy) - 5.87, 0.0)
+
+
+def seismic_magnitude_batch(kinetic_energy) -> np.ndarray:
+    """Array version of calculate_seismic_magnitude (same rounding, zero for non-positive energy)"""
+    return np.round(seismic_magnitude(kinetic_energy), 1)
+
+
+# Numeric output columns of run_batch_simulation, in a fixed order for packed buffers
+BATCH_FLOAT_COLUMNS = (
+    "diameter_m", "velocity_ms", "density_kgm3", "angle_deg", "lat", "lon", "mass_kg",
+    "kinetic_energy_joules", "kinetic_energy_megatons",
+    "crater_diameter_km", "crater_depth_km", "crater_radius_km", "seismic_magnitude",
+    "hiroshima_bombs", "megaton_bombs", "krakatoa_eruptions", "tsar_bombas",
+    "chicxulub_fraction", "global_energy_seconds",
+    "epicenter", "thermal_radius", "shockwave_radius", "earthquake_radius", "ejecta_radius",
+)
+
+
+def batch_output_columns(model: str = DEFAULT_MODEL) -> tuple:
+    """Numeric columns a batch run of `model` produces: the shared ones, then the model's extras"""
+    return BATCH_FLOAT_COLUMNS + get_model(model).extra_columns
+
+
+def severity_columns(hiroshima_equivalent) -> dict:
+    """Bucket Hiroshima-equivalents into the energy_comparisons severity labels"""
+    bucket = np.searchsorted(SEVERITY_THRESHOLDS, hiroshima_equivalent, side='right')
     return {
+        "severity_level": SEVERITY_LEVELS[bucket],
+        "risk_level": RISK_LEVELS[bucket],
+        "description": SEVERITY_DESCRIPTIONS[bucket],
+    }
+
+
+def label_columns(columns: dict) -> dict:
+    """String columns derived from the numeric ones: severity labels and impact type"""
+    labels = severity_columns(columns["hiroshima_bombs"])
+    labels["impact_type"] = impact_types(columns["diameter_m"])
+    return labels
+
+
+def label_codes(columns: dict) -> dict:
+    """label_columns dictionary-encoded: name -> (categories, uint8 codes into them)"""
+    severity = np.searchsorted(SEVERITY_THRESHOLDS, columns["hiroshima_bombs"], side='right').astype(np.uint8)
+    impact_type = np.searchsorted(IMPACT_TYPE_THRESHOLDS, columns["diameter_m"], side="right").astype(np.uint8)
+    return {
+        "severity_level": (SEVERITY_LEVELS, severity),
+        "risk_level": (RISK_LEVELS, severity),
+        "description": (SEVERITY_DESCRIPTIONS, severity),
+        "impact_type": (IMPACT_TYPES, impact_type),
+    }
+
+
+def run_batch_simulation(diameter, velocity, density, lat=None, lon=None, angle=None,
+                         model: str = DEFAULT_MODEL) -> dict:
+    """Vectorized run_simulation over arrays of scenarios, returns a dict of columns"""
+    impact_model = get_model(model)
+    diameter = np.asarray(diameter, dtype=np.float64)
+    velocity_ms = np.asarray(velocity, dtype=np.float64) * 1000
+    density = np.asarray(density, dtype=np.float64)
+    # Missing angles (None) take the default
+    angle = np.full(diameter.shape, DEFAULT_ANGLE) if angle is None else np.asarray(angle, dtype=np.float64)
+    diameter, velocity_ms, density, angle = np.broadcast_arrays(diameter, velocity_ms, density, angle)
+
+    # Missing coordinates (None) become NaN
+    lat = np.full(diameter.shape, np.nan) if lat is None else np.asarray(lat, dtype=np.float64)
+    lon = np.full(diameter.shape, np.nan) if lon is None else np.asarray(lon, dtype=np.float64)
+
+    with stage(f"model_{impact_model.name}"):
+        kernel = impact_model.evaluate(diameter, velocity_ms, density, angle)
+    with stage("impact_columns"):
+        return impact_columns(diameter, velocity_ms, density, angle, lat, lon, kernel, impact_model.extra_columns)
+
+
+def impact_columns(diameter, velocity_ms, density, angle, lat, lon, kernel: dict, extra_columns=()) -> dict:
+    """Every output column from a model kernel's energy and crater; shared by all models"""
+    kinetic_energy = kernel["kinetic_energy_joules"]
+    crater_radius_km = kernel["crater_diameter_m"] / 2000
+    zone_radius_km = kernel.get("zone_radius_km", crater_radius_km)
+
+    magnitude = seismic_magnitude_batch(kernel.get("ground_energy_joules", kinetic_energy))
+
+    hiroshima_equivalent = kinetic_energy / 6.3e13
+
+    columns = {
+        "diameter_m": diameter,
+        "velocity_ms": velocity_ms,
+        "density_kgm3": density,
+        "angle_deg": angle,
+        "lat": lat,
+        "lon": lon,
+        "mass_kg": projectile_mass(diameter, density),
         "kinetic_energy_joules": kinetic_energy,
         "kinetic_energy_megatons": kinetic_energy / (4.184e15),
-        "crater_diameter_km": crater['diameter'] / 1000,
-        "crater_depth_km": crater['depth'] / 1000,
-        "crater_radius_km": crater['radius'] / 1000,
+        "crater_diameter_km": kernel["crater_diameter_m"] / 1000,
+        "crater_depth_km": kernel["crater_depth_m"] / 1000,
+        "crater_radius_km": crater_radius_km,
         "seismic_magnitude": magnitude,
-        "comparisons": comparisons,
-        "impact_zones": impact_zones,
-        "impact_location": {
-            "lat": lat,
-            "lon": lon
+        "hiroshima_bombs": hiroshima_equivalent,
+        "megaton_bombs": kinetic_energy / 4.184e15,
+        "krakatoa_eruptions": kinetic_energy / 8.4e17,
+        "tsar_bombas": kinetic_energy / 2.1e17,
+        "chicxulub_fraction": kinetic_energy / 4.2e23,
+        "global_energy_seconds": kinetic_energy / (5.8e20 / (365*24*3600)),
+        "epicenter": zone_radius_km,
+    }
+    for name, multiplier in ZONE_MULTIPLIERS.items():
+        columns[name] = zone_radius_km * multiplier
+    for name in extra_columns:
+        columns[name] = kernel[name]
+    columns.update(label_columns(columns))
+
+    return columns
+
+
+def _column_values(columns: dict) -> dict:
+    return {name: col.tolist() if isinstance(col, np.ndarray) else col for name, col in columns.items()}
+
+
+def _extras(values: dict, i: int) -> dict:
+    """Model-specific outputs of one scenario; NaN (not applicable) becomes None"""
+    extras = {}
+    for name in models.extra_column_names():
+        if name in values:
+            value = values[name][i]
+            extras[name] = None if value != value else value
+    return extras
+
+
+def iter_batch_rows(columns: dict):
+    """Yield per-scenario dicts shaped like run_simulation output from batch columns"""
+    values = _column_values(columns)
+    n = len(values["kinetic_energy_joules"])
+    exposure = values.get("population_exposure")
+
+    for i in range(n):
+        lat, lon = values["lat"][i], values["lon"][i]
+        row = {
+            "kinetic_energy_joules": values["kinetic_energy_joules"][i],
+            "kinetic_energy_megatons": values["kinetic_energy_megatons"][i],
+            "crater_diameter_km": values["crater_diameter_km"][i],
+            "crater_depth_km": values["crater_depth_km"][i],
+            "crater_radius_km": values["crater_radius_km"][i],
+            "seismic_magnitude": values["seismic_magnitude"][i],
+            "comparisons": {
+                'hiroshima_bombs': values["hiroshima_bombs"][i],
+                'megaton_bombs': values["megaton_bombs"][i],
+                'krakatoa_eruptions': values["krakatoa_eruptions"][i],
+                'tsar_bombas': values["tsar_bombas"][i],
+                'chicxulub_fraction': values["chicxulub_fraction"][i],
+                'global_energy_seconds': values["global_energy_seconds"][i],
+                'severity_level': values["severity_level"][i],
+                'risk_level': values["risk_level"][i],
+                'description': values["description"][i],
+                'hiroshima_equivalent': values["hiroshima_bombs"][i]
+            },
+            "impact_zones": impact_zones({name: values[name][i] for name in ZONE_RADIUS_COLUMNS}),
+            "impact_location": None if np.isnan(lat) or np.isnan(lon) else {
+                "lat": lat,
+                "lon": lon
+            }
         }
-    }
\ No newline at end of file
+        row.update(_extras(values, i))
+        if exposure is not None:
+            row["population_exposure"] = exposure[i]
+        yield row
+
+
+def iter_impact_summaries(columns: dict):
+    """Yield scenarios in the flat per-impactor shape: inputs, mass, energy, crater and impact type"""
+    values = _column_values(columns)
+    for i, simulation in enumerate(iter_batch_rows(columns)):
+        row = {
+            "diameter_m": values["diameter_m"][i],
+            "density_kgm3": values["density_kgm3"][i],
+            "velocity_ms": values["velocity_ms"][i],
+            "angle_deg": values["angle_deg"][i],
+            "mass_kg": values["mass_kg"][i],
+            "energy_joules": values["kinetic_energy_joules"][i],
+            "energy_megatons": values["kinetic_energy_megatons"][i],
+            "crater_diameter_km": values["crater_diameter_km"][i],
+            "crater_radius_km": values["crater_radius_km"][i],
+            "seismic_magnitude": values["seismic_magnitude"][i],
+            "impact_type": values["impact_type"][i],
+        }
+        row["comparisons"] = simulation["comparisons"]
+        row["impact_zones"] = simulation["impact_zones"]
+        row.update(_extras(values, i))
+        yield row
+
+
+def impact_summary(columns: dict) -> dict:
+    """The first (usually only) scenario of batch columns in the flat per-impactor shape"""
+    return next(iter_impact_summaries(columns))
+
+
+def batch_to_rows(columns: dict) -> list:
+    """Expand batch columns into per-scenario dicts shaped like run_simulation output"""
+    return list(iter_batch_rows(columns))
+
+
+def iter_batch_simulation(diameter, velocity, density, lat=None, lon=None, chunk_rows: int = 10_000,
+                          augment=None, angle=None, model: str = DEFAULT_MODEL):
+    """
+    Stream run_simulation-shaped rows, computing chunk_rows scenarios at a time.
+    augment(columns) may add extra columns per chunk (e.g. population exposure).
+    """
+    n = len(diameter)
+    for start in range(0, n, chunk_rows):
+        stop = min(start + chunk_rows, n)
+        columns = run_batch_simulation(
+            diameter[start:stop],
+            velocity[start:stop],
+            density[start:stop],
+            None if lat is None else lat[start:stop],
+            None if lon is None else lon[start:stop],
+            None if angle is None else angle[start:stop],
+            model
+        )
+        if augment is not None:
+            columns.update(augment(columns))
+        yield from iter_batch_rows(columns)
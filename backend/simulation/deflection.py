@@ -0,0 +1,283 @@
+import numpy as np
+
+# Heliocentric two-body constants (km, s)
+MU_SUN = 1.32712440018e11        # km³/s²
+AU_KM = 1.495978707e8
+EARTH_RADIUS_KM = 6371.0
+EARTH_MU = 398600.4418           # km³/s²
+EARTH_ORBIT_SPEED = float(np.sqrt(MU_SUN / AU_KM))   # circular, km/s
+EARTH_ESCAPE_SPEED = float(np.sqrt(2 * EARTH_MU / EARTH_RADIUS_KM))
+DAY_S = 86400.0
+
+# Default encounter geometry: angle of the hyperbolic excess velocity from Earth's
+# direction of motion (in the ecliptic) and above the ecliptic
+DEFAULT_APPROACH_AZIMUTH = 135.0
+DEFAULT_APPROACH_ELEVATION = 0.0
+
+DEFLECTION_DIRECTIONS = ("along_track", "radial", "normal")
+KEPLER_TOLERANCE = 1e-10
+KEPLER_MAX_ITERATIONS = 60
+MAX_SWEEP_POINTS = 2_000_000
+
+
+def stumpff(z):
+    """Stumpff C(z), S(z) for the universal-variable formulation, vectorized"""
+    z = np.asarray(z, dtype=np.float64)
+    C = np.empty_like(z)
+    S = np.empty_like(z)
+    small = np.abs(z) < 1e-6
+    pos = (z > 0) & ~small
+    neg = (z < 0) & ~small
+
+    s = np.sqrt(z[pos])
+    C[pos] = (1 - np.cos(s)) / z[pos]
+    S[pos] = (s - np.sin(s)) / s ** 3
+    s = np.sqrt(-z[neg])
+    C[neg] = (np.cosh(s) - 1) / -z[neg]
+    S[neg] = (np.sinh(s) - s) / s ** 3
+    zs = z[small]
+    C[small] = 0.5 - zs / 24 + zs ** 2 / 720
+    S[small] = 1 / 6 - zs / 120 + zs ** 2 / 5040
+    return C, S
+
+
+def propagate(r0, v0, dt, mu: float = MU_SUN):
+    """
+    Two-body propagation of state vectors (..., 3) by dt seconds (negative goes back),
+    via Lagrange f and g coefficients. The universal anomaly is solved with Laguerre's
+    iteration, which converges from a crude start for elliptic and hyperbolic orbits alike.
+    """
+    r0 = np.asarray(r0, dtype=np.float64)
+    v0 = np.asarray(v0, dtype=np.float64)
+    dt = np.asarray(dt, dtype=np.float64)
+    shape = np.broadcast_shapes(r0.shape[:-1], v0.shape[:-1], dt.shape)
+    r0 = np.broadcast_to(r0, shape + (3,))
+    v0 = np.broadcast_to(v0, shape + (3,))
+    dt = np.broadcast_to(dt, shape)
+
+    sqrt_mu = np.sqrt(mu)
+    r0_mag = np.linalg.norm(r0, axis=-1)
+    rv = np.einsum("...i,...i->...", r0, v0) / sqrt_mu
+    alpha = 2 / r0_mag - np.einsum("...i,...i->...", v0, v0) / mu
+
+    # Initial guesses after Vallado: exact for circular orbits, asymptotic for hyperbolic ones
+    chi = np.where(alpha > 0, sqrt_mu * alpha * dt, sqrt_mu * dt / r0_mag)
+    hyperbolic = (alpha < -1e-12) & (dt != 0)
+    if np.any(hyperbolic):
+        a = 1 / alpha[hyperbolic]
+        t = dt[hyperbolic]
+        sign = np.sign(t)
+        arg = (-2 * mu * alpha[hyperbolic] * t) / (
+            rv[hyperbolic] * sqrt_mu + sign * np.sqrt(-mu * a) * (1 - r0_mag[hyperbolic] * alpha[hyperbolic])
+        )
+        guess = sign * np.sqrt(-a) * np.log(np.abs(arg))
+        chi[hyperbolic] = np.where(np.isfinite(guess), guess, chi[hyperbolic])
+
+    for _ in range(KEPLER_MAX_ITERATIONS):
+        z = alpha * chi ** 2
+        C, S = stumpff(z)
+        chi2 = chi ** 2
+        F = rv * chi2 * C + (1 - alpha * r0_mag) * chi2 * chi * S + r0_mag * chi - sqrt_mu * dt
+        dF = rv * chi * (1 - z * S) + (1 - alpha * r0_mag) * chi2 * C + r0_mag
+        ddF = rv * (1 - z * C) + (1 - alpha * r0_mag) * chi * (1 - z * S)
+        n = 5
+        root = np.sqrt(np.abs((n - 1) ** 2 * dF ** 2 - n * (n - 1) * F * ddF))
+        step = n * F / (dF + np.copysign(root, dF))
+        chi = chi - step
+        if np.all(np.abs(step) <= KEPLER_TOLERANCE * np.maximum(1.0, np.abs(chi))):
+            break
+
+    z = alpha * chi ** 2
+    C, S = stumpff(z)
+    chi2 = chi ** 2
+    f = 1 - chi2 / r0_mag * C
+    g = dt - chi2 * chi * S / sqrt_mu
+    r = f[..., None] * r0 + g[..., None] * v0
+    r_mag = np.linalg.norm(r, axis=-1)
+    fdot = sqrt_mu / (r_mag * r0_mag) * (z * chi * S - chi)
+    gdot = 1 - chi2 / r_mag * C
+    v = fdot[..., None] * r0 + gdot[..., None] * v0
+    return r, v
+
+
+def _unit(x):
+    return x / np.linalg.norm(x, axis=-1, keepdims=True)
+
+
+def v_infinity(impact_velocity_km_s):
+    """
+    Hyperbolic excess speed for an impact velocity. Above Earth's escape speed the velocity
+    is an atmospheric-entry speed and loses the escape speed (v_inf² = v² - v_esc²); nothing
+    arriving from afar enters slower than that, so a velocity at or below it is read as v_inf.
+    """
+    v = np.asarray(impact_velocity_km_s, dtype=np.float64)
+    if not np.all(np.isfinite(v) & (v > 0)):
+        raise ValueError("Impact velocity must be a positive number of km/s")
+    return np.where(v > EARTH_ESCAPE_SPEED, np.sqrt(np.maximum(v ** 2 - EARTH_ESCAPE_SPEED ** 2, 0.0)), v)
+
+
+def entry_speed(impact_velocity_km_s):
+    """Atmospheric-entry speed for an impact velocity, read the way v_infinity reads it"""
+    return np.hypot(v_infinity(impact_velocity_km_s), EARTH_ESCAPE_SPEED)
+
+
+def capture_radius(v_inf):
+    """b-plane radius that still hits Earth once gravitational focusing is included (km)"""
+    return EARTH_RADIUS_KM * np.sqrt(1 + EARTH_ESCAPE_SPEED ** 2 / np.asarray(v_inf) ** 2)
+
+
+def encounter_state(impact_velocity_km_s: float, azimuth_deg: float = DEFAULT_APPROACH_AZIMUTH,
+                    elevation_deg: float = DEFAULT_APPROACH_ELEVATION):
+    """
+    Heliocentric states at the nominal impact epoch (t = 0): Earth on a circular 1 AU
+    orbit at (1 AU, 0, 0), the impactor at Earth's centre moving at Earth's velocity
+    plus v_inf along the given approach direction. Returns (r, v_impactor, v_earth, v_inf).
+    """
+    v_inf = float(v_infinity(impact_velocity_km_s))
+    az, el = np.radians(azimuth_deg), np.radians(elevation_deg)
+    # Earth moves along +y; azimuth is measured from there towards -x (sunward)
+    direction = np.array([-np.sin(az) * np.cos(el), np.cos(az) * np.cos(el), np.sin(el)])
+    r = np.array([AU_KM, 0.0, 0.0])
+    v_earth = np.array([0.0, EARTH_ORBIT_SPEED, 0.0])
+    return r, v_earth + v_inf * direction, v_earth, v_inf
+
+
+def deflection_basis(r, v, direction: str):
+    """Unit vector for an impulse along the track, the radial direction or the orbit normal"""
+    if direction not in DEFLECTION_DIRECTIONS:
+        raise ValueError(f"Unknown deflection direction '{direction}', expected one of {', '.join(DEFLECTION_DIRECTIONS)}")
+    track = _unit(v)
+    if direction == "along_track":
+        return track
+    normal = _unit(np.cross(r, v))
+    if direction == "normal":
+        return normal
+    return np.cross(track, normal)
+
+
+def b_plane_axes(u):
+    """Öpik b-plane frame for relative velocity u: (xi, zeta) with zeta towards ecliptic north"""
+    u_hat = _unit(u)
+    north = np.array([0.0, 0.0, 1.0])
+    zeta = _unit(north - np.einsum("...i,i->...", u_hat, north)[..., None] * u_hat)
+    xi = np.cross(zeta, u_hat)
+    return xi, zeta, u_hat
+
+
+def deflect(lead_time_days, delta_v_ms, impact_velocity_km_s: float, direction: str = "along_track",
+            azimuth_deg: float = DEFAULT_APPROACH_AZIMUTH, elevation_deg: float = DEFAULT_APPROACH_ELEVATION) -> dict:
+    """
+    Miss distance in the b-plane for every (lead time, delta-v) pair, in one vectorized pass.
+
+    The nominal impactor is propagated back by each lead time, kicked by delta_v along
+    `direction`, and both the kicked and unkicked states are propagated forward to the
+    nominal epoch. Their position difference, projected onto the b-plane of the
+    encounter, is the linearized miss distance (timing shifts along the approach
+    direction drop out). Differencing against the unkicked run cancels the propagator's
+    round-off, which is large next to millimetre-per-second kicks at 1 AU.
+
+    lead_time_days and delta_v_ms broadcast against each other; outputs share their shape.
+    """
+    lead = np.asarray(lead_time_days, dtype=np.float64)
+    dv = np.asarray(delta_v_ms, dtype=np.float64) / 1000.0   # km/s
+    if np.any(lead < 0):
+        raise ValueError("Lead times must be non-negative")
+    lead, dv = np.broadcast_arrays(lead, dv)
+    if lead.size > MAX_SWEEP_POINTS:
+        raise ValueError(f"Sweep has {lead.size} points, the limit is {MAX_SWEEP_POINTS}")
+
+    r_imp, v_imp, v_earth, v_inf = encounter_state(impact_velocity_km_s, azimuth_deg, elevation_deg)
+
+    # Back-propagate once per distinct lead time, then fan out over delta-v
+    leads, inverse = np.unique(lead, return_inverse=True)
+    dt = leads * DAY_S
+    r0, v0 = propagate(r_imp, v_imp, -dt)
+    r_nominal, v_nominal = propagate(r0, v0, dt)
+    kick = deflection_basis(r0, v0, direction)
+
+    idx = inverse.reshape(lead.shape)
+    r1, v1 = propagate(r0[idx], v0[idx] + dv[..., None] * kick[idx], dt[idx])
+
+    offset = r1 - r_nominal[idx]
+    relative = v_nominal[idx] - v_earth
+    xi_hat, zeta_hat, u_hat = b_plane_axes(relative)
+    xi = np.einsum("...i,...i->...", offset, xi_hat)
+    zeta = np.einsum("...i,...i->...", offset, zeta_hat)
+    miss = np.hypot(xi, zeta)
+    capture = float(capture_radius(v_inf))
+    # Offset along the approach direction only changes the arrival time
+    timing = -np.einsum("...i,...i->...", offset, u_hat) / np.linalg.norm(relative, axis=-1)
+
+    return {
+        "miss_distance_km": miss,
+        "xi_km": xi,
+        "zeta_km": zeta,
+        "timing_shift_s": timing,
+        "impact_avoided": miss > capture,
+        "capture_radius_km": capture,
+        "v_infinity_km_s": v_inf,
+        "entry_velocity_km_s": float(entry_speed(impact_velocity_km_s)),
+    }
+
+
+def shifted_impact_point(lat: float, lon: float, xi_km: float, zeta_km: float, capture_km: float):
+    """
+    Approximate new impact point for a miss inside the capture radius: the original point
+    is taken as the centre hit and moved by the central angle asin(b / capture radius),
+    with zeta read as north and xi as east. Returns None when the impact is avoided.
+    """
+    b = float(np.hypot(xi_km, zeta_km))
+    if b >= capture_km:
+        return None
+    angle = np.arcsin(b / capture_km)
+    bearing = np.arctan2(xi_km, zeta_km)
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2 = np.arcsin(np.sin(lat1) * np.cos(angle) + np.cos(lat1) * np.sin(angle) * np.cos(bearing))
+    lon2 = lon1 + np.arctan2(np.sin(bearing) * np.sin(angle) * np.cos(lat1),
+                             np.cos(angle) - np.sin(lat1) * np.sin(lat2))
+    return {"lat": float(np.degrees(lat2)), "lon": float((np.degrees(lon2) + 540) % 360 - 180)}
+
+
+def min_delta_v_sweep(lead_times_days, delta_v_ms, impact_velocity_km_s: float, direction: str = "along_track",
+                      margin: float = 1.0, azimuth_deg: float = DEFAULT_APPROACH_AZIMUTH,
+                      elevation_deg: float = DEFAULT_APPROACH_ELEVATION) -> dict:
+    """
+    Minimum delta-v per lead time that moves the b-plane miss distance past
+    margin x capture radius. The full (lead, delta-v) grid is evaluated in one deflect()
+    call; the threshold crossing is linearly interpolated between grid points.
+    None where no delta-v in the grid is enough.
+    """
+    leads = np.asarray(lead_times_days, dtype=np.float64).ravel()
+    dvs = np.sort(np.asarray(delta_v_ms, dtype=np.float64).ravel())
+    if leads.size == 0 or dvs.size == 0:
+        raise ValueError("Need at least one lead time and one delta-v")
+    if np.any(dvs < 0):
+        raise ValueError("delta-v values must be non-negative")
+    if not (np.isfinite(margin) and margin > 0):
+        raise ValueError("margin must be a positive number of capture radii")
+
+    result = deflect(leads[:, None], dvs[None, :], impact_velocity_km_s, direction, azimuth_deg, elevation_deg)
+    miss = result["miss_distance_km"]
+    threshold = margin * result["capture_radius_km"]
+
+    above = miss > threshold
+    found = above.any(axis=1)
+    first = np.argmax(above, axis=1)
+    prev = np.maximum(first - 1, 0)
+    rows = np.arange(leads.size)
+    m0, m1 = miss[rows, prev], miss[rows, first]
+    d0, d1 = dvs[prev], dvs[first]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        frac = np.where(m1 > m0, (threshold - m0) / (m1 - m0), 1.0)
+    minimum = np.where(first > 0, d0 + np.clip(frac, 0, 1) * (d1 - d0), d1)
+
+    return {
+        "lead_times_days": leads,
+        "delta_v_ms": dvs,
+        "min_delta_v_ms": np.where(found, minimum, np.nan),
+        "miss_distance_km": miss,
+        "capture_radius_km": result["capture_radius_km"],
+        "threshold_km": threshold,
+        "v_infinity_km_s": result["v_infinity_km_s"],
+        "entry_velocity_km_s": result["entry_velocity_km_s"],
+    }
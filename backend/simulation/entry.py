@@ -0,0 +1,182 @@
+import math
+
+import numpy as np
+
+# Exponential atmosphere
+SEA_LEVEL_DENSITY = 1.225      # kg/m³
+SCALE_HEIGHT = 8000.0          # m
+ENTRY_ALTITUDE = 100_000.0     # m, where integration starts
+
+EARTH_RADIUS_M = 6.371e6
+GRAVITY = 9.81                 # m/s²
+
+DRAG_COEFFICIENT = 2.0
+HEAT_TRANSFER_COEFFICIENT = 0.1
+ABLATION_HEAT = 8e6            # J/kg to ablate stony material
+PANCAKE_FACTOR = 7.0           # spread (in initial radii) at which the pancake bursts
+
+DEFAULT_TIME_STEP = 0.02       # s
+MAX_ENTRY_TIME = 600.0         # s, bodies still aloft after this are stopped where they are
+STALL_FRACTION = 1e-3          # bodies left with this share of their entry energy have deposited it all
+
+# Energy deposition profile bins (m): 1 km from the ground to the entry altitude
+PROFILE_BIN = 1000.0
+
+
+def yield_strength(density):
+    """Bulk strength in Pa from density (Collins et al. 2005 fit): ~0.3 MPa for stone, ~6 MPa for iron"""
+    return 10 ** (2.107 + 0.0624 * np.sqrt(density))
+
+
+def _derivatives(state: np.ndarray, density: np.ndarray, fragmented: np.ndarray) -> np.ndarray:
+    """
+    Time derivatives of (velocity, mass, path angle below horizontal, altitude, radius,
+    radial spread rate) for every active body: drag, ablation, gravity, curvature,
+    and the pancake spreading of Chyba et al. (1993) once fragmented
+    """
+    v, m, theta, z, r, spread = state
+    air = SEA_LEVEL_DENSITY * np.exp(-z / SCALE_HEIGHT)
+    area = np.pi * r * r
+    sin_t, cos_t = np.sin(theta), np.cos(theta)
+
+    derivatives = np.empty_like(state)
+    derivatives[0] = -DRAG_COEFFICIENT * air * area * v * v / (2 * m) + GRAVITY * sin_t
+    derivatives[1] = -HEAT_TRANSFER_COEFFICIENT * air * area * v ** 3 / (2 * ABLATION_HEAT)
+    derivatives[2] = (GRAVITY / v - v / (EARTH_RADIUS_M + z)) * cos_t
+    derivatives[3] = -v * sin_t
+    derivatives[4] = spread
+    derivatives[5] = np.where(fragmented, DRAG_COEFFICIENT * air * v * v / (2 * density * r), 0.0)
+    return derivatives
+
+
+def integrate_entry(diameter, velocity_ms, density, angle_deg, dt: float = DEFAULT_TIME_STEP,
+                    profile: bool = False, trajectory: bool = False) -> dict:
+    """
+    Fixed-step RK4 entry of many bodies at once, all stepped together. A body leaves the
+    active set as soon as it reaches the ground, spreads to PANCAKE_FACTOR x its radius
+    (airburst: the rest of its energy is released there), or is slowed to a stall, so
+    each step only costs as much as the bodies still flying.
+
+    Returns per-body columns: breakup_altitude_m (NaN if never fragmented),
+    burst_altitude_m (NaN for ground impacts), peak_deposition_altitude_m (largest dE/dz),
+    ground_velocity_ms and ground_mass_kg (0 for airbursts), energy_deposited_joules
+    (into the atmosphere), airburst, and with profile=True an (n, bins) energy deposition
+    profile in PROFILE_BIN altitude bins from the ground up. trajectory=True adds the state
+    after every step: time_s (steps + 1,) and (steps + 1, n) arrays of velocity_ms, mass_kg,
+    path_angle_rad, altitude_m and radius_m, NaN once a body has left the active set.
+    """
+    diameter, velocity_ms, density, angle_deg = (
+        np.ravel(x) for x in np.broadcast_arrays(*(np.asarray(x, dtype=np.float64)
+                                                   for x in (diameter, velocity_ms, density, angle_deg)))
+    )
+    if not dt > 0:
+        raise ValueError("dt must be positive")
+    n = diameter.size
+    radius0 = diameter / 2
+    mass0 = density * (4 / 3) * np.pi * radius0 ** 3
+    energy0 = 0.5 * mass0 * velocity_ms ** 2
+
+    breakup = np.full(n, np.nan)
+    burst = np.full(n, np.nan)
+    peak_dedz = np.zeros(n)
+    peak_altitude = np.full(n, np.nan)
+    ground_velocity = np.zeros(n)
+    ground_mass = np.zeros(n)
+    deposited = np.zeros(n)
+    bins = int(math.ceil(ENTRY_ALTITUDE / PROFILE_BIN))
+    deposition = np.zeros((n, bins)) if profile else None
+
+    # Active set: original index and state rows (v, m, theta, z, r, dr/dt)
+    active = np.arange(n)
+    state = np.stack([velocity_ms, mass0, np.radians(angle_deg), np.full(n, ENTRY_ALTITUDE), radius0, np.zeros(n)])
+    rho, strength = density.copy(), yield_strength(density)
+    fragmented = np.zeros(n, dtype=bool)
+    history = [state[:5].copy()] if trajectory else None
+
+    steps = int(math.ceil(MAX_ENTRY_TIME / dt))
+    for _ in range(steps):
+        if active.size == 0:
+            break
+
+        # Fragmentation starts once ram pressure exceeds the strength
+        v, z = state[0], state[3]
+        ram = SEA_LEVEL_DENSITY * np.exp(-z / SCALE_HEIGHT) * v * v
+        starts = ~fragmented & (ram > strength[active])
+        if starts.any():
+            fragmented |= starts
+            breakup[active[starts]] = z[starts]
+
+        k1 = _derivatives(state, rho[active], fragmented)
+        k2 = _derivatives(state + 0.5 * dt * k1, rho[active], fragmented)
+        k3 = _derivatives(state + 0.5 * dt * k2, rho[active], fragmented)
+        k4 = _derivatives(state + dt * k3, rho[active], fragmented)
+        new = state + dt / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+        new[1] = np.maximum(new[1], 0.0)
+        if trajectory:
+            row = np.full((5, n), np.nan)
+            row[:, active] = new[:5]
+            row[3, active] = np.maximum(new[3], 0.0)
+            history.append(row)
+
+        # Energy lost this step (kinetic, net of the little gravity adds) and where it went
+        lost = 0.5 * (state[1] * state[0] ** 2 - new[1] * new[0] ** 2)
+        drop = state[3] - new[3]
+        lost = np.maximum(lost, 0.0)
+        deposited[active] += lost
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dedz = np.where(drop > 0, lost / drop, 0.0)
+        higher = dedz > peak_dedz[active]
+        peak_dedz[active[higher]] = dedz[higher]
+        peak_altitude[active[higher]] = np.maximum(0.5 * (state[3] + new[3])[higher], 0.0)
+        if profile:
+            level = np.clip((0.5 * (state[3] + new[3]) // PROFILE_BIN).astype(np.int64), 0, bins - 1)
+            np.add.at(deposition, (active, level), lost)
+
+        # Early exit: drop bodies that hit the ground, burst or stalled
+        energy = 0.5 * new[1] * new[0] ** 2
+        ground = new[3] <= 0
+        spread_out = fragmented & (new[4] >= PANCAKE_FACTOR * radius0[active])
+        stalled = energy <= STALL_FRACTION * energy0[active]
+        airburst = ~ground & (spread_out | stalled)
+        done = ground | airburst
+        if done.any():
+            landed, burst_now = active[ground], active[airburst]
+            # Interpolate the ground crossing within the step
+            frac = np.clip(state[3][ground] / np.maximum(drop[ground], 1e-9), 0.0, 1.0)
+            ground_velocity[landed] = state[0][ground] + frac * (new[0][ground] - state[0][ground])
+            ground_mass[landed] = state[1][ground] + frac * (new[1][ground] - state[1][ground])
+            deposited[landed] -= (1 - frac) * lost[ground]
+
+            burst[burst_now] = new[3][airburst]
+            deposited[burst_now] += energy[airburst]
+            if profile:
+                level = np.clip((new[3][airburst] // PROFILE_BIN).astype(np.int64), 0, bins - 1)
+                np.add.at(deposition, (burst_now, level), energy[airburst])
+
+            keep = ~done
+            active, state, fragmented = active[keep], new[:, keep], fragmented[keep]
+        else:
+            state = new
+
+    # Anything still aloft at MAX_ENTRY_TIME has effectively stopped there
+    if active.size:
+        burst[active] = state[3]
+        deposited[active] += 0.5 * state[1] * state[0] ** 2
+
+    result = {
+        "breakup_altitude_m": breakup,
+        "burst_altitude_m": burst,
+        "peak_deposition_altitude_m": peak_altitude,
+        "ground_velocity_ms": ground_velocity,
+        "ground_mass_kg": ground_mass,
+        "energy_deposited_joules": np.minimum(deposited, energy0),
+        "airburst": ~np.isnan(burst),
+    }
+    if profile:
+        result["deposition_profile_joules"] = deposition
+    if trajectory:
+        history = np.stack(history, axis=1)
+        result["trajectory"] = {"time_s": dt * np.arange(history.shape[1])}
+        for name, values in zip(("velocity_ms", "mass_kg", "path_angle_rad", "altitude_m", "radius_m"), history):
+            result["trajectory"][name] = values
+    return result
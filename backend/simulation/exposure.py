@@ -0,0 +1,217 @@
+import json
+import math
+import os
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Footprint zones, innermost first: (zone name, zone-radius column of the batch output)
+EXPOSURE_ZONES = (
+    ("crater", "epicenter"),
+    ("ejecta", "ejecta_radius"),
+    ("earthquake", "earthquake_radius"),
+    ("shockwave", "shockwave_radius"),
+    ("thermal", "thermal_radius"),
+)
+
+RASTER_KINDS = ("count", "density")   # people per cell, or people per km²
+
+
+def cell_areas_km2(north: float, resolution: float, rows: int) -> np.ndarray:
+    """Area of one cell in each raster row: R² · Δλ · (sin φ_top − sin φ_bottom)"""
+    edges = np.radians(north - resolution * np.arange(rows + 1))
+    return EARTH_RADIUS_KM ** 2 * math.radians(resolution) * (np.sin(edges[:-1]) - np.sin(edges[1:]))
+
+
+def cap_area_km2(radius_km):
+    """Exact area of a spherical cap of great-circle radius radius_km"""
+    angle = np.minimum(np.asarray(radius_km, dtype=np.float64) / EARTH_RADIUS_KM, math.pi)
+    return 2 * math.pi * EARTH_RADIUS_KM ** 2 * (1 - np.cos(angle))
+
+
+def great_circle_km(lat1, lon1, lat2, lon2):
+    """Haversine distance in km; inputs in degrees, broadcast against each other"""
+    lat1, lon1, lat2, lon2 = (np.radians(x) for x in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class PopulationRaster:
+    """
+    Equirectangular population grid, row 0 at the north edge. Saved as .npy plus a .json
+    sidecar and memory-mapped on load, so only the rows a footprint covers are paged in.
+    """
+
+    def __init__(self, values: np.ndarray, north: float = 90.0, west: float = -180.0,
+                 resolution: float = None, kind: str = "count"):
+        if kind not in RASTER_KINDS:
+            raise ValueError(f"Unknown raster kind '{kind}', expected one of {', '.join(RASTER_KINDS)}")
+        self.values = values
+        self.rows, self.cols = values.shape
+        self.north = float(north)
+        self.west = float(west)
+        self.resolution = float(resolution if resolution is not None else 360.0 / self.cols)
+        self.kind = kind
+        self.global_lon = abs(self.cols * self.resolution - 360.0) < 1e-6
+
+        self.row_lat = self.north - self.resolution * (np.arange(self.rows) + 0.5)
+        self.col_lon = self.west + self.resolution * (np.arange(self.cols) + 0.5)
+        self.row_area = cell_areas_km2(self.north, self.resolution, self.rows)
+
+    @classmethod
+    def load(cls, path: str) -> "PopulationRaster":
+        with open(path + ".json") as f:
+            meta = json.load(f)
+        return cls(np.load(path, mmap_mode="r"), meta["north"], meta["west"], meta["resolution"],
+                   meta.get("kind", "count"))
+
+    def save(self, path: str):
+        np.save(path, np.ascontiguousarray(self.values, dtype=np.float32))
+        with open(path + ".json", "w") as f:
+            json.dump({"north": self.north, "west": self.west, "resolution": self.resolution,
+                       "kind": self.kind, "shape": [self.rows, self.cols]}, f)
+
+    @classmethod
+    def from_esri_ascii(cls, path: str, kind: str = "count") -> "PopulationRaster":
+        """Read an ESRI ASCII grid (the GPW / WorldPop text format); NODATA becomes 0"""
+        header = {}
+        with open(path) as f:
+            for _ in range(6):
+                key, value = f.readline().split()
+                header[key.lower()] = float(value)
+            values = np.loadtxt(f, dtype=np.float32)
+        nodata = header.get("nodata_value")
+        if nodata is not None:
+            values[values == nodata] = 0
+        resolution = header["cellsize"]
+        west = header.get("xllcorner", header.get("xllcenter", -180.0) - resolution / 2)
+        south = header.get("yllcorner", header.get("yllcenter", -90.0) - resolution / 2)
+        return cls(values, south + resolution * values.shape[0], west, resolution, kind)
+
+    def stats(self) -> dict:
+        return {"shape": [self.rows, self.cols], "resolution_deg": self.resolution,
+                "north": self.north, "west": self.west, "kind": self.kind}
+
+    # --- Footprints ---
+
+    def window(self, lat: float, lon: float, radius_km: float):
+        """Row slice and column indices whose cells can lie within radius_km of (lat, lon)"""
+        delta = min(radius_km / EARTH_RADIUS_KM, math.pi)
+        delta_deg = math.degrees(delta)
+        top = int(math.floor((self.north - (lat + delta_deg)) / self.resolution))
+        bottom = int(math.ceil((self.north - (lat - delta_deg)) / self.resolution))
+        rows = slice(max(top, 0), min(max(bottom, 0), self.rows))
+
+        # A cap reaching a pole spans every longitude; otherwise its half-width is asin(sin δ / cos φ)
+        if lat + delta_deg >= 90 or lat - delta_deg <= -90 or delta >= math.pi / 2:
+            return rows, np.arange(self.cols)
+        half_width = math.degrees(math.asin(min(1.0, math.sin(delta) / math.cos(math.radians(lat)))))
+        first = int(math.floor((lon - half_width - self.west) / self.resolution))
+        last = int(math.ceil((lon + half_width - self.west) / self.resolution))
+        if self.global_lon:
+            if last - first >= self.cols:
+                return rows, np.arange(self.cols)
+            return rows, np.arange(first, last) % self.cols
+        return rows, np.arange(max(first, 0), min(last, self.cols))
+
+    def exposure(self, lat: float, lon: float, radii_km) -> tuple:
+        """
+        Population within each great-circle radius of (lat, lon), plus the footprint area.
+
+        One distance grid over the largest footprint serves every radius: cells are binned
+        by the smallest radius containing their centre, then summed cumulatively. The
+        centre-in-disc count is rescaled from the covered cell area to the exact cap area,
+        which removes the staircase error of small discs; a disc that holds no cell centre
+        takes the density of the cell under the impact point.
+        Returns (population, area_km2) arrays aligned with radii_km.
+        """
+        radii = np.asarray(radii_km, dtype=np.float64)
+        order = np.argsort(radii)
+        sorted_radii = radii[order]
+        population = np.zeros(radii.shape)
+        area = cap_area_km2(np.maximum(radii, 0))
+        if radii.size == 0 or not sorted_radii[-1] > 0:
+            return population, area
+
+        rows, cols = self.window(lat, lon, sorted_radii[-1])
+        if rows.stop <= rows.start or cols.size == 0:
+            return population, area
+
+        block = np.asarray(self.values[rows][:, cols], dtype=np.float64)
+        block = np.where(block > 0, block, 0.0)   # NaN / negative nodata count as empty
+        cell_area = np.broadcast_to(self.row_area[rows, None], block.shape)
+        people = block if self.kind == "count" else block * cell_area
+
+        distance = great_circle_km(lat, lon, self.row_lat[rows, None], self.col_lon[None, cols])
+        zone = np.searchsorted(sorted_radii, distance, side="left").ravel()
+        bins = sorted_radii.size + 1
+        counted = np.cumsum(np.bincount(zone, weights=people.ravel(), minlength=bins))[:-1]
+        covered = np.cumsum(np.bincount(zone, weights=cell_area.ravel(), minlength=bins))[:-1]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scaled = counted * area[order] / covered
+        population[order] = np.where(covered > 0, scaled, self.density_at(lat, lon) * area[order])
+        return population, area
+
+    def density_at(self, lat: float, lon: float) -> float:
+        """People per km² in the cell containing (lat, lon); 0 outside the raster"""
+        row = int((self.north - lat) // self.resolution)
+        col = int((lon - self.west) // self.resolution)
+        if self.global_lon:
+            col %= self.cols
+        if not (0 <= row < self.rows and 0 <= col < self.cols):
+            return 0.0
+        value = float(self.values[row, col])
+        if not value > 0:
+            return 0.0
+        return value / self.row_area[row] if self.kind == "count" else value
+
+    def zone_exposure(self, lat: float, lon: float, zone_radii_km: dict) -> dict:
+        """Exposure per footprint zone for a single impact; zone_radii_km maps zone -> radius"""
+        names = list(zone_radii_km)
+        radii = [zone_radii_km[name] for name in names]
+        population, area = self.exposure(lat, lon, radii)
+        return {
+            name: {"radius_km": radius, "population": float(p), "area_km2": float(a)}
+            for name, radius, p, a in zip(names, radii, population, area)
+        }
+
+    def exposure_columns(self, columns: dict) -> dict:
+        """
+        Per-scenario exposure for batch output columns, as a `population_exposure` object
+        column (None where the scenario has no location)
+        """
+        lat, lon = columns["lat"], columns["lon"]
+        radii = np.stack([np.asarray(columns[column], dtype=np.float64) for _, column in EXPOSURE_ZONES], axis=-1)
+        exposures = []
+        for i in range(len(lat)):
+            if np.isnan(lat[i]) or np.isnan(lon[i]):
+                exposures.append(None)
+                continue
+            population, area = self.exposure(float(lat[i]), float(lon[i]), radii[i])
+            exposures.append({
+                name: {"radius_km": float(r), "population": float(p), "area_km2": float(a)}
+                for (name, _), r, p, a in zip(EXPOSURE_ZONES, radii[i], population, area)
+            })
+        return {"population_exposure": exposures}
+
+
+def zone_radii(impact_zones: dict) -> dict:
+    """Zone radii (km) out of a calculate_impact_zones result, in EXPOSURE_ZONES order"""
+    return {name: impact_zones[column] for name, column in EXPOSURE_ZONES}
+
+
+def load_population_raster(setting: str):
+    """
+    POPULATION_RASTER setting: "" disables; a .npy path (with .json sidecar) is memory-mapped;
+    an ESRI ASCII grid (.asc) is converted to .npy next to it on first use
+    """
+    if not setting:
+        return None
+    if setting.endswith(".asc"):
+        converted = setting[:-4] + ".npy"
+        if not os.path.exists(converted):
+            PopulationRaster.from_esri_ascii(setting).save(converted)
+        setting = converted
+    return PopulationRaster.load(setting)
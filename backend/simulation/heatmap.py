@@ -0,0 +1,264 @@
+import hashlib
+import json
+import math
+import os
+import zlib
+
+import numpy as np
+
+from simulation.calculations import DEFAULT_ANGLE, run_batch_simulation
+from simulation.exposure import EARTH_RADIUS_KM, EXPOSURE_ZONES, cell_areas_km2
+from simulation.models import DEFAULT_MODEL
+
+HEATMAP_METRICS = ("exposure", "frequency")
+DEFAULT_RESOLUTION = 0.25
+MAX_RESOLUTION = 1.0
+MAX_HEATMAP_CELLS = 3600 * 7200          # 0.05°
+DEFAULT_TILE_SIZE = 256
+TILE_DTYPE = "<f4"
+RASTER_CHUNK_ROWS = 512
+
+ZONE_COLUMNS = dict(EXPOSURE_ZONES)
+
+
+class HeatmapGrid:
+    """Global equirectangular grid, row 0 at 90°N and column 0 at 180°W"""
+
+    def __init__(self, resolution: float = DEFAULT_RESOLUTION):
+        rows = 180.0 / resolution
+        if not 0 < resolution <= MAX_RESOLUTION or abs(rows - round(rows)) > 1e-9:
+            raise ValueError(f"Resolution must divide 180° and be at most {MAX_RESOLUTION}°, got {resolution}")
+        self.resolution = float(resolution)
+        self.rows = int(round(rows))
+        self.cols = 2 * self.rows
+        if self.rows * self.cols > MAX_HEATMAP_CELLS:
+            raise ValueError(f"{self.rows}x{self.cols} cells exceeds the limit of {MAX_HEATMAP_CELLS}")
+        self.res_rad = math.radians(self.resolution)
+        self.row_lat = np.radians(90.0 - self.resolution * (np.arange(self.rows) + 0.5))
+        self.row_area = cell_areas_km2(90.0, self.resolution, self.rows)
+
+    def half_widths(self, lat_rad, row_lat_rad, angle):
+        """
+        Longitude half-width (radians) of a great-circle disc of `angle` radians centred at
+        lat_rad, measured along rows at row_lat_rad; NaN where the row misses the disc,
+        π where the whole row is inside
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            c = (np.cos(angle) - np.sin(lat_rad) * np.sin(row_lat_rad)) / (np.cos(lat_rad) * np.cos(row_lat_rad))
+        return np.where(c <= -1 + 1e-12, np.pi, np.where(c > 1, np.nan, np.arccos(np.clip(c, -1, 1))))
+
+
+def aggregate_population(raster, grid: HeatmapGrid) -> np.ndarray:
+    """People per heatmap cell from a PopulationRaster, streamed over raster row chunks"""
+    counts = np.zeros(grid.rows * grid.cols)
+    col_index = np.floor((raster.col_lon + 180.0) / grid.resolution).astype(np.int64) % grid.cols
+    for start in range(0, raster.rows, RASTER_CHUNK_ROWS):
+        stop = min(start + RASTER_CHUNK_ROWS, raster.rows)
+        block = np.asarray(raster.values[start:stop], dtype=np.float64)
+        block = np.where(block > 0, block, 0.0)
+        if raster.kind == "density":
+            block = block * raster.row_area[start:stop, None]
+        row_index = np.clip(np.floor((90.0 - raster.row_lat[start:stop]) / grid.resolution).astype(np.int64),
+                            0, grid.rows - 1)
+        cells = row_index[:, None] * grid.cols + col_index[None, :]
+        counts += np.bincount(cells.ravel(), weights=block.ravel(), minlength=counts.size)
+    return counts.reshape(grid.rows, grid.cols)
+
+
+def exposure_map(counts: np.ndarray, grid: HeatmapGrid, radius_km: float) -> np.ndarray:
+    """
+    People within radius_km of every cell centre (impact at that cell), for all cells.
+
+    Each source row is turned into a wrapped prefix sum once; a centre row then reads the
+    disc's chord on that row as one slice difference per column, so the cost is
+    O(rows x rows-in-band x cols) instead of O(cells x cells-in-disc).
+    """
+    angle = min(radius_km / EARTH_RADIUS_KM, math.pi)
+    rows, cols = grid.rows, grid.cols
+    result = np.zeros((rows, cols))
+    band = int(math.ceil(angle / grid.res_rad)) + 1
+
+    for j in range(rows):
+        row = counts[j]
+        total = row.sum()
+        if total == 0:
+            continue
+        prefix = np.concatenate(([0.0], np.cumsum(np.concatenate((row, row, row)))))
+
+        centres = np.arange(max(j - band, 0), min(j + band, rows - 1) + 1)
+        widths = grid.half_widths(grid.row_lat[centres], grid.row_lat[j], angle)
+        for i, width in zip(centres, widths):
+            if np.isnan(width):
+                continue
+            k = int(math.floor(width / grid.res_rad + 1e-9))
+            if 2 * k + 1 >= cols:
+                result[i] += total
+            else:
+                result[i] += prefix[cols + k + 1:2 * cols + k + 1] - prefix[cols - k:2 * cols - k]
+    return result
+
+
+def frequency_map(grid: HeatmapGrid, lat, lon, radius_km, weight) -> np.ndarray:
+    """
+    Summed weight of the scenario footprints covering each cell. Every scenario touches
+    only the rows of its disc, as one column interval per row written into a difference
+    array, so the work is independent of the grid size.
+    """
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.asarray(lon, dtype=np.float64)
+    angle = np.minimum(np.asarray(radius_km, dtype=np.float64) / EARTH_RADIUS_KM, np.pi)
+    weight = np.asarray(weight, dtype=np.float64)
+    rows, cols = grid.rows, grid.cols
+
+    # Expand every scenario into its band of rows
+    top = np.clip(np.floor((np.pi / 2 - (lat + angle)) / grid.res_rad - 0.5), 0, rows - 1).astype(np.int64)
+    bottom = np.clip(np.ceil((np.pi / 2 - (lat - angle)) / grid.res_rad - 0.5), 0, rows - 1).astype(np.int64)
+    counts = bottom - top + 1
+    scenario = np.repeat(np.arange(lat.size), counts)
+    row = top[scenario] + (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+
+    width = grid.half_widths(lat[scenario], grid.row_lat[row], angle[scenario])
+    hit = ~np.isnan(width)
+    scenario, row, width = scenario[hit], row[hit], width[hit]
+    w = weight[scenario]
+
+    # Cells whose centre longitude is within the half-width
+    centre = (lon[scenario] + 180.0) / grid.resolution - 0.5
+    span = np.degrees(width) / grid.resolution
+    first = np.ceil(centre - span - 1e-9).astype(np.int64)
+    last = np.floor(centre + span + 1e-9).astype(np.int64)
+    full = (last - first + 1 >= cols) | (width >= np.pi)
+
+    diff = np.zeros((rows, cols + 1))
+    np.add.at(diff, (row[full], 0), w[full])
+    np.add.at(diff, (row[full], cols), -w[full])
+
+    part = ~full & (last >= first)
+    row, first, last, w = row[part], first[part], last[part], w[part]
+    start = first % cols
+    end = last % cols
+    wraps = end < start
+    # Contiguous intervals
+    np.add.at(diff, (row[~wraps], start[~wraps]), w[~wraps])
+    np.add.at(diff, (row[~wraps], end[~wraps] + 1), -w[~wraps])
+    # Intervals crossing the antimeridian split into [start, cols) and [0, end]
+    np.add.at(diff, (row[wraps], start[wraps]), w[wraps])
+    np.add.at(diff, (row[wraps], cols), -w[wraps])
+    np.add.at(diff, (row[wraps], 0), w[wraps])
+    np.add.at(diff, (row[wraps], end[wraps] + 1), -w[wraps])
+
+    return np.cumsum(diff, axis=1)[:, :cols]
+
+
+def zone_radii_km(impactors: list, zone: str, model: str = DEFAULT_MODEL) -> np.ndarray:
+    """Zone radius for each {diameter, velocity, density, angle} impactor, from one batch run"""
+    if zone not in ZONE_COLUMNS:
+        raise ValueError(f"Unknown zone '{zone}', expected one of {', '.join(ZONE_COLUMNS)}")
+    columns = run_batch_simulation(
+        [i["diameter"] for i in impactors],
+        [i["velocity"] for i in impactors],
+        [i.get("density", 3000.0) for i in impactors],
+        angle=[i.get("angle", DEFAULT_ANGLE) for i in impactors],
+        model=model
+    )
+    return columns[ZONE_COLUMNS[zone]]
+
+
+def build_heatmap(metric: str, zone: str, resolution: float = DEFAULT_RESOLUTION, impactors: list = None,
+                  scenarios: list = None, population=None, model: str = DEFAULT_MODEL) -> np.ndarray:
+    """
+    exposure:  for every cell, people inside the zone if the impactors hit there,
+               summed over impactors by weight (needs a population raster)
+    frequency: for every cell, summed weight of the located scenarios whose zone covers it
+    """
+    if metric not in HEATMAP_METRICS:
+        raise ValueError(f"Unknown metric '{metric}', expected one of {', '.join(HEATMAP_METRICS)}")
+    grid = HeatmapGrid(resolution)
+
+    if metric == "exposure":
+        if population is None:
+            raise ValueError("The exposure heatmap needs a population raster (POPULATION_RASTER)")
+        if not impactors:
+            raise ValueError("The exposure heatmap needs at least one impactor")
+        counts = aggregate_population(population, grid)
+        radii = zone_radii_km(impactors, zone, model)
+        values = np.zeros((grid.rows, grid.cols))
+        # Impactors sharing a radius share one pass
+        for radius in np.unique(radii):
+            weight = sum(i.get("weight", 1.0) for i, r in zip(impactors, radii) if r == radius)
+            values += weight * exposure_map(counts, grid, float(radius))
+        return values
+
+    if not scenarios:
+        raise ValueError("The frequency heatmap needs at least one located scenario")
+    radii = zone_radii_km(scenarios, zone, model)
+    return frequency_map(
+        grid,
+        [s["lat"] for s in scenarios],
+        [s["lon"] for s in scenarios],
+        radii,
+        [s.get("weight", 1.0) for s in scenarios],
+    )
+
+
+def heatmap_id(params: dict) -> str:
+    """Content address of a heatmap request"""
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:20]
+
+
+class HeatmapStore:
+    """
+    Heatmaps on disk as tiles: {root}/{id}/meta.json plus {ty}_{tx}.f32z for every
+    non-empty tile, each a zlib-compressed little-endian float32 array in row-major order.
+    Tile (0, 0) is the north-west corner; edge tiles are smaller when the grid doesn't divide.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _dir(self, heatmap_id: str) -> str:
+        if not heatmap_id.isalnum():
+            raise KeyError(heatmap_id)
+        return os.path.join(self.root, heatmap_id)
+
+    def save(self, heatmap_id: str, values: np.ndarray, meta: dict, tile_size: int = DEFAULT_TILE_SIZE) -> dict:
+        directory = self._dir(heatmap_id)
+        os.makedirs(directory, exist_ok=True)
+        rows, cols = values.shape
+        tiles = []
+        for ty in range(math.ceil(rows / tile_size)):
+            for tx in range(math.ceil(cols / tile_size)):
+                tile = values[ty * tile_size:(ty + 1) * tile_size, tx * tile_size:(tx + 1) * tile_size]
+                if not np.any(tile):
+                    continue
+                with open(os.path.join(directory, f"{ty}_{tx}.f32z"), "wb") as f:
+                    f.write(zlib.compress(np.ascontiguousarray(tile, dtype=TILE_DTYPE).tobytes(), 6))
+                tiles.append([ty, tx])
+
+        meta = dict(meta, id=heatmap_id, rows=rows, cols=cols, tile_size=tile_size, dtype="float32",
+                    tiles_y=math.ceil(rows / tile_size), tiles_x=math.ceil(cols / tile_size), tiles=tiles,
+                    max=float(values.max()), total=float(values.sum()))
+        tmp = os.path.join(directory, "meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(directory, "meta.json"))   # meta last: its presence marks a complete heatmap
+        return meta
+
+    def meta(self, heatmap_id: str):
+        try:
+            with open(os.path.join(self._dir(heatmap_id), "meta.json")) as f:
+                return json.load(f)
+        except (KeyError, FileNotFoundError):
+            return None
+
+    def tile(self, meta: dict, ty: int, tx: int):
+        """(compressed bytes, (height, width)); bytes is None for an empty tile"""
+        if not (0 <= ty < meta["tiles_y"] and 0 <= tx < meta["tiles_x"]):
+            raise KeyError((ty, tx))
+        size = meta["tile_size"]
+        shape = (min(size, meta["rows"] - ty * size), min(size, meta["cols"] - tx * size))
+        path = os.path.join(self._dir(meta["id"]), f"{ty}_{tx}.f32z")
+        if not os.path.exists(path):
+            return None, shape
+        with open(path, "rb") as f:
+            return f.read(), shape
@@ -0,0 +1,286 @@
+import numpy as np
+
+from simulation.entry import integrate_entry, yield_strength
+
+# Model used when a request doesn't name one
+DEFAULT_MODEL = "fast"
+
+JOULES_PER_KILOTON = 4.184e12
+JOULES_PER_MEGATON = 4.184e15
+
+GRAVITY = 9.81                 # m/s²
+TARGET_DENSITY = 2500.0        # kg/m³, crustal rock
+SIMPLE_COMPLEX_DIAMETER = 3200.0   # m, final diameter where terrestrial craters turn complex
+
+# Exponential atmosphere and entry constants (Collins, Melosh & Marcus 2005)
+SEA_LEVEL_DENSITY = 1.0        # kg/m³, the value the Collins fit uses
+SCALE_HEIGHT = 8000.0          # m
+DRAG_COEFFICIENT = 2.0
+PANCAKE_FACTOR = 7.0           # spread (in initial diameters) at which the pancake bursts
+
+# Slant range of severe blast damage for a 1 kt burst, scaled by yield^(1/3); calibrated so
+# a ~10 Mt burst near 8 km flattens ~20 km around ground zero, as at Tunguska
+BLAST_RANGE_1KT_KM = 1.0
+
+# Zone radius multipliers applied to the zone base radius (the crater radius, for cratering models)
+ZONE_MULTIPLIERS = {
+    'thermal_radius': 50,
+    'shockwave_radius': 25,
+    'earthquake_radius': 15,
+    'ejecta_radius': 8,
+}
+
+# Impact type by projectile diameter (m): below 25, below 100, below 1000, the rest
+IMPACT_TYPE_THRESHOLDS = np.array([25, 100, 1000], dtype=np.float64)
+IMPACT_TYPES = np.array(["airburst / local", "regional", "continental", "global"])
+
+
+def projectile_mass(diameter, density):
+    """Mass in kg of a sphere of `diameter` m and `density` kg/m³"""
+    return density * (4 / 3) * np.pi * (diameter / 2) ** 3
+
+
+def kinetic_energy(diameter, velocity_ms, density):
+    """Kinetic energy in joules"""
+    return 0.5 * projectile_mass(diameter, density) * velocity_ms ** 2
+
+
+def energy_crater(kinetic_energy):
+    """Crater (diameter, depth) in m from a power law on impact energy alone"""
+    energy_kt = kinetic_energy / JOULES_PER_KILOTON
+    diameter_m = 0.8 * (energy_kt ** 0.294) * 1000
+    return diameter_m, diameter_m / 5
+
+
+def pi_scaling_crater(diameter, velocity_ms, density, angle_deg):
+    """
+    Collins et al. (2005) form of Holsapple-Schmidt pi-group scaling in rock:
+    transient crater from projectile size, speed, density ratio, gravity and impact angle,
+    collapsed to a simple (1.25 x) or complex final crater. Returns (final diameter,
+    depth, transient diameter) in m.
+    """
+    sin_angle = np.sin(np.radians(angle_deg))
+    transient = (1.161 * (density / TARGET_DENSITY) ** (1 / 3) * diameter ** 0.78
+                 * velocity_ms ** 0.44 * GRAVITY ** -0.22 * np.cbrt(sin_angle))
+    simple = 1.25 * transient
+    is_complex = simple > SIMPLE_COMPLEX_DIAMETER
+    with np.errstate(divide="ignore", invalid="ignore"):
+        complex_diameter = 1.17 * transient ** 1.13 / SIMPLE_COMPLEX_DIAMETER ** 0.13
+        complex_depth = 400.0 * (complex_diameter / 1000) ** 0.3
+    final = np.where(is_complex, complex_diameter, simple)
+    depth = np.where(is_complex, complex_depth, simple / 5)
+    return final, depth, transient
+
+
+def blast_ground_range_km(energy_joules, altitude_m):
+    """Ground range (km) of severe blast damage from `energy_joules` released at `altitude_m`"""
+    slant = BLAST_RANGE_1KT_KM * np.cbrt(np.maximum(energy_joules, 0) / JOULES_PER_KILOTON)
+    height = np.maximum(altitude_m, 0) / 1000
+    return np.sqrt(np.maximum(slant ** 2 - height ** 2, 0))
+
+
+def atmospheric_entry(diameter, velocity_ms, density, angle_deg) -> dict:
+    """
+    Analytic entry of Collins et al. (2005): drag without ablation until aerodynamic
+    stress exceeds the yield strength, then a pancake that spreads until it reaches
+    PANCAKE_FACTOR x its initial diameter (airburst) or the ground.
+    Returns breakup altitude (m, NaN when intact), burst altitude (m, NaN when the body
+    reaches the ground), the velocity there, and whether it burst in the air.
+    """
+    sin_angle = np.sin(np.radians(angle_deg))
+    strength = yield_strength(density)
+    k = 3 * DRAG_COEFFICIENT * SCALE_HEIGHT / (4 * density * diameter * sin_angle)
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        # Breakup: I_f >= 1 means the body stays intact down to the surface
+        breakup_factor = 4.07 * DRAG_COEFFICIENT * SCALE_HEIGHT * strength / (
+            density * diameter * velocity_ms ** 2 * sin_angle)
+        root = np.sqrt(np.maximum(1 - breakup_factor, 0))
+        breakup = -SCALE_HEIGHT * (np.log(strength / (SEA_LEVEL_DENSITY * velocity_ms ** 2))
+                                   + 1.308 - 0.314 * breakup_factor - 1.303 * root)
+        breaks = (breakup_factor < 1) & (breakup > 0)
+        breakup = np.where(breaks, breakup, 0.0)
+        air_density = SEA_LEVEL_DENSITY * np.exp(-breakup / SCALE_HEIGHT)
+        breakup_velocity = velocity_ms * np.exp(-k * air_density)
+
+        # Pancake spreading: dispersion length and the altitude where it reaches the burst size
+        dispersion = diameter * sin_angle * np.sqrt(density / (DRAG_COEFFICIENT * air_density))
+        burst = breakup - 2 * SCALE_HEIGHT * np.log1p(
+            dispersion / (2 * SCALE_HEIGHT) * np.sqrt(PANCAKE_FACTOR ** 2 - 1))
+        airburst = breaks & (burst > 0)
+        end = np.where(airburst, burst, 0.0)
+
+        # Drag on the growing pancake from breakup down to `end`, integrated in closed form
+        s = (breakup - end) / (2 * SCALE_HEIGHT)
+        a2 = (2 * SCALE_HEIGHT / dispersion) ** 2
+        e2, e3, e4 = np.expm1(2 * s), np.expm1(3 * s), np.expm1(4 * s)
+        integral = 2 * SCALE_HEIGHT * (e2 / 2 + a2 * (e4 / 4 - 2 * e3 / 3 + e2 / 2))
+        pancake_velocity = breakup_velocity * np.exp(
+            -k / SCALE_HEIGHT * air_density * integral)
+
+    end_velocity = np.where(breaks, pancake_velocity, velocity_ms * np.exp(-k * SEA_LEVEL_DENSITY))
+    return {
+        "breakup_altitude_m": np.where(breaks, breakup, np.nan),
+        "burst_altitude_m": np.where(airburst, burst, np.nan),
+        "end_velocity_ms": end_velocity,
+        "airburst": airburst,
+    }
+
+
+# --- Kernels: (diameter m, velocity m/s, density kg/m³, angle deg) arrays in, columns out ---
+# Every kernel returns kinetic_energy_joules (at entry), crater_diameter_m and crater_depth_m,
+# and may add ground_energy_joules (what reaches the surface, for the seismic estimate),
+# zone_radius_km (base of the damage-zone ladder, else the crater radius) and its extra columns.
+
+def fast_kernel(diameter, velocity_ms, density, angle_deg) -> dict:
+    energy = kinetic_energy(diameter, velocity_ms, density)
+    crater_diameter, crater_depth = energy_crater(energy)
+    return {
+        "kinetic_energy_joules": energy,
+        "crater_diameter_m": crater_diameter,
+        "crater_depth_m": crater_depth,
+    }
+
+
+def pi_scaling_kernel(diameter, velocity_ms, density, angle_deg) -> dict:
+    crater_diameter, crater_depth, transient = pi_scaling_crater(diameter, velocity_ms, density, angle_deg)
+    return {
+        "kinetic_energy_joules": kinetic_energy(diameter, velocity_ms, density),
+        "crater_diameter_m": crater_diameter,
+        "crater_depth_m": crater_depth,
+        "transient_crater_diameter_km": transient / 1000,
+    }
+
+
+def entry_outcome(diameter, velocity_ms, density, angle_deg, airburst, burst_altitude_m, ground_velocity_ms,
+                  ground_mass_kg=None) -> dict:
+    """
+    Kernel columns for an entry outcome. What reaches the ground craters at its slowed speed,
+    as a sphere of its remaining mass; a body that bursts leaves no crater. The blast sets the
+    shockwave zone: the whole entry energy released at the burst altitude for an airburst,
+    or what reaches the surface for a ground impact.
+    """
+    mass = projectile_mass(diameter, density)
+    if ground_mass_kg is None:
+        ground_mass_kg = mass
+    energy = 0.5 * mass * velocity_ms ** 2
+    ground_energy = np.where(airburst, 0.0, 0.5 * ground_mass_kg * ground_velocity_ms ** 2)
+
+    remnant = np.cbrt(6 * ground_mass_kg / (np.pi * density))
+    crater_diameter, crater_depth, _ = pi_scaling_crater(remnant, ground_velocity_ms, density, angle_deg)
+    crater_diameter = np.where(airburst, 0.0, crater_diameter)
+    crater_depth = np.where(airburst, 0.0, crater_depth)
+
+    blast_km = blast_ground_range_km(
+        np.where(airburst, energy, ground_energy), np.where(airburst, burst_altitude_m, 0.0)
+    )
+    zone_radius = np.maximum(crater_diameter / 2000, blast_km / ZONE_MULTIPLIERS['shockwave_radius'])
+
+    return {
+        "kinetic_energy_joules": energy,
+        "crater_diameter_m": crater_diameter,
+        "crater_depth_m": crater_depth,
+        "ground_energy_joules": ground_energy,
+        "zone_radius_km": zone_radius,
+        "surface_velocity_ms": np.where(airburst, 0.0, ground_velocity_ms),
+        "atmospheric_energy_megatons": (energy - ground_energy) / JOULES_PER_MEGATON,
+    }
+
+
+def airburst_kernel(diameter, velocity_ms, density, angle_deg) -> dict:
+    entry = atmospheric_entry(diameter, velocity_ms, density, angle_deg)
+    columns = entry_outcome(diameter, velocity_ms, density, angle_deg, entry["airburst"],
+                            entry["burst_altitude_m"], entry["end_velocity_ms"])
+    columns["breakup_altitude_km"] = entry["breakup_altitude_m"] / 1000
+    columns["burst_altitude_km"] = entry["burst_altitude_m"] / 1000
+    return columns
+
+
+def entry_kernel(diameter, velocity_ms, density, angle_deg) -> dict:
+    entry = {name: values.reshape(diameter.shape)
+             for name, values in integrate_entry(diameter, velocity_ms, density, angle_deg).items()}
+    columns = entry_outcome(diameter, velocity_ms, density, angle_deg, entry["airburst"],
+                            entry["burst_altitude_m"], entry["ground_velocity_ms"], entry["ground_mass_kg"])
+    columns["breakup_altitude_km"] = entry["breakup_altitude_m"] / 1000
+    columns["burst_altitude_km"] = entry["burst_altitude_m"] / 1000
+    columns["peak_deposition_altitude_km"] = entry["peak_deposition_altitude_m"] / 1000
+    return columns
+
+
+class ImpactModel:
+    """A named kernel plus what the API needs to know about it"""
+
+    def __init__(self, name: str, kernel, description: str, angle_aware: bool = False,
+                 extra_columns: tuple = ()):
+        self.name = name
+        self.kernel = kernel
+        self.description = description
+        self.angle_aware = angle_aware
+        self.extra_columns = tuple(extra_columns)
+
+    def evaluate(self, diameter, velocity_ms, density, angle_deg) -> dict:
+        """Run the kernel on broadcast float64 arrays; every output column has the input shape"""
+        diameter, velocity_ms, density, angle_deg = np.broadcast_arrays(
+            *(np.asarray(x, dtype=np.float64) for x in (diameter, velocity_ms, density, angle_deg))
+        )
+        if self.angle_aware and np.any(~((angle_deg > 0) & (angle_deg <= 90))):
+            raise ValueError("angle must be in (0, 90] degrees from horizontal")
+        columns = self.kernel(diameter, velocity_ms, density, angle_deg)
+        return {name: np.broadcast_to(values, diameter.shape) for name, values in columns.items()}
+
+    def info(self) -> dict:
+        return {"name": self.name, "description": self.description, "angle_aware": self.angle_aware,
+                "extra_columns": list(self.extra_columns)}
+
+
+MODELS = {}
+
+# Extra columns of the entry-aware models
+ENTRY_COLUMNS = ("breakup_altitude_km", "burst_altitude_km", "surface_velocity_ms", "atmospheric_energy_megatons")
+
+
+def register_model(model: ImpactModel) -> ImpactModel:
+    MODELS[model.name] = model
+    return model
+
+
+def get_model(name: str = None) -> ImpactModel:
+    model = MODELS.get(name or DEFAULT_MODEL)
+    if model is None:
+        raise ValueError(f"Unknown model '{name}', expected one of {', '.join(MODELS)}")
+    return model
+
+
+def extra_column_names() -> tuple:
+    """Extra output columns across every registered model, in registration order"""
+    names = []
+    for model in MODELS.values():
+        names.extend(c for c in model.extra_columns if c not in names)
+    return tuple(names)
+
+
+def impact_types(diameter) -> np.ndarray:
+    """Impact classification by projectile diameter (m)"""
+    return IMPACT_TYPES[np.searchsorted(IMPACT_TYPE_THRESHOLDS, diameter, side="right")]
+
+
+register_model(ImpactModel(
+    "fast", fast_kernel,
+    "Energy-only crater power law; ignores impact angle and the atmosphere",
+))
+register_model(ImpactModel(
+    "pi_scaling", pi_scaling_kernel,
+    "Holsapple/Collins pi-group crater scaling with impact angle and simple/complex collapse",
+    angle_aware=True, extra_columns=("transient_crater_diameter_km",),
+))
+register_model(ImpactModel(
+    "airburst", airburst_kernel,
+    "Atmospheric entry with breakup and pancake spreading; airbursts leave blast damage but no crater",
+    angle_aware=True,
+    extra_columns=ENTRY_COLUMNS,
+))
+register_model(ImpactModel(
+    "entry", entry_kernel,
+    "Numerical entry integrating drag, ablation and pancake fragmentation; slowest, highest fidelity",
+    angle_aware=True, extra_columns=ENTRY_COLUMNS + ("peak_deposition_altitude_km",),
+))
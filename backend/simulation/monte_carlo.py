@@ -0,0 +1,302 @@
+import math
+
+import numpy as np
+
+from simulation.calculations import seismic_magnitude_batch
+from simulation.models import DEFAULT_MODEL, ZONE_MULTIPLIERS, get_model
+
+DEFAULT_CHUNK_SIZE = 250_000
+# Bounds memory (every column of a chunk is held at once) and Python overhead per chunk
+MIN_CHUNK_SIZE, MAX_CHUNK_SIZE = 1_000, 1_000_000
+MAX_SAMPLES = 10_000_000
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Parameters that are not given explicitly fall back to these
+DEFAULT_DISTRIBUTIONS = {
+    'density': {'dist': 'uniform', 'low': 1500, 'high': 3500},   # kg/m³, C- to S-type
+    'velocity': {'dist': 'normal', 'mean': 20, 'std': 5, 'min': 11.2, 'max': 72},  # km/s
+    'angle': {'dist': 'isotropic'},   # degrees from horizontal
+}
+
+# Output columns and the histogram each one is accumulated into:
+# (log10 space?, lower edge, upper edge). Values outside the range land in the end bins.
+OUTPUT_HISTOGRAMS = {
+    'energy_joules': (True, 0.0, 32.0),
+    'energy_megatons': (True, -16.0, 16.0),
+    'crater_radius_km': (True, -8.0, 8.0),
+    'seismic_magnitude': (False, -10.0, 20.0),
+    'thermal_radius_km': (True, -8.0, 8.0),
+    'shockwave_radius_km': (True, -8.0, 8.0),
+    'earthquake_radius_km': (True, -8.0, 8.0),
+    'ejecta_radius_km': (True, -8.0, 8.0),
+}
+HISTOGRAM_BINS = 16384
+
+
+def sample_parameter(rng: np.random.Generator, spec: dict, size: int) -> np.ndarray:
+    """Draw `size` samples from a distribution spec like {'dist': 'uniform', 'low': 1, 'high': 2}"""
+    dist = spec.get('dist', 'fixed')
+
+    if dist == 'fixed':
+        values = np.full(size, float(spec['value']))
+    elif dist == 'uniform':
+        values = rng.uniform(spec['low'], spec['high'], size)
+    elif dist == 'loguniform':
+        values = np.exp(rng.uniform(np.log(spec['low']), np.log(spec['high']), size))
+    elif dist == 'normal':
+        values = rng.normal(spec['mean'], spec['std'], size)
+    elif dist == 'lognormal':
+        # mean/std are those of the underlying normal, i.e. of ln(value)
+        values = rng.lognormal(spec['mean'], spec['std'], size)
+    elif dist == 'triangular':
+        values = rng.triangular(spec['low'], spec['mode'], spec['high'], size)
+    elif dist == 'isotropic':
+        # Impact angle for an isotropic flux: p(θ) = sin(2θ), so θ = asin(sqrt(u))
+        values = np.degrees(np.arcsin(np.sqrt(rng.random(size))))
+    else:
+        raise ValueError(f"Unknown distribution '{dist}'")
+
+    if 'min' in spec or 'max' in spec:
+        values = np.clip(values, spec.get('min', -np.inf), spec.get('max', np.inf))
+    return values
+
+
+def parameter_quantile(spec: dict, u) -> np.ndarray:
+    """
+    Inverse CDF of a distribution spec at points u in [0, 1], for quasi-random designs.
+    Only distributions with a closed-form inverse (and a bounded range) are supported.
+    """
+    dist = spec.get('dist', 'fixed')
+    u = np.asarray(u, dtype=np.float64)
+
+    if dist == 'fixed':
+        values = np.full(u.shape, float(spec['value']))
+    elif dist == 'uniform':
+        values = spec['low'] + u * (spec['high'] - spec['low'])
+    elif dist == 'loguniform':
+        values = np.exp(np.log(spec['low']) + u * (np.log(spec['high']) - np.log(spec['low'])))
+    elif dist == 'triangular':
+        low, mode, high = spec['low'], spec['mode'], spec['high']
+        split = (mode - low) / (high - low)
+        values = np.where(u < split, low + np.sqrt(u * (high - low) * (mode - low)),
+                          high - np.sqrt((1 - u) * (high - low) * (high - mode)))
+    elif dist == 'isotropic':
+        values = np.degrees(np.arcsin(np.sqrt(u)))
+    elif dist in ('normal', 'lognormal'):
+        raise ValueError(f"'{dist}' distributions are unbounded; use uniform, loguniform, triangular or isotropic")
+    else:
+        raise ValueError(f"Unknown distribution '{dist}'")
+
+    if 'min' in spec or 'max' in spec:
+        values = np.clip(values, spec.get('min', -np.inf), spec.get('max', np.inf))
+    return values
+
+
+class StreamingHistogram:
+    """
+    Fixed-bin histogram with exact count/sum/min/max, for percentiles over unbounded streams.
+    The sum is kept as per-add partial sums added with fsum, so it doesn't depend on the
+    order histograms are merged in.
+    """
+
+    def __init__(self, log_scale: bool, low: float, high: float, bins: int = HISTOGRAM_BINS):
+        self.log_scale = log_scale
+        self.low = low
+        self.high = high
+        self.bins = bins
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.count = 0
+        self.sums = []
+        self.min = np.inf
+        self.max = -np.inf
+
+    def add(self, values: np.ndarray):
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return
+        self.count += values.size
+        self.sums.append(float(values.sum()))
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+        x = self._transform(values)
+        idx = ((x - self.low) / (self.high - self.low) * self.bins).astype(np.int64)
+        np.clip(idx, 0, self.bins - 1, out=idx)
+        self.counts += np.bincount(idx, minlength=self.bins)
+
+    def merge(self, other: "StreamingHistogram"):
+        """Fold another histogram with identical binning into this one"""
+        self.merge_state(other.state())
+
+    def state(self) -> tuple:
+        """Plain (counts, count, sums, min, max) tuple, cheap to send between processes"""
+        return self.counts, self.count, self.sums, self.min, self.max
+
+    def merge_state(self, state: tuple):
+        counts, count, sums, lo, hi = state
+        self.counts += counts
+        self.count += count
+        self.sums.extend(sums)
+        self.min = min(self.min, lo)
+        self.max = max(self.max, hi)
+
+    @property
+    def total(self) -> float:
+        return math.fsum(self.sums)
+
+    def percentiles(self, qs) -> list:
+        """Percentiles resolved to within one bin, interpolated linearly inside the bin"""
+        if self.count == 0:
+            return [None for _ in qs]
+
+        cumulative = np.cumsum(self.counts)
+        width = (self.high - self.low) / self.bins
+        results = []
+        for q in qs:
+            target = q / 100.0 * self.count
+            i = int(np.searchsorted(cumulative, target, side='left'))
+            i = min(i, self.bins - 1)
+            before = cumulative[i - 1] if i > 0 else 0
+            in_bin = self.counts[i]
+            frac = (target - before) / in_bin if in_bin else 0.0
+            value = self._inverse(self.low + (i + frac) * width)
+            if i == 0 and self.min < self._inverse(self.low):
+                value = self.min   # the first bin also holds everything below the range
+            results.append(float(np.clip(value, self.min, self.max)))
+        return results
+
+    def summary(self, qs) -> dict:
+        result = {f"p{q:g}": v for q, v in zip(qs, self.percentiles(qs))}
+        result['mean'] = self.total / self.count if self.count else None
+        result['min'] = self.min if self.count else None
+        result['max'] = self.max if self.count else None
+        return result
+
+    def _transform(self, values):
+        if not self.log_scale:
+            return values
+        # Zeros (e.g. no crater after an airburst) land in the first bin
+        return np.log10(np.maximum(values, 10.0 ** self.low))
+
+    def _inverse(self, x):
+        return 10 ** x if self.log_scale else x
+
+
+def new_histograms() -> dict:
+    return {name: StreamingHistogram(*cfg) for name, cfg in OUTPUT_HISTOGRAMS.items()}
+
+
+def resolve_distributions(distributions: dict) -> dict:
+    """Fill in defaults for anything not given; diameter has no sensible default"""
+    resolved = dict(DEFAULT_DISTRIBUTIONS)
+    resolved.update({k: v for k, v in distributions.items() if v is not None})
+    if 'diameter' not in resolved:
+        raise ValueError("A diameter distribution is required")
+    return resolved
+
+
+def simulate_chunk(rng: np.random.Generator, distributions: dict, size: int, model: str = DEFAULT_MODEL) -> dict:
+    """Sample one chunk of scenarios and return the output columns for it"""
+    diameter = sample_parameter(rng, distributions['diameter'], size)
+    density = sample_parameter(rng, distributions['density'], size)
+    velocity = sample_parameter(rng, distributions['velocity'], size)
+    # Always drawn, so a seed gives the same samples whichever model runs
+    angle = sample_parameter(rng, distributions['angle'], size)
+
+    kernel = get_model(model).evaluate(diameter, velocity * 1000, density, angle)
+    kinetic_energy = kernel['kinetic_energy_joules']
+    crater_radius_km = kernel['crater_diameter_m'] / 2000
+    zone_radius_km = kernel.get('zone_radius_km', crater_radius_km)
+
+    columns = {
+        'energy_joules': kinetic_energy,
+        'energy_megatons': kinetic_energy / (4.184e15),
+        'crater_radius_km': crater_radius_km,
+        'seismic_magnitude': seismic_magnitude_batch(kernel.get('ground_energy_joules', kinetic_energy)),
+    }
+    for name, multiplier in ZONE_MULTIPLIERS.items():
+        columns[f"{name}_km"] = zone_radius_km * multiplier
+    return columns
+
+
+def chunk_count(samples: int, chunk_size: int) -> int:
+    return -(-samples // chunk_size)
+
+
+def chunk_rng(seed_seq: np.random.SeedSequence, index: int) -> np.random.Generator:
+    """Generator of chunk `index`: child `index` of the seed, however the chunks are sharded"""
+    return np.random.default_rng(np.random.SeedSequence(seed_seq.entropy, spawn_key=seed_seq.spawn_key + (index,)))
+
+
+def accumulate_monte_carlo(distributions: dict, samples: int, seed_seq: np.random.SeedSequence,
+                           chunk_size: int = DEFAULT_CHUNK_SIZE, model: str = DEFAULT_MODEL, progress=None,
+                           chunks: tuple = None) -> dict:
+    """
+    Run chunks [start, stop) of a `samples`-draw sweep (all of them by default) and return
+    the filled output histograms. Every chunk draws from its own child stream of the seed,
+    so a seed gives the same samples serially and with any number of shards.
+    progress(done, total) is called after every chunk, counted over the chunks run here.
+    """
+    start, stop = chunks or (0, chunk_count(samples, chunk_size))
+    total = min(samples, stop * chunk_size) - start * chunk_size
+    histograms = new_histograms()
+    done = 0
+    for index in range(start, stop):
+        size = min(chunk_size, samples - index * chunk_size)
+        for name, values in simulate_chunk(chunk_rng(seed_seq, index), distributions, size, model).items():
+            histograms[name].add(values)
+        done += size
+        if progress is not None:
+            progress(done, total)
+    return histograms
+
+
+def validate_monte_carlo(samples: int, chunk_size: int, model: str = DEFAULT_MODEL, percentiles=DEFAULT_PERCENTILES):
+    if samples < 1 or samples > MAX_SAMPLES:
+        raise ValueError(f"samples must be between 1 and {MAX_SAMPLES}")
+    if not MIN_CHUNK_SIZE <= chunk_size <= MAX_CHUNK_SIZE:
+        raise ValueError(f"chunk_size must be between {MIN_CHUNK_SIZE} and {MAX_CHUNK_SIZE}")
+    if not all(0 <= q <= 100 for q in percentiles):
+        raise ValueError("percentiles must be between 0 and 100")
+    get_model(model)
+
+
+def run_monte_carlo(distributions: dict, samples: int = 100_000, seed=None,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE, percentiles=DEFAULT_PERCENTILES,
+                    model: str = DEFAULT_MODEL, progress=None) -> dict:
+    """
+    Monte Carlo uncertainty sweep over diameter (m), density (kg/m³), velocity (km/s) and angle (deg).
+    Samples are processed in fixed-size chunks so memory stays bounded for any sample count.
+    """
+    validate_monte_carlo(samples, chunk_size, model, percentiles)
+    distributions = resolve_distributions(distributions)
+    histograms = accumulate_monte_carlo(distributions, samples, np.random.SeedSequence(seed), chunk_size, model, progress)
+    return summarize(histograms, samples, seed, distributions, percentiles, model)
+
+
+def summarize(histograms: dict, samples: int, seed, distributions: dict, percentiles,
+              model: str = DEFAULT_MODEL) -> dict:
+    return {
+        'model': get_model(model).name,
+        'samples': samples,
+        'seed': seed,
+        'distributions': distributions,
+        'percentiles': list(percentiles),
+        'outputs': {name: h.summary(percentiles) for name, h in histograms.items()},
+    }
+
+
+def nasa_distributions(diameter_min: float, diameter_max: float, velocity_km_s: float,
+                       density: dict = None, angle: dict = None) -> dict:
+    """Distributions for a NASA record: log-uniform over the estimated diameter range"""
+    if diameter_min and diameter_max and diameter_max > diameter_min:
+        diameter = {'dist': 'loguniform', 'low': diameter_min, 'high': diameter_max}
+    else:
+        diameter = {'dist': 'fixed', 'value': diameter_max or diameter_min}
+
+    return {
+        'diameter': diameter,
+        'velocity': {'dist': 'fixed', 'value': velocity_km_s},
+        'density': density,
+        'angle': angle,
+    }
@@ -0,0 +1,187 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from simulation import calculations
+from simulation.calculations import DEFAULT_ANGLE, batch_output_columns, label_columns, run_batch_simulation
+from simulation.models import DEFAULT_MODEL
+from simulation.monte_carlo import (
+    DEFAULT_CHUNK_SIZE, DEFAULT_PERCENTILES, new_histograms, accumulate_monte_carlo, chunk_count,
+    resolve_distributions, run_monte_carlo, summarize, validate_monte_carlo,
+)
+
+# Worker count for the process pool; defaults to one per core
+SIM_WORKERS = int(os.getenv("SIM_WORKERS", "0")) or (os.cpu_count() or 1)
+
+# Jobs at least this large are sharded across the pool, smaller ones run inline
+PARALLEL_MIN_ROWS = int(os.getenv("SIM_PARALLEL_MIN_ROWS", "200000"))
+PARALLEL_MIN_SAMPLES = int(os.getenv("SIM_PARALLEL_MIN_SAMPLES", "1000000"))
+
+BATCH_INPUT_COLUMNS = ("diameter", "velocity", "density", "lat", "lon", "angle")
+
+_executor = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Shared process pool, created on first use"""
+    global _executor
+    if _executor is None:
+        # spawn rather than fork: the server process has threads and an event loop running
+        _executor = ProcessPoolExecutor(
+            max_workers=SIM_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def shard_bounds(total: int, shards: int) -> list:
+    """Split range(total) into at most `shards` contiguous (start, stop) pairs"""
+    shards = max(1, min(shards, total))
+    edges = np.linspace(0, total, shards + 1).astype(np.int64)
+    return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+
+# --- Batch simulation over shared memory ---
+
+def _batch_shard(in_name: str, out_name: str, n: int, start: int, stop: int, model: str = DEFAULT_MODEL) -> list:
+    """
+    Worker: read input columns from shared memory, write float output columns back.
+    Returns the shard's (stage, seconds) timings for the parent to record.
+    """
+    shm_in = shared_memory.SharedMemory(name=in_name)
+    shm_out = shared_memory.SharedMemory(name=out_name)
+    output_columns = batch_output_columns(model)
+    timings = []
+    calculations.set_stage_observer(lambda name, elapsed: timings.append((name, elapsed)))
+    try:
+        inputs = np.ndarray((len(BATCH_INPUT_COLUMNS), n), dtype=np.float64, buffer=shm_in.buf)
+        outputs = np.ndarray((len(output_columns), n), dtype=np.float64, buffer=shm_out.buf)
+
+        columns = run_batch_simulation(*(row[start:stop] for row in inputs), model=model)
+        for i, name in enumerate(output_columns):
+            outputs[i, start:stop] = columns[name]
+        del inputs, outputs, columns
+    finally:
+        calculations.set_stage_observer(None)
+        shm_in.close()
+        shm_out.close()
+    return timings
+
+
+async def parallel_batch_simulation(diameter, velocity, density, lat=None, lon=None, angle=None,
+                                    model: str = DEFAULT_MODEL, workers: int = None) -> dict:
+    """
+    run_batch_simulation sharded across the process pool. Inputs and outputs live in
+    shared memory, so only shard bounds cross the process boundary.
+    """
+    diameter = np.asarray(diameter, dtype=np.float64)
+    n = diameter.shape[0]
+    nan = np.full(n, np.nan)
+    values = (
+        diameter,
+        np.broadcast_to(np.asarray(velocity, dtype=np.float64), n),
+        np.broadcast_to(np.asarray(density, dtype=np.float64), n),
+        nan if lat is None else np.asarray(lat, dtype=np.float64),
+        nan if lon is None else np.asarray(lon, dtype=np.float64),
+        np.full(n, DEFAULT_ANGLE) if angle is None else np.broadcast_to(np.asarray(angle, dtype=np.float64), n),
+    )
+    output_columns = batch_output_columns(model)
+
+    item = np.dtype(np.float64).itemsize
+    shm_in = shared_memory.SharedMemory(create=True, size=max(1, len(BATCH_INPUT_COLUMNS) * n * item))
+    shm_out = shared_memory.SharedMemory(create=True, size=max(1, len(output_columns) * n * item))
+    try:
+        inputs = np.ndarray((len(BATCH_INPUT_COLUMNS), n), dtype=np.float64, buffer=shm_in.buf)
+        for i, col in enumerate(values):
+            inputs[i] = col
+        del inputs
+
+        executor = get_executor()
+        loop = asyncio.get_running_loop()
+        shard_timings = await asyncio.gather(*(
+            loop.run_in_executor(executor, _batch_shard, shm_in.name, shm_out.name, n, start, stop, model)
+            for start, stop in shard_bounds(n, workers or SIM_WORKERS)
+        ))
+        for timings in shard_timings:
+            for name, elapsed in timings:
+                calculations.observe_stage(name, elapsed)
+
+        outputs = np.ndarray((len(output_columns), n), dtype=np.float64, buffer=shm_out.buf)
+        columns = {name: outputs[i].copy() for i, name in enumerate(output_columns)}
+        del outputs
+    finally:
+        shm_in.close()
+        shm_in.unlink()
+        shm_out.close()
+        shm_out.unlink()
+
+    columns.update(label_columns(columns))
+    return columns
+
+
+async def batch_simulation(diameter, velocity, density, lat=None, lon=None, angle=None,
+                           model: str = DEFAULT_MODEL) -> dict:
+    """Batch simulation that only pays for the pool when the batch is large"""
+    if len(diameter) < PARALLEL_MIN_ROWS:
+        return await asyncio.to_thread(run_batch_simulation, diameter, velocity, density, lat, lon, angle, model)
+    return await parallel_batch_simulation(diameter, velocity, density, lat, lon, angle, model)
+
+
+# --- Monte Carlo with per-shard histograms ---
+
+def _monte_carlo_shard(distributions: dict, samples: int, seed_seq: np.random.SeedSequence,
+                       chunk_size: int, model: str, start: int, stop: int) -> dict:
+    """Worker: run chunks [start, stop) and return their histogram state as plain NumPy buffers"""
+    histograms = accumulate_monte_carlo(distributions, samples, seed_seq, chunk_size, model, chunks=(start, stop))
+    return {name: h.state() for name, h in histograms.items()}
+
+
+def merge_histogram_states(states: list) -> dict:
+    """Fold per-shard histogram states into one set of histograms"""
+    merged = new_histograms()
+    for state in states:
+        for name, histogram_state in state.items():
+            merged[name].merge_state(histogram_state)
+    return merged
+
+
+async def parallel_monte_carlo(distributions: dict, samples: int = 100_000, seed=None,
+                               chunk_size: int = DEFAULT_CHUNK_SIZE, percentiles=DEFAULT_PERCENTILES,
+                               model: str = DEFAULT_MODEL, workers: int = None) -> dict:
+    """
+    run_monte_carlo sharded across the process pool by chunk. Chunks draw from per-chunk
+    child streams of `seed`, so a seed gives the same result as run_monte_carlo for any
+    worker count.
+    """
+    validate_monte_carlo(samples, chunk_size, model, percentiles)
+    distributions = resolve_distributions(distributions)
+    seed_seq = np.random.SeedSequence(seed)
+
+    executor = get_executor()
+    loop = asyncio.get_running_loop()
+    states = await asyncio.gather(*(
+        loop.run_in_executor(executor, _monte_carlo_shard, distributions, samples, seed_seq, chunk_size, model, start, stop)
+        for start, stop in shard_bounds(chunk_count(samples, chunk_size), workers or SIM_WORKERS)
+    ))
+
+    return summarize(merge_histogram_states(states), samples, seed, distributions, percentiles, model)
+
+
+async def monte_carlo(distributions: dict, samples: int = 100_000, seed=None,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE, percentiles=DEFAULT_PERCENTILES,
+                      model: str = DEFAULT_MODEL) -> dict:
+    """Monte Carlo sweep that only pays for the pool when the sample count is large"""
+    if samples < PARALLEL_MIN_SAMPLES:
+        return await asyncio.to_thread(run_monte_carlo, distributions, samples, seed, chunk_size, percentiles, model)
+    return await parallel_monte_carlo(distributions, samples, seed, chunk_size, percentiles, model)
@@ -0,0 +1,283 @@
+import glob
+import hashlib
+import json
+import mmap
+import os
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:   # no cross-process locking; one process per store then
+    fcntl = None
+
+SEGMENT_BYTES = 64 * 1024 * 1024   # a segment file is closed for appends past this size
+COMPRESSION_LEVEL = 6
+EVICT_INTERVAL = 60.0              # s between age sweeps; the size budget is checked on every write
+EVICT_TARGET = 0.9                 # a size eviction frees down to this share of max_bytes
+
+KEY_BYTES = 32                     # sha256 digest
+LIVE, TOMBSTONE = 0, 1
+# One fixed-size index record per write or eviction; the last record for a key wins
+INDEX_RECORD = np.dtype([
+    ("key", f"S{KEY_BYTES}"), ("segment", "<u4"), ("offset", "<u8"), ("length", "<u4"),
+    ("raw_length", "<u4"), ("created", "<f8"), ("flags", "u1"),
+])
+
+
+def code_version(package_dir: str) -> str:
+    """Hash of the simulation sources: results computed by other code never match"""
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(package_dir, "*.py"))):
+        with open(path, "rb") as f:
+            digest.update(os.path.basename(path).encode() + b"\0" + f.read())
+    return digest.hexdigest()[:16]
+
+
+SIMULATION_VERSION = code_version(os.path.dirname(os.path.abspath(__file__)))
+
+
+def result_key(kind: str, inputs: dict, version: str = SIMULATION_VERSION) -> bytes:
+    """Content address of a result: sha256 of the code version, the result kind and the canonical inputs"""
+    blob = json.dumps({"version": version, "kind": kind, "inputs": inputs}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode()).digest()
+
+
+class ResultStore:
+    """
+    Content-addressed results on disk, shared by every server worker and kept across
+    restarts. Each blob is zlib-compressed and appended to a segment file
+    ({root}/segment-NNNNNN.dat); each write or eviction appends a fixed-size record to
+    {root}/index.bin. A new store loads the whole index in one read and memory-maps the
+    segments, so a warm hit is a dict lookup plus decompressing out of the page cache.
+
+    Entries older than max_age, or the oldest ones while the store holds more than
+    max_bytes, are evicted with tombstone records; once most segment bytes are dead the
+    live blobs are copied to fresh segments under a fresh index (compaction).
+    """
+
+    def __init__(self, root: str, max_bytes: int, max_age: float, segment_bytes: int = SEGMENT_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.segment_bytes = segment_bytes
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()   # sync endpoints and to_thread callers share the store
+        self._entries = {}              # key -> (segment, offset, length, raw_length, created)
+        self._maps = {}                 # segment -> read-only mmap
+        self._index_pos = 0             # bytes of index.bin applied so far
+        self._index_id = None           # (device, inode) of the index applied; compaction replaces it
+        self._swept_at = 0.0
+        self.live_bytes = 0
+        self.dead_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        with self._lock:
+            self._refresh()
+
+    @property
+    def _index_path(self) -> str:
+        return os.path.join(self.root, "index.bin")
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.root, f"segment-{segment:06d}.dat")
+
+    def _segments(self) -> list:
+        return sorted(int(os.path.basename(p)[8:14]) for p in glob.glob(os.path.join(self.root, "segment-*.dat")))
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive across processes for appends and compaction"""
+        with open(os.path.join(self.root, "lock"), "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _reset(self):
+        for m in self._maps.values():
+            m.close()
+        self._entries, self._maps = {}, {}
+        self._index_pos, self.live_bytes, self.dead_bytes = 0, 0, 0
+
+    def _refresh(self):
+        """Apply index records written since the last look, by this or any other process"""
+        try:
+            stat = os.stat(self._index_path)
+        except FileNotFoundError:
+            stat = None
+        index_id = (stat.st_dev, stat.st_ino) if stat else None
+        if index_id != self._index_id:
+            self._reset()
+            self._index_id = index_id
+        if stat is None or stat.st_size <= self._index_pos:
+            return
+
+        with open(self._index_path, "rb") as f:
+            f.seek(self._index_pos)
+            data = f.read(stat.st_size - self._index_pos)
+        # A record still being written stays for the next look
+        whole = len(data) - len(data) % INDEX_RECORD.itemsize
+        self._index_pos += whole
+        for key, segment, offset, length, raw_length, created, flags in np.frombuffer(data[:whole], INDEX_RECORD).tolist():
+            # NumPy drops trailing NUL bytes of "S" fields; digests can end in them
+            self._apply(key.ljust(KEY_BYTES, b"\0"), segment, offset, length, raw_length, created, flags)
+
+    def _apply(self, key, segment, offset, length, raw_length, created, flags):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.live_bytes -= old[2]
+            self.dead_bytes += old[2]
+        if flags == LIVE:
+            self._entries[key] = (segment, offset, length, raw_length, created)
+            self.live_bytes += length
+
+    def _append_records(self, records: list):
+        rows = np.array(records, dtype=INDEX_RECORD)
+        with open(self._index_path, "ab") as f:
+            f.write(rows.tobytes())
+        if self._index_id is None:
+            stat = os.stat(self._index_path)
+            self._index_id = (stat.st_dev, stat.st_ino)
+        self._index_pos += rows.nbytes
+        for record in records:
+            self._apply(*record)
+
+    def _read(self, segment: int, offset: int, length: int) -> Optional[bytes]:
+        """Decompressed blob straight from the segment's memory map, None if the segment is gone"""
+        m = self._maps.get(segment)
+        if m is None or len(m) < offset + length:
+            try:
+                with open(self._segment_path(segment), "rb") as f:
+                    if os.fstat(f.fileno()).st_size < offset + length:
+                        return None
+                    if m is not None:
+                        m.close()
+                    m = self._maps[segment] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except FileNotFoundError:
+                return None
+        with memoryview(m)[offset:offset + length] as blob:
+            return zlib.decompress(blob)
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._refresh()
+                entry = self._entries.get(key)
+            data = None
+            if entry is not None and time.time() - entry[4] <= self.max_age:
+                data = self._read(*entry[:3])
+                if data is None:
+                    # Compacted away by another process: its new index has the blob's new place
+                    self._refresh()
+                    entry = self._entries.get(key)
+                    data = self._read(*entry[:3]) if entry is not None else None
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return data
+
+    def put(self, key: bytes, data: bytes):
+        """Store `data` under `key`; a key already stored (by any process) is left as it is"""
+        blob = zlib.compress(data, COMPRESSION_LEVEL)
+        with self._lock, self._file_lock():
+            self._refresh()
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[4] <= self.max_age:
+                return
+
+            segments = self._segments()
+            segment = segments[-1] if segments else 0
+            if segments and os.path.getsize(self._segment_path(segment)) + len(blob) > self.segment_bytes:
+                segment += 1
+            with open(self._segment_path(segment), "ab") as f:
+                f.seek(0, os.SEEK_END)
+                offset = f.tell()
+                f.write(blob)
+            self._append_records([(key, segment, offset, len(blob), len(data), time.time(), LIVE)])
+            self.writes += 1
+            self._evict()
+
+    def _evict(self):
+        """Tombstone expired entries (every EVICT_INTERVAL) and the oldest beyond max_bytes; compact when mostly dead"""
+        now = time.time()
+        evicted = []
+        if now - self._swept_at >= EVICT_INTERVAL:
+            self._swept_at = now
+            evicted = [key for key, entry in self._entries.items() if now - entry[4] > self.max_age]
+        if self.live_bytes > self.max_bytes:
+            live = self.live_bytes - sum(self._entries[key][2] for key in evicted)
+            for key, entry in sorted(self._entries.items(), key=lambda item: item[1][4]):
+                if live <= EVICT_TARGET * self.max_bytes:
+                    break
+                if key not in evicted:
+                    evicted.append(key)
+                    live -= entry[2]
+        if evicted:
+            self._append_records([(key, 0, 0, 0, 0, now, TOMBSTONE) for key in evicted])
+            self.evictions += len(evicted)
+        if self.dead_bytes > max(self.live_bytes, self.segment_bytes // 4):
+            self._compact()
+
+    def _compact(self):
+        """Copy the live blobs (still compressed) to new segments under a new index; drop the old segments"""
+        old_segments = self._segments()
+        segment = (old_segments[-1] + 1) if old_segments else 0
+        records, size = [], 0
+        out = open(self._segment_path(segment), "wb")
+        try:
+            for key, (old_segment, offset, length, raw_length, created) in sorted(self._entries.items(), key=lambda item: item[1][4]):
+                m = self._maps.get(old_segment)
+                if m is None or len(m) < offset + length:
+                    if self._read(old_segment, offset, length) is None:
+                        continue
+                    m = self._maps[old_segment]
+                if size and size + length > self.segment_bytes:
+                    out.close()
+                    segment, size = segment + 1, 0
+                    out = open(self._segment_path(segment), "wb")
+                out.write(m[offset:offset + length])
+                records.append((key, segment, size, length, raw_length, created, LIVE))
+                size += length
+        finally:
+            out.close()
+
+        tmp = self._index_path + ".tmp"
+        np.array(records, dtype=INDEX_RECORD).tofile(tmp)
+        os.replace(tmp, self._index_path)
+        for old in old_segments:
+            os.remove(self._segment_path(old))
+        self._index_id = None
+        self._refresh()
+
+    def close(self):
+        with self._lock:
+            for m in self._maps.values():
+                m.close()
+            self._maps = {}
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "live_bytes": self.live_bytes,
+            "dead_bytes": self.dead_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
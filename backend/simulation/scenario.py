@@ -0,0 +1,258 @@
+import math
+import struct
+
+import numpy as np
+
+from simulation.calculations import DEFAULT_ANGLE, iter_batch_rows, run_batch_simulation
+from simulation.deflection import EARTH_MU, entry_speed
+from simulation.entry import DEFAULT_TIME_STEP, EARTH_RADIUS_M, ENTRY_ALTITUDE, integrate_entry
+from simulation.models import DEFAULT_MODEL, GRAVITY, JOULES_PER_KILOTON, get_model
+
+EARTH_MU_M = EARTH_MU * 1e9      # m³/s²
+
+APPROACH_TIME = 6 * 3600.0       # s of approach shown before the body reaches the entry altitude
+APPROACH_SAMPLES = 240
+AFTERMATH_SAMPLES = 480
+AFTERMATH_START = 1e-3           # s after impact of the first aftermath sample; the grid is logarithmic
+PATH_SAMPLES = 4096              # path-length grid the approach timing is integrated on
+
+AIR_DENSITY = 1.225              # kg/m³ at the surface
+SOUND_SPEED = 343.0              # m/s
+SEDOV_CONSTANT = 1.03            # blast front ξ (E t² / ρ)^(1/5) for air, γ = 1.4
+SEISMIC_SPEED = 5.0              # km/s, crustal P waves
+THERMAL_PULSE_SCALE = 0.0417     # s, time of peak thermal power 0.0417 W^0.44 (W in kt, Glasstone & Dolan)
+THERMAL_PULSE_EXPONENT = 0.44
+EXCAVATION_COEFFICIENT = 0.8     # crater forms in ~0.8 sqrt(D / g) (Melosh 1989)
+CRATER_GROWTH_EXPONENT = 0.4     # point-source growth of the transient crater, r ∝ t^0.4
+
+PHASES = ("approach", "entry", "aftermath")
+ZONE_COLUMNS = ("thermal_radius", "shockwave_radius", "earthquake_radius", "ejecta_radius")
+SCENARIO_COLUMNS = (
+    "time_s", "phase", "altitude_km", "downrange_km", "velocity_km_s", "mass_fraction", "radius_m",
+    "crater_radius_km", "crater_depth_km",
+) + ZONE_COLUMNS
+# Columns whose change drives decimation (time and phase only index the others)
+ANIMATED_COLUMNS = SCENARIO_COLUMNS[2:]
+
+DEFAULT_MAX_FRAMES = 600
+MAX_FRAMES = 20_000
+UNIFORM_SHARE = 0.25             # share of the frame budget spread evenly over the samples
+FRAME_DTYPE = np.dtype("<f4")
+FRAME_HEADER = struct.Struct("<II")   # first frame index, frames in the message
+
+
+def approach_track(velocity_ms: float, angle_deg: float, duration: float = APPROACH_TIME,
+                   samples: int = APPROACH_SAMPLES) -> dict:
+    """
+    Straight-line approach ending at the entry point at angle_deg below horizontal, the speed
+    following energy conservation in Earth's gravity. Evenly spaced over the last `duration`
+    seconds before entry (t < 0); downrange is negative, measured along the ground track.
+    """
+    theta = np.radians(angle_deg)
+    r_entry = EARTH_RADIUS_M + ENTRY_ALTITUDE
+    # Speed only drops going back along the path, so this far back is more than `duration` away
+    path = np.concatenate([[0.0], np.geomspace(1.0, velocity_ms * duration, PATH_SAMPLES)])
+
+    def position(s):
+        up, back = r_entry + s * np.sin(theta), s * np.cos(theta)
+        r = np.hypot(up, back)
+        speed = np.sqrt(velocity_ms ** 2 - 2 * EARTH_MU_M * (1 / r_entry - 1 / r))
+        return r, -EARTH_RADIUS_M * np.arctan2(back, up), speed
+
+    _, _, speed = position(path)
+    time_to_entry = np.concatenate([[0.0], np.cumsum(np.diff(path) * 0.5 * (1 / speed[1:] + 1 / speed[:-1]))])
+    t = np.linspace(-duration, 0.0, samples, endpoint=False)
+    r, downrange, speed = position(np.interp(-t, time_to_entry, path))
+    return {"time_s": t, "altitude_m": r - EARTH_RADIUS_M, "downrange_m": downrange, "velocity_ms": speed}
+
+
+def entry_track(diameter: float, velocity_ms: float, density: float, angle_deg: float,
+                dt: float = DEFAULT_TIME_STEP) -> dict:
+    """integrate_entry's trajectory of one body, every RK4 step from the entry altitude on, plus downrange"""
+    entry = integrate_entry(diameter, velocity_ms, density, angle_deg, dt=dt, trajectory=True)
+    trajectory = entry["trajectory"]
+    steps = np.flatnonzero(~np.isnan(trajectory["altitude_m"][:, 0]))
+    track = {name: values[steps, 0] for name, values in trajectory.items() if name != "time_s"}
+    track["time_s"] = trajectory["time_s"][steps]
+
+    ground_speed = track["velocity_ms"] * np.cos(track["path_angle_rad"]) * EARTH_RADIUS_M / (EARTH_RADIUS_M + track["altitude_m"])
+    track["downrange_m"] = np.concatenate([[0.0], np.cumsum(0.5 * (ground_speed[1:] + ground_speed[:-1]) * dt)])
+    track["airburst"] = bool(entry["airburst"][0])
+    return track
+
+
+def ballistic_track(diameter: float, velocity_ms: float, angle_deg: float, dt: float = DEFAULT_TIME_STEP) -> dict:
+    """Entry as models without an atmosphere see it: a straight line to the ground at constant speed, dt apart"""
+    theta = np.radians(angle_deg)
+    duration = ENTRY_ALTITUDE / (velocity_ms * np.sin(theta))
+    t = np.append(np.arange(0.0, duration, dt), duration)
+    return {
+        "time_s": t,
+        "altitude_m": np.maximum(ENTRY_ALTITUDE - velocity_ms * np.sin(theta) * t, 0.0),
+        "downrange_m": velocity_ms * np.cos(theta) * t,
+        "velocity_ms": np.full(t.size, velocity_ms),
+        "mass_kg": np.ones(t.size),
+        "radius_m": np.full(t.size, diameter / 2),
+        "airburst": False,
+    }
+
+
+def blast_radius(t, energy_joules: float):
+    """Sedov-Taylor blast front (m) until it slows to the speed of sound, a sound wave after that"""
+    k = SEDOV_CONSTANT * (energy_joules / AIR_DENSITY) ** 0.2
+    t_sound = (0.4 * k / SOUND_SPEED) ** (1 / 0.6)   # the front speed 0.4 k t^-0.6 reaches SOUND_SPEED
+    return np.where(t < t_sound, k * t ** 0.4, k * t_sound ** 0.4 + SOUND_SPEED * (t - t_sound))
+
+
+def blast_arrival(radius_m: float, energy_joules: float) -> float:
+    """Time (s) at which blast_radius reaches radius_m"""
+    k = SEDOV_CONSTANT * (energy_joules / AIR_DENSITY) ** 0.2
+    t_sound = (0.4 * k / SOUND_SPEED) ** (1 / 0.6)
+    if radius_m <= k * t_sound ** 0.4:
+        return (radius_m / k) ** 2.5
+    return t_sound + (radius_m - k * t_sound ** 0.4) / SOUND_SPEED
+
+
+def aftermath_growth(t, outcome: dict) -> dict:
+    """
+    Crater and damage-zone radii t seconds after impact (or burst), growing to the model's
+    final values: the crater over its excavation time, the thermal zone with the emitted
+    share of a thermal pulse, the shockwave with the blast front, the seismic zone at
+    P-wave speed and the ejecta zone with ballistic flight (range g t² / 2 at 45°).
+    """
+    energy = outcome["kinetic_energy_joules"]
+    crater_km = outcome["crater_radius_km"]
+    excavation = EXCAVATION_COEFFICIENT * np.sqrt(2000 * crater_km / GRAVITY) if crater_km > 0 else 1.0
+    growth = np.minimum(t / excavation, 1.0) ** CRATER_GROWTH_EXPONENT
+
+    pulse = THERMAL_PULSE_SCALE * (energy / JOULES_PER_KILOTON) ** THERMAL_PULSE_EXPONENT
+    emitted = 1 - (1 + t / pulse) * np.exp(-t / pulse)
+
+    return {
+        "crater_radius_km": crater_km * growth,
+        "crater_depth_km": outcome["crater_depth_km"] * growth,
+        "thermal_radius": outcome["thermal_radius"] * np.sqrt(emitted),
+        "shockwave_radius": np.minimum(blast_radius(t, energy) / 1000, outcome["shockwave_radius"]),
+        "earthquake_radius": np.minimum(SEISMIC_SPEED * t, outcome["earthquake_radius"]),
+        "ejecta_radius": np.minimum(GRAVITY * t ** 2 / 2000, outcome["ejecta_radius"]),
+    }
+
+
+def aftermath_duration(outcome: dict) -> float:
+    """Time after impact by which every zone of aftermath_growth has reached its final radius"""
+    energy = outcome["kinetic_energy_joules"]
+    crater_km = outcome["crater_radius_km"]
+    return max(
+        EXCAVATION_COEFFICIENT * np.sqrt(2000 * crater_km / GRAVITY),
+        10 * THERMAL_PULSE_SCALE * (energy / JOULES_PER_KILOTON) ** THERMAL_PULSE_EXPONENT,
+        blast_arrival(1000 * outcome["shockwave_radius"], energy),
+        outcome["earthquake_radius"] / SEISMIC_SPEED,
+        np.sqrt(2000 * outcome["ejecta_radius"] / GRAVITY),
+        10 * AFTERMATH_START,
+    )
+
+
+def run_scenario(diameter: float, velocity: float, density: float, angle: float = DEFAULT_ANGLE,
+                 lat: float = None, lon: float = None, model: str = DEFAULT_MODEL,
+                 approach_time: float = APPROACH_TIME, approach_samples: int = APPROACH_SAMPLES,
+                 aftermath_samples: int = AFTERMATH_SAMPLES, dt: float = DEFAULT_TIME_STEP) -> dict:
+    """
+    Time series of one impact (velocity in km/s at entry; at or below Earth's escape speed it
+    is read as the hyperbolic excess speed, see entry_speed), t = 0 at the entry altitude:
+    the approach, every step of the entry and the aftermath, whose crater and zones grow to
+    the final state `model` predicts. Models that treat the atmosphere get the integrated
+    entry (integrate_entry), the others a straight unslowed flight to the ground.
+    Returns {"columns": SCENARIO_COLUMNS arrays, "phases": [{name, start, stop}],
+    "impact_time_s", "airburst", "entry_velocity_km_s", "outcome": the run_simulation result}.
+    """
+    if not all(math.isfinite(value) for value in (diameter, velocity, density, angle)):
+        raise ValueError("diameter, velocity, density and angle must be finite")
+    if not diameter > 0 or not density > 0:
+        raise ValueError("diameter and density must be positive")
+    velocity = float(entry_speed(velocity))   # an approach from afar needs at least escape speed
+    if not 0 < angle <= 90:
+        raise ValueError("angle must be in (0, 90] degrees from horizontal")
+    if not approach_time > 0 or approach_samples < 1 or aftermath_samples < 2:
+        raise ValueError("approach_time must be positive, with at least 1 approach and 2 aftermath samples")
+    velocity_ms = velocity * 1000
+
+    approach = approach_track(velocity_ms, angle, approach_time, approach_samples)
+    if "burst_altitude_km" in get_model(model).extra_columns:
+        entry = entry_track(diameter, velocity_ms, density, angle, dt)
+    else:
+        entry = ballistic_track(diameter, velocity_ms, angle, dt)
+    columns = run_batch_simulation([diameter], [velocity], [density], [lat], [lon], [angle], model)
+    outcome = {name: float(columns[name][0]) for name in
+               ("kinetic_energy_joules", "crater_radius_km", "crater_depth_km") + ZONE_COLUMNS}
+
+    impact_time = float(entry["time_s"][-1])
+    since_impact = np.concatenate([[0.0], np.geomspace(AFTERMATH_START, aftermath_duration(outcome), aftermath_samples - 1)])
+    zones = aftermath_growth(since_impact[1:], outcome)
+
+    sizes = (approach_samples, entry["time_s"].size, aftermath_samples - 1)
+    radius0 = diameter / 2
+    mass0 = entry["mass_kg"][0]
+    last = {name: values[-1] for name, values in entry.items() if name != "airburst"}
+
+    def phase_values(approach_values, entry_values, aftermath_value):
+        return np.concatenate([
+            np.broadcast_to(approach_values, sizes[0]), entry_values, np.full(sizes[2], aftermath_value),
+        ])
+
+    series = {
+        "time_s": np.concatenate([approach["time_s"], entry["time_s"], impact_time + since_impact[1:]]),
+        "phase": np.repeat(np.arange(len(PHASES), dtype=np.float64), sizes),
+        "altitude_km": phase_values(approach["altitude_m"], entry["altitude_m"], last["altitude_m"]) / 1000,
+        "downrange_km": phase_values(approach["downrange_m"], entry["downrange_m"], last["downrange_m"]) / 1000,
+        "velocity_km_s": phase_values(approach["velocity_ms"], entry["velocity_ms"], 0.0) / 1000,
+        "mass_fraction": phase_values(1.0, entry["mass_kg"] / mass0, last["mass_kg"] / mass0),
+        "radius_m": phase_values(radius0, entry["radius_m"], last["radius_m"]),
+    }
+    for name in ("crater_radius_km", "crater_depth_km") + ZONE_COLUMNS:
+        series[name] = np.concatenate([np.zeros(sizes[0] + sizes[1]), zones[name]])
+
+    bounds = np.cumsum((0,) + sizes)
+    return {
+        "columns": {name: series[name] for name in SCENARIO_COLUMNS},
+        "phases": [{"name": name, "start": int(bounds[i]), "stop": int(bounds[i + 1])} for i, name in enumerate(PHASES)],
+        "impact_time_s": impact_time,
+        "airburst": entry["airburst"],
+        "entry_velocity_km_s": velocity,
+        "outcome": next(iter_batch_rows(columns)),
+    }
+
+
+def decimate(columns: dict, max_frames: int = DEFAULT_MAX_FRAMES, names=ANIMATED_COLUMNS) -> np.ndarray:
+    """
+    Indices of at most about max_frames samples worth sending. Frames are placed at equal
+    steps of the animation's accumulated change (each column's absolute change, scaled by
+    its range), with UNIFORM_SHARE of them spread evenly over the samples, so fast stretches
+    keep their detail and slow ones thin out. The first and last sample of every phase stay.
+    """
+    n = len(columns["time_s"])
+    if n <= max_frames:
+        return np.arange(n)
+
+    values = np.stack([np.asarray(columns[name], dtype=np.float64) for name in names])
+    span = np.ptp(values, axis=1, keepdims=True)
+    change = np.abs(np.diff(values / np.where(span > 0, span, 1.0), axis=1)).sum(axis=0)
+    weight = np.full(n - 1, 1.0 / (n - 1))
+    if change.sum() > 0:
+        weight = UNIFORM_SHARE * weight + (1 - UNIFORM_SHARE) * change / change.sum()
+    cumulative = np.concatenate([[0.0], np.cumsum(weight)])
+
+    phase = np.asarray(columns["phase"])
+    boundaries = np.flatnonzero(np.diff(phase))
+    keep = np.concatenate([[0, n - 1], boundaries, boundaries + 1])
+    targets = np.linspace(0.0, cumulative[-1], max(max_frames - keep.size, 2))
+    picks = np.minimum(np.searchsorted(cumulative, targets), n - 1)
+    return np.unique(np.concatenate([picks, keep]))
+
+
+def pack_frames(columns: dict, indices: np.ndarray, first: int, names=SCENARIO_COLUMNS) -> bytes:
+    """
+    One binary message: FRAME_HEADER (index of its first frame, frame count), then the
+    frames row by row, each the `names` columns as little-endian float32
+    """
+    frames = np.stack([np.asarray(columns[name])[indices] for name in names], axis=1).astype(FRAME_DTYPE)
+    return FRAME_HEADER.pack(first, len(indices)) + frames.tobytes()
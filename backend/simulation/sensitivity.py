@@ -0,0 +1,346 @@
+import numpy as np
+
+from simulation.calculations import impact_columns, seismic_magnitude
+from simulation.models import DEFAULT_MODEL, get_model
+from simulation.monte_carlo import DEFAULT_CHUNK_SIZE, parameter_quantile
+
+PARAMETERS = ("diameter", "velocity", "density", "angle")
+OUTPUTS = (
+    "kinetic_energy_megatons", "crater_radius_km", "seismic_magnitude",
+    "thermal_radius", "shockwave_radius", "earthquake_radius", "ejecta_radius",
+)
+METHODS = ("local", "sobol", "morris")
+
+DEFAULT_SPREAD = 0.25          # default ranges: the base value ± this fraction
+ANGLE_BOUNDS = (1.0, 90.0)     # degrees; default angle ranges are clipped to these
+DEFAULT_SOBOL_SAMPLES = 1024   # base samples N; Saltelli's design evaluates N (d + 2) points
+MAX_SOBOL_SAMPLES = 1 << 18
+DEFAULT_TRAJECTORIES = 20
+MAX_TRAJECTORIES = 10_000
+DEFAULT_LEVELS = 4
+DEFAULT_RELATIVE_STEP = 1e-3   # central-difference step, relative to the base value
+BOOTSTRAP_RESAMPLES = 200
+BOOTSTRAP_BATCH_POINTS = 1 << 21   # resample counts held at once (resamples x N), bounds memory
+CONFIDENCE_Z = 1.96            # 95% bootstrap intervals
+
+# Sobol sequence direction numbers for dimensions 2+ (Joe & Kuo 2008): (degree s, a, m_1..m_s).
+# Dimension 1 is the van der Corput sequence.
+SOBOL_DIRECTIONS = (
+    (1, 0, (1,)),
+    (2, 1, (1, 3)),
+    (3, 1, (1, 3, 1)),
+    (3, 2, (1, 1, 1)),
+    (4, 1, (1, 1, 3, 3)),
+    (4, 4, (1, 3, 5, 13)),
+    (5, 2, (1, 1, 5, 5, 17)),
+    (5, 4, (1, 1, 5, 5, 5)),
+    (5, 7, (1, 1, 7, 11, 19)),
+    (5, 11, (1, 1, 5, 1, 1)),
+    (5, 13, (1, 1, 1, 3, 11)),
+    (5, 14, (1, 3, 5, 5, 31)),
+    (6, 1, (1, 3, 3, 9, 7, 49)),
+    (6, 13, (1, 1, 1, 15, 21, 21)),
+    (6, 16, (1, 3, 1, 13, 27, 49)),
+)
+SOBOL_BITS = 32
+MAX_SOBOL_DIMENSIONS = len(SOBOL_DIRECTIONS) + 1
+
+
+def sobol_direction_numbers(dims: int) -> np.ndarray:
+    """(dims, SOBOL_BITS) direction numbers V[j, k] as integers scaled by 2^SOBOL_BITS"""
+    if not 1 <= dims <= MAX_SOBOL_DIMENSIONS:
+        raise ValueError(f"Sobol sequences are available in 1 to {MAX_SOBOL_DIMENSIONS} dimensions")
+    v = np.zeros((dims, SOBOL_BITS), dtype=np.uint64)
+    v[0] = [1 << (SOBOL_BITS - 1 - k) for k in range(SOBOL_BITS)]
+    for j in range(1, dims):
+        s, a, m = SOBOL_DIRECTIONS[j - 1]
+        for k in range(SOBOL_BITS):
+            if k < s:
+                v[j, k] = m[k] << (SOBOL_BITS - 1 - k)
+                continue
+            value = int(v[j, k - s]) ^ (int(v[j, k - s]) >> s)
+            for i in range(1, s):
+                if (a >> (s - 1 - i)) & 1:
+                    value ^= int(v[j, k - i])
+            v[j, k] = value
+    return v
+
+
+def sobol_sequence(n: int, dims: int, skip: int = 1) -> np.ndarray:
+    """
+    Points skip .. skip + n - 1 of the (unscrambled) Sobol sequence as an (n, dims) array in
+    [0, 1), all at once: point i is the XOR of the direction numbers at the set bits of
+    i's Gray code. skip=1 drops the all-zero first point.
+    """
+    v = sobol_direction_numbers(dims)
+    index = np.arange(skip, skip + n, dtype=np.uint64)
+    gray = index ^ (index >> np.uint64(1))
+    points = np.zeros((n, dims), dtype=np.uint64)
+    for k in range(int(gray.max()).bit_length() if n else 0):
+        points ^= np.where(((gray >> np.uint64(k)) & np.uint64(1)).astype(bool)[:, None], v[:, k], np.uint64(0))
+    return points.astype(np.float64) / float(1 << SOBOL_BITS)
+
+
+def default_ranges(base: dict, spread: float = DEFAULT_SPREAD) -> dict:
+    """Uniform ranges of ± spread around every base value (angles kept within ANGLE_BOUNDS)"""
+    ranges = {}
+    for name, value in base.items():
+        low, high = value * (1 - spread), value * (1 + spread)
+        if name == "angle":
+            low, high = max(low, ANGLE_BOUNDS[0]), min(high, ANGLE_BOUNDS[1])
+        ranges[name] = {"dist": "uniform", "low": low, "high": high}
+    return ranges
+
+
+def evaluate_outputs(params: dict, model: str = DEFAULT_MODEL, chunk_size: int = DEFAULT_CHUNK_SIZE) -> dict:
+    """
+    OUTPUTS for arrays of diameter (m), velocity (km/s), density and angle, in chunks of
+    chunk_size rows. seismic_magnitude is left unrounded (the API rounds it to 0.1, which
+    would flatten every derivative into steps).
+    """
+    impact_model = get_model(model)
+    n = len(params["diameter"])
+    outputs = {name: np.empty(n) for name in OUTPUTS}
+    for start in range(0, n, chunk_size):
+        rows = slice(start, start + chunk_size)
+        diameter, density, angle = params["diameter"][rows], params["density"][rows], params["angle"][rows]
+        velocity_ms = params["velocity"][rows] * 1000
+        kernel = impact_model.evaluate(diameter, velocity_ms, density, angle)
+        nowhere = np.full(diameter.shape, np.nan)
+        columns = impact_columns(diameter, velocity_ms, density, angle, nowhere, nowhere, kernel)
+        for name in OUTPUTS:
+            outputs[name][rows] = columns[name]
+        outputs["seismic_magnitude"][rows] = seismic_magnitude(kernel.get("ground_energy_joules", kernel["kinetic_energy_joules"]))
+    return outputs
+
+
+def _number(value):
+    """float for JSON; NaN / inf (an index of a constant output, an elasticity at zero) become None"""
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+
+def _from_unit(unit: np.ndarray, names: tuple, ranges: dict, base: dict) -> dict:
+    """Map unit-cube points (one column per varied parameter) through the ranges; the rest stay at base"""
+    n = unit.shape[0]
+    params = {name: np.full(n, float(base[name])) for name in PARAMETERS}
+    for j, name in enumerate(names):
+        params[name] = parameter_quantile(ranges[name], unit[:, j])
+    return params
+
+
+def local_derivatives(base: dict, model: str = DEFAULT_MODEL, relative_step: float = DEFAULT_RELATIVE_STEP,
+                      bounds: dict = None) -> dict:
+    """
+    Central differences of every output at the base point: dy/dx and the elasticity
+    (x / y) dy/dx, the % change of the output per 1% change of the parameter. All
+    2 d + 1 points are evaluated as one batch; a step past `bounds` is cut at the bound.
+    """
+    bounds = bounds or {"angle": ANGLE_BOUNDS}
+    d = len(PARAMETERS)
+    params = {name: np.full(2 * d + 1, float(base[name])) for name in PARAMETERS}
+    steps = {}
+    for j, name in enumerate(PARAMETERS):
+        x = float(base[name])
+        low, high = bounds.get(name, (-np.inf, np.inf))
+        minus, plus = max(x * (1 - relative_step), low), min(x * (1 + relative_step), high)
+        params[name][1 + 2 * j], params[name][2 + 2 * j] = minus, plus
+        steps[name] = plus - minus
+
+    outputs = evaluate_outputs(params, model)
+    result = {}
+    for output, y in outputs.items():
+        derivatives = {}
+        for j, name in enumerate(PARAMETERS):
+            derivative = (y[2 + 2 * j] - y[1 + 2 * j]) / steps[name]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                elasticity = derivative * float(base[name]) / y[0]
+            derivatives[name] = {"derivative": _number(derivative), "elasticity": _number(elasticity)}
+        result[output] = {"value": _number(y[0]), "derivatives": derivatives}
+    return result
+
+
+def sobol_indices(base: dict, ranges: dict, names: tuple, samples: int = DEFAULT_SOBOL_SAMPLES,
+                  model: str = DEFAULT_MODEL, seed=None, bootstrap: int = BOOTSTRAP_RESAMPLES) -> dict:
+    """
+    First-order (S1, Saltelli 2010) and total (ST, Jansen 1999) Sobol indices of every
+    output for the `names` parameters. The A and B matrices are the two halves of one
+    2 d-dimensional Sobol sequence, so the estimates converge much faster than with
+    pseudo-random points; A, B and the d mixed matrices are evaluated N rows at a time,
+    N (d + 2) in all. `samples` is rounded up to a power of two (where Sobol points are
+    balanced). Confidence half-widths come from `bootstrap` resamples.
+    """
+    d = len(names)
+    n = 1 << max(int(np.ceil(np.log2(max(samples, 2)))), 1)
+    unit = sobol_sequence(n, 2 * d)
+    a, b = unit[:, :d], unit[:, d:]
+    outputs = {output: np.empty((d + 2, n)) for output in OUTPUTS}
+    for k in range(d + 2):
+        if k < 2:
+            points = (a, b)[k]
+        else:
+            points = a.copy()
+            points[:, k - 2] = b[:, k - 2]
+        for output, y in evaluate_outputs(_from_unit(points, names, ranges, base), model).items():
+            outputs[output][k] = y
+
+    split = {output: (y[0], y[1], y[2:]) for output, y in outputs.items()}
+    conf = _bootstrap_confidence(split, n, d, bootstrap, np.random.default_rng(seed))
+
+    result = {}
+    for output, (f_a, f_b, f_ab) in split.items():
+        s1, st = _sobol_estimates(f_a, f_b, f_ab)
+        s1_conf, st_conf = conf[output]
+        result[output] = {
+            name: {"S1": _number(s1[i]), "S1_conf": _number(s1_conf[i]), "ST": _number(st[i]), "ST_conf": _number(st_conf[i])}
+            for i, name in enumerate(names)
+        }
+    return {"samples": n, "evaluations": n * (d + 2), "indices": result}
+
+
+def _bootstrap_confidence(split: dict, n: int, d: int, resamples: int, rng: np.random.Generator) -> dict:
+    """
+    CONFIDENCE_Z times the bootstrap standard deviation of S1 and ST, per output. Both
+    estimators only take sample means, so a resample is a vector of draw counts and its
+    means are counts @ columns / N: one matrix product per batch of resamples instead of
+    gathering every resampled point. All outputs share the same resamples.
+    """
+    if not resamples:
+        return {output: (np.full(d, np.nan), np.full(d, np.nan)) for output in split}
+
+    columns = {}
+    for output, (f_a, f_b, f_ab) in split.items():
+        # Centred first: the variance of A and B together is taken as E[x²] - E[x]²
+        center = 0.5 * (f_a.mean() + f_b.mean())
+        x_a, x_b = f_a - center, f_b - center
+        columns[output] = np.column_stack([x_a + x_b, x_a ** 2 + x_b ** 2, (f_b * (f_ab - f_a)).T, (0.5 * (f_a - f_ab) ** 2).T])
+
+    batch = max(1, BOOTSTRAP_BATCH_POINTS // n)
+    means = {output: [] for output in split}
+    for start in range(0, resamples, batch):
+        rows = min(batch, resamples - start)
+        draws = rng.integers(0, n, size=(rows, n)) + n * np.arange(rows)[:, None]
+        counts = np.bincount(draws.ravel(), minlength=rows * n).reshape(rows, n).astype(np.float64)
+        for output, cols in columns.items():
+            means[output].append(counts @ cols / n)
+
+    result = {}
+    for output, parts in means.items():
+        m = np.concatenate(parts)
+        variance = (0.5 * m[:, 1] - (0.5 * m[:, 0]) ** 2)[:, None]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            s1, st = m[:, 2:2 + d] / variance, m[:, 2 + d:] / variance
+        result[output] = (CONFIDENCE_Z * s1.std(axis=0), CONFIDENCE_Z * st.std(axis=0))
+    return result
+
+
+def _sobol_estimates(f_a, f_b, f_ab):
+    """S1 and ST for the last axis as the sample axis; f_ab has the parameters first"""
+    variance = np.concatenate([f_a, f_b], axis=-1).var(axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s1 = np.mean(f_b * (f_ab - f_a), axis=-1) / variance
+        st = 0.5 * np.mean((f_a - f_ab) ** 2, axis=-1) / variance
+    return s1, st
+
+
+def morris_trajectories(trajectories: int, dims: int, levels: int, rng: np.random.Generator):
+    """
+    Morris (1991) one-at-a-time designs on a `levels`-level grid of the unit cube.
+    Returns (points (r, d + 1, d), rank (r, d): the step at which each parameter moves,
+    directions (r, d): the sign of its move, delta): consecutive points differ in one
+    parameter by ±delta.
+    """
+    delta = levels / (2 * (levels - 1))
+    starts = rng.integers(0, levels // 2, size=(trajectories, dims)) / (levels - 1)
+    rank = np.argsort(rng.random((trajectories, dims)), axis=1)
+    directions = rng.choice((-1.0, 1.0), size=(trajectories, dims))
+    # Parameters stepping down start delta higher, so every point stays on the grid
+    starts = np.where(directions > 0, starts, starts + delta)
+    moved = rank[:, None, :] < np.arange(dims + 1)[None, :, None]
+    points = starts[:, None, :] + delta * directions[:, None, :] * moved
+    return points, rank, directions, delta
+
+
+def morris_indices(base: dict, ranges: dict, names: tuple, trajectories: int = DEFAULT_TRAJECTORIES,
+                   levels: int = DEFAULT_LEVELS, model: str = DEFAULT_MODEL, seed=None) -> dict:
+    """
+    Morris elementary-effects screening of every output for the `names` parameters:
+    mu, mu* (mean absolute effect, the importance ranking) and sigma (spread: interactions
+    or non-linearity), per unit of each parameter's range. All r (d + 1) points are
+    evaluated as one batch.
+    """
+    d = len(names)
+    points, rank, directions, delta = morris_trajectories(trajectories, d, levels, np.random.default_rng(seed))
+    outputs = evaluate_outputs(_from_unit(points.reshape(-1, d), names, ranges, base), model)
+
+    result = {}
+    for output, y in outputs.items():
+        steps = np.diff(y.reshape(trajectories, d + 1), axis=1)
+        effects = np.take_along_axis(steps, rank, axis=1) / (delta * directions)
+        result[output] = {
+            name: {"mu": _number(effects[:, i].mean()), "mu_star": _number(np.abs(effects[:, i]).mean()),
+                   "sigma": _number(effects[:, i].std(ddof=1)) if trajectories > 1 else 0.0}
+            for i, name in enumerate(names)
+        }
+    return {"trajectories": trajectories, "levels": levels, "evaluations": trajectories * (d + 1), "indices": result}
+
+
+def ranking(indices: dict, key: str) -> dict:
+    """Parameters per output, most influential first by `key` (missing values last)"""
+    return {
+        output: sorted(by_parameter, key=lambda name: -(by_parameter[name][key] or 0.0))
+        for output, by_parameter in indices.items()
+    }
+
+
+def validate_sensitivity(base: dict, ranges: dict, methods, samples: int, trajectories: int, levels: int,
+                         relative_step: float, model: str = DEFAULT_MODEL):
+    get_model(model)
+    for name in PARAMETERS:
+        if not base[name] > 0:
+            raise ValueError(f"{name} must be positive")
+    if not 0 < base["angle"] <= 90:
+        raise ValueError("angle must be in (0, 90] degrees from horizontal")
+    unknown = set(methods) - set(METHODS) or set(ranges) - set(PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown method or parameter: {', '.join(sorted(unknown))}")
+    if not 2 <= samples <= MAX_SOBOL_SAMPLES:
+        raise ValueError(f"samples must be between 2 and {MAX_SOBOL_SAMPLES}")
+    if not 2 <= trajectories <= MAX_TRAJECTORIES:
+        raise ValueError(f"trajectories must be between 2 and {MAX_TRAJECTORIES}")
+    if levels < 2 or levels % 2:
+        raise ValueError("levels must be an even number of at least 2")
+    if not 0 < relative_step < 0.5:
+        raise ValueError("relative_step must be in (0, 0.5)")
+
+
+def run_sensitivity(base: dict, ranges: dict = None, methods=METHODS, samples: int = DEFAULT_SOBOL_SAMPLES,
+                    trajectories: int = DEFAULT_TRAJECTORIES, levels: int = DEFAULT_LEVELS,
+                    relative_step: float = DEFAULT_RELATIVE_STEP, model: str = DEFAULT_MODEL, seed=None) -> dict:
+    """
+    Which parameter matters most, for energy, crater, magnitude and zone radii: local
+    derivatives at `base` (diameter m, velocity km/s, density kg/m³, angle deg) and
+    global Sobol and Morris indices over `ranges` (distribution specs as for Monte Carlo,
+    default base ± DEFAULT_SPREAD; a "fixed" spec keeps a parameter out of the analysis).
+    """
+    ranges = dict(ranges or {})
+    validate_sensitivity(base, ranges, methods, samples, trajectories, levels, relative_step, model)
+    ranges = {**default_ranges(base), **ranges}
+    names = tuple(name for name in PARAMETERS if ranges[name].get("dist", "fixed") != "fixed")
+
+    result = {
+        "model": get_model(model).name,
+        "base": dict(base),
+        "ranges": ranges,
+        "parameters": list(names),
+        "outputs": list(OUTPUTS),
+    }
+    if "local" in methods:
+        result["local"] = local_derivatives(base, model, relative_step)
+    if names and "sobol" in methods:
+        result["sobol"] = sobol_indices(base, ranges, names, samples, model, seed)
+        result["sobol"]["ranking"] = ranking(result["sobol"]["indices"], "ST")
+    if names and "morris" in methods:
+        result["morris"] = morris_indices(base, ranges, names, trajectories, levels, model, seed)
+        result["morris"]["ranking"] = ranking(result["morris"]["indices"], "mu_star")
+    return result
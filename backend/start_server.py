@@ -1,8 +1,16 @@
+import sys
+
 import uvicorn
 
 if __name__ == "__main__":
+    if "--production" in sys.argv:
+        # Pre-forked workers sharing the preloaded app; see serve.py for the options
+        from serve import main
+        main([arg for arg in sys.argv[1:] if arg != "--production"])
+        sys.exit()
+
     print("🚀 Starting Impactor-2025 Backend Server...")
     print("📊 API will be available at: http://localhost:8000")
     print("📚 Documentation at: http://localhost:8000/docs")
-    print("Press Ctrl+C to stop the server")
-    uvicorn.run("app:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    print("Press Ctrl+C to stop the server (--production for the multi-worker server)")
+    uvicorn.run("app:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,103 @@
+# backend/streaming.py
+import json
+from typing import AsyncIterable, Iterable, Iterator, Optional, Union
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_FORMATS = ("ndjson", "json-stream")
+
+# Encoded records are coalesced into writes of about this many bytes
+STREAM_FLUSH_BYTES = 64 * 1024
+
+
+def stream_format(request: Request, format: Optional[str]) -> Optional[str]:
+    """Streaming mode asked for via ?format= or an NDJSON Accept header, else None"""
+    if format:
+        if format == "json":
+            return None
+        if format not in STREAM_FORMATS:
+            raise ValueError(f"Unknown format '{format}', expected json, ndjson or json-stream")
+        return format
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        return "ndjson"
+    return None
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, separators=(",", ":"))
+
+
+class _Encoder:
+    """
+    Incremental encoder shared by the sync and async paths: feed records in,
+    get back byte chunks of about STREAM_FLUSH_BYTES
+    """
+
+    def __init__(self, fmt: str, header: dict, key: str):
+        self.fmt = fmt
+        self.count = 0
+        self._buffer = []
+        self._size = 0
+        if fmt == "json-stream":
+            self._append("{" + "".join(f"{_dumps(k)}:{_dumps(v)}," for k, v in header.items()) + f"{_dumps(key)}:[")
+
+    def add(self, record: dict) -> Optional[bytes]:
+        if self.fmt == "ndjson":
+            self._append(_dumps(record) + "\n")
+        else:
+            self._append(("," if self.count else "") + _dumps(record))
+        self.count += 1
+        if self._size >= STREAM_FLUSH_BYTES:
+            return self._flush()
+        return None
+
+    def finish(self) -> Optional[bytes]:
+        if self.fmt == "json-stream":
+            self._append(f'],"count":{self.count}}}')
+        return self._flush() if self._buffer else None
+
+    def _append(self, piece: str):
+        self._buffer.append(piece)
+        self._size += len(piece)
+
+    def _flush(self) -> bytes:
+        chunk = "".join(self._buffer).encode()
+        self._buffer, self._size = [], 0
+        return chunk
+
+
+def iter_encoded(fmt: str, records: Iterable[dict], header: dict = None, key: str = "results") -> Iterator[bytes]:
+    """
+    ndjson: one JSON document per line. json-stream: `{**header, key: [records...], "count": n}`
+    emitted incrementally, parsing to the same object the non-streaming endpoint returns.
+    """
+    encoder = _Encoder(fmt, header or {}, key)
+    for record in records:
+        chunk = encoder.add(record)
+        if chunk:
+            yield chunk
+    chunk = encoder.finish()
+    if chunk:
+        yield chunk
+
+
+async def aiter_encoded(fmt: str, records: AsyncIterable[dict], header: dict = None, key: str = "results"):
+    """Async counterpart of iter_encoded"""
+    encoder = _Encoder(fmt, header or {}, key)
+    async for record in records:
+        chunk = encoder.add(record)
+        if chunk:
+            yield chunk
+    chunk = encoder.finish()
+    if chunk:
+        yield chunk
+
+
+def streaming_response(fmt: str, records: Union[Iterable[dict], AsyncIterable[dict]], header: dict = None,
+                       key: str = "results") -> StreamingResponse:
+    media_type = NDJSON_MEDIA_TYPE if fmt == "ndjson" else "application/json"
+    if hasattr(records, "__aiter__"):
+        return StreamingResponse(aiter_encoded(fmt, records, header, key), media_type=media_type)
+    return StreamingResponse(iter_encoded(fmt, records, header, key), media_type=media_type)
@@ -23,6 +23,43 @@ def test_simulation():
     except Exception as e:
         print(f"❌ Simulation test failed: {e}")
 
+def test_batch_simulation():
+    """Test the batch simulation endpoint"""
+    test_data = {
+        "scenarios": [
+            {"diameter": 50, "velocity": 17, "density": 3000, "lat": 40.7128, "lon": -74.0060},
+            {"diameter": 100, "velocity": 20, "density": 3000},
+            {"diameter": 1000, "velocity": 25, "density": 2600, "lat": 51.5074, "lon": -0.1278}
+        ]
+    }
+    
+    try:
+        response = requests.post(f"{BASE_URL}/simulate/batch", json=test_data)
+        print("✅ Batch simulation endpoint test:")
+        print(f"Status Code: {response.status_code}")
+        print("Response:", json.dumps(response.json(), indent=2))
+        print("-" * 50)
+    except Exception as e:
+        print(f"❌ Batch simulation test failed: {e}")
+
+def test_monte_carlo():
+    """Test the Monte Carlo sweep endpoint"""
+    test_data = {
+        "diameter": {"dist": "loguniform", "low": 120, "high": 270},
+        "velocity": {"dist": "normal", "mean": 20, "std": 2},
+        "samples": 200000,
+        "seed": 42
+    }
+    
+    try:
+        response = requests.post(f"{BASE_URL}/simulate/monte-carlo", json=test_data)
+        print("✅ Monte Carlo endpoint test:")
+        print(f"Status Code: {response.status_code}")
+        print("Response:", json.dumps(response.json(), indent=2))
+        print("-" * 50)
+    except Exception as e:
+        print(f"❌ Monte Carlo test failed: {e}")
+
 def test_mitigation():
     """Test the mitigation endpoint"""
     test_data = {
@@ -43,7 +80,28 @@ def test_mitigation():
     except Exception as e:
         print(f"❌ Mitigation test failed: {e}")
 
+def test_mitigation_sweep():
+    """Test the minimum delta-v sweep endpoint"""
+    test_data = {
+        "velocity": 20,
+        "lead_times_days": [90, 365, 730, 1825, 3650],
+        "delta_v_min": 0.0001,
+        "delta_v_max": 10,
+        "delta_v_points": 400
+    }
+    
+    try:
+        response = requests.post(f"{BASE_URL}/simulate-mitigation/sweep", json=test_data)
+        print("✅ Mitigation sweep endpoint test:")
+        print(f"Status Code: {response.status_code}")
+        print("Response:", json.dumps(response.json(), indent=2))
+    except Exception as e:
+        print(f"❌ Mitigation sweep test failed: {e}")
+
 if __name__ == "__main__":
     print("🧪 Testing Impactor-2025 API Endpoints...")
     test_simulation()
-    test_mitigation()
\ No newline at end of file
+    test_batch_simulation()
+    test_monte_carlo()
+    test_mitigation()
+    test_mitigation_sweep()
\ No newline at end of file
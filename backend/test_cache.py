@@ -0,0 +1,40 @@
+from fastapi.testclient import TestClient
+
+import app as api
+from cache import ResponseMemo
+
+
+def test_response_memo_serves_quantized_repeats_byte_for_byte():
+    """Near-equal inputs share one entry; hits skip the computation; the oldest entry goes past max_entries"""
+    memo = ResponseMemo(max_entries=2, digits=6)
+    assert memo.quantize_inputs({"diameter": 150.0000001}) == memo.quantize_inputs({"diameter": 150.0})
+
+    calls = []
+    compute = api.compute_impact
+
+    def counting(impact):
+        calls.append(impact.diameter)
+        return compute(impact)
+
+    original = api.response_memo, api.result_store, api.compute_impact
+    api.response_memo, api.result_store, api.compute_impact = memo, None, counting
+    try:
+        with TestClient(api.app) as client:
+            base = {"velocity": 20.0, "density": 3000.0}
+            first = client.post("/simulate", json={"diameter": 150.0, **base})
+            repeat = client.post("/simulate", json={"diameter": 150.0, **base})
+            near = client.post("/simulate", json={"diameter": 150.0000001, **base})
+            assert first.status_code == repeat.status_code == near.status_code == 200
+            assert repeat.content == first.content and near.content == first.content
+            assert calls == [150.0]
+
+            client.post("/simulate", json={"diameter": 200.0, **base})
+            client.post("/simulate", json={"diameter": 250.0, **base})   # evicts 150 m
+            again = client.post("/simulate", json={"diameter": 150.0, **base})
+            assert again.content == first.content and calls == [150.0, 200.0, 250.0, 150.0]
+
+            stats = client.get("/cache-stats").json()["responses"]
+            assert stats["hits"] == 2 and stats["misses"] == 4 and stats["evictions"] == 2
+            assert stats["entries"] == 2 and stats["max_entries"] == 2 and stats["hit_rate"] == 2 / 6
+    finally:
+        api.response_memo, api.result_store, api.compute_impact = original
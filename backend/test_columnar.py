@@ -0,0 +1,69 @@
+import json
+
+import msgpack
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import app as api
+
+
+def test_columnar_formats_carry_the_same_results_as_rows():
+    """Columns, MessagePack and rows agree; zone metadata appears once instead of per row"""
+    scenarios = [{"diameter": 5.0 * (i + 1), "velocity": 11.0 + i % 30, "density": 3000.0, "lat": 10.0, "lon": -20.0}
+                 for i in range(400)]
+    scenarios[7]["lat"] = scenarios[7]["lon"] = None
+    body = {"scenarios": scenarios, "model": "airburst"}
+    with TestClient(api.app) as client:
+        rows = client.post("/simulate/batch", json=body).json()["results"]
+        columnar = client.post("/simulate/batch", params={"format": "columns"}, json=body)
+        packed = client.post("/simulate/batch", json=body, headers={"Accept": "application/msgpack"})
+        for unknown in ("parquet", "csv"):
+            assert client.post("/simulate/batch", params={"format": unknown}, json=body).status_code == 400
+            assert client.get("/jobs/0/results", params={"format": unknown}).status_code == 400
+
+    assert packed.headers["content-type"] == "application/msgpack"
+    assert len(packed.content) < len(columnar.content) < len(json.dumps(rows)) / 3
+    as_json, as_msgpack = columnar.json(), msgpack.unpackb(packed.content)
+    assert as_json["count"] == as_msgpack["count"] == 400 and as_msgpack["zones"] == as_json["zones"]
+
+    for name, values in as_json["columns"].items():
+        decoded = np.frombuffer(as_msgpack["columns"][name], dtype=as_msgpack["dtypes"]["columns"])
+        assert np.array_equal(decoded, np.array(values, dtype=np.float64), equal_nan=True)
+
+    thermal = as_json["zones"]["thermal_zone"]
+    severity = as_json["labels"]["severity_level"]
+    codes = np.frombuffer(as_msgpack["labels"]["severity_level"]["codes"], dtype=as_msgpack["dtypes"]["codes"])
+    for i, row in enumerate(rows):
+        assert row["kinetic_energy_joules"] == as_json["columns"]["kinetic_energy_joules"][i]
+        assert row["impact_zones"]["thermal_zone"]["radius"] == as_json["columns"][thermal["radius_column"]][i]
+        assert row["impact_zones"]["thermal_zone"]["color"] == thermal["color"]
+        assert row["comparisons"]["severity_level"] == severity["categories"][severity["codes"][i]]
+        assert severity["codes"][i] == codes[i]
+        assert row["burst_altitude_km"] == as_json["columns"]["burst_altitude_km"][i]
+    assert as_json["columns"]["lat"][7] is None
+
+
+def test_arrow_stream_round_trips():
+    """The Arrow IPC stream reads back to the columnar JSON values, labels as dictionary arrays"""
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+
+    scenarios = [{"diameter": 20.0 * (i + 1), "velocity": 12.0 + i % 25, "density": 2500.0} for i in range(300)]
+    with TestClient(api.app) as client:
+        as_json = client.post("/simulate/batch", params={"format": "columns"}, json={"scenarios": scenarios}).json()
+        arrow = client.post("/simulate/batch", json={"scenarios": scenarios},
+                            headers={"Accept": "application/vnd.apache.arrow.stream"})
+    assert arrow.status_code == 200 and arrow.headers["content-type"] == "application/vnd.apache.arrow.stream"
+
+    table = pyarrow.ipc.open_stream(arrow.content).read_all()
+    assert table.num_rows == 300
+    metadata = {key.decode(): json.loads(value) for key, value in table.schema.metadata.items()}
+    assert metadata["count"] == 300 and metadata["zones"] == as_json["zones"]
+    for name, values in as_json["columns"].items():
+        assert table.column(name).type == pyarrow.float64()
+        assert np.array_equal(table.column(name).to_numpy(), np.array(values, dtype=np.float64), equal_nan=True)
+    for name, label in as_json["labels"].items():
+        column = table.column(name).combine_chunks()
+        assert column.dictionary.to_pylist() == label["categories"]
+        assert column.indices.to_pylist() == label["codes"]
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import app as api
+from simulation.deflection import (
+    DAY_S, EARTH_ESCAPE_SPEED, EARTH_RADIUS_KM, b_plane_axes, capture_radius, deflect, deflection_basis,
+    encounter_state, entry_speed, min_delta_v_sweep, v_infinity,
+)
+
+
+def test_b_plane_miss_grows_linearly_with_delta_v_times_lead_time():
+    """Miss ∝ Δv exactly; for short leads it is Δv·t times the kick's b-plane component"""
+    miss = deflect(10.0, [1.0, 2.0, 4.0], 20.0)["miss_distance_km"]
+    assert np.allclose(miss[1:] / miss[0], [2.0, 4.0], rtol=1e-6)
+
+    r, v, v_earth, _ = encounter_state(20.0)
+    kick = deflection_basis(r, v, "along_track")
+    xi, zeta, _ = b_plane_axes(v - v_earth)
+    across = np.hypot(kick @ xi, kick @ zeta)
+    for lead in (0.05, 0.1, 0.5):
+        straight_line = 1e-3 * lead * DAY_S * across   # 1 mm/s for `lead` days, in km
+        assert np.isclose(deflect([lead], [1.0], 20.0)["miss_distance_km"][0], straight_line, rtol=3e-3)
+    # Over years the along-track drift compounds: far more than linear in the lead time
+    short, long = deflect([10.0, 3650.0], [1.0], 20.0)["miss_distance_km"]
+    assert long > 365 * short
+
+
+def test_capture_radius_and_escape_speed():
+    """b = R sqrt(1 + v_esc² / v_inf²): R√2 at v_inf = v_esc, R·v/v_inf at entry speed v"""
+    assert np.isclose(EARTH_ESCAPE_SPEED, 11.186, atol=1e-3)
+    assert np.isclose(capture_radius(EARTH_ESCAPE_SPEED), EARTH_RADIUS_KM * np.sqrt(2))
+    assert np.isclose(v_infinity(20.0), np.sqrt(20.0 ** 2 - EARTH_ESCAPE_SPEED ** 2))
+    assert np.isclose(capture_radius(v_infinity(20.0)), EARTH_RADIUS_KM * 20.0 / v_infinity(20.0))
+
+    # Nothing from afar enters slower than escape speed: such a velocity is v_inf itself
+    for below in (EARTH_ESCAPE_SPEED, 11.0, 5.0):
+        assert v_infinity(below) == below and np.isclose(entry_speed(below), np.hypot(below, EARTH_ESCAPE_SPEED))
+        assert deflect([10.0], [1.0], below)["v_infinity_km_s"] == below
+    assert np.isclose(entry_speed(20.0), 20.0)
+    for bad in (0.0, -5.0, float("nan")):
+        with pytest.raises(ValueError):
+            deflect([10.0], [1.0], bad)
+
+    with TestClient(api.app) as client:
+        body = {"diameter": 150, "density": 3000, "delta_v": 0.05, "time_before_impact": 365, "lat": 40, "lon": -74}
+        for velocity in (5.0, 10.0):
+            response = client.post("/simulate-mitigation", json=dict(body, velocity=velocity))
+            assert response.status_code == 200
+            assert response.json()["v_infinity_km_s"] == velocity
+            assert response.json()["entry_velocity_km_s"] > EARTH_ESCAPE_SPEED
+        assert client.post("/simulate-mitigation", json=dict(body, velocity=0)).status_code == 400
+
+
+def test_sweep_threshold_and_margin():
+    """The minimum Δv puts the miss at margin × capture radius; bad margins are 400s"""
+    sweep = min_delta_v_sweep([30.0, 365.0], np.logspace(-1, 3, 200), 20.0, margin=2.0)
+    assert sweep["threshold_km"] == 2.0 * sweep["capture_radius_km"]
+    assert np.all(np.diff(sweep["min_delta_v_ms"]) < 0)   # more warning, less push
+    for lead, dv in zip([30.0, 365.0], sweep["min_delta_v_ms"]):
+        miss = deflect([lead], [dv], 20.0)["miss_distance_km"][0]
+        assert np.isclose(miss, sweep["threshold_km"], rtol=1e-2)
+
+    with TestClient(api.app) as client:
+        body = {"velocity": 20.0, "lead_times_days": [30, 365]}
+        assert client.post("/simulate-mitigation/sweep", json=body).status_code == 200
+        for margin in (0, -1):
+            assert client.post("/simulate-mitigation/sweep", json=dict(body, margin=margin)).status_code == 400
+        assert client.post("/simulate-mitigation/sweep", json=dict(body, velocity=10.0)).status_code == 200
+        assert client.post("/simulate-mitigation/sweep", json=dict(body, velocity=-1.0)).status_code == 400
@@ -0,0 +1,58 @@
+import math
+import os
+import tempfile
+
+import numpy as np
+
+from simulation.exposure import EARTH_RADIUS_KM, PopulationRaster, cap_area_km2, load_population_raster
+
+
+def test_uniform_density_matches_spherical_caps():
+    """With 10 people/km² everywhere, exposure is 10 x cap area at any latitude, across the antimeridian"""
+    raster = PopulationRaster(np.full((720, 1440), 10.0, dtype=np.float32), kind="density")
+    radii = [2.0, 50.0, 300.0, 1500.0, 5000.0]
+
+    for lat, lon in ((0.0, 0.0), (60.0, 179.9), (-75.0, -120.0), (88.0, 10.0)):
+        population, area = raster.exposure(lat, lon, radii)
+        for radius, p, a in zip(radii, population, area):
+            expected = float(cap_area_km2(radius))
+            assert abs(a - expected) / expected < 1e-9
+            assert abs(p - 10 * expected) / (10 * expected) < 1e-4
+
+    # The whole globe, whatever the centre
+    population, area = raster.exposure(30.0, 30.0, [25000.0])
+    assert abs(area[0] - 4 * math.pi * EARTH_RADIUS_KM ** 2) / area[0] < 1e-6
+
+
+def test_count_raster_round_trips_memory_mapped():
+    """A saved count raster loads memory-mapped and bins a populated cell into the right zones"""
+    values = np.zeros((180, 360), dtype=np.float32)
+    values[90 - 41, 180 - 74] = 1000.0   # cell centred on 40.5N, 73.5W
+    values[0, 0] = -9999.0               # nodata
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "population.npy")
+        PopulationRaster(values).save(path)
+        raster = load_population_raster(path)
+        assert isinstance(raster.values, np.memmap)
+
+        # The 10 km disc holds its area share of the cell; the 500 km one the whole cell
+        zones = raster.zone_exposure(40.5, -73.5, {"crater": 10.0, "thermal": 500.0})
+        cell_area = float(raster.row_area[90 - 41])
+        assert abs(zones["crater"]["population"] - 1000.0 * float(cap_area_km2(10.0)) / cell_area) < 1e-6
+        assert abs(zones["thermal"]["population"] - 1000.0) / 1000.0 < 0.05
+
+        columns = {
+            "lat": np.array([40.5, 10.0, np.nan]),
+            "lon": np.array([-73.5, 10.0, np.nan]),
+            "epicenter": np.array([10.0, 10.0, 10.0]),
+            "ejecta_radius": np.array([80.0, 80.0, 80.0]),
+            "earthquake_radius": np.array([150.0, 150.0, 150.0]),
+            "shockwave_radius": np.array([250.0, 250.0, 250.0]),
+            "thermal_radius": np.array([500.0, 500.0, 500.0]),
+        }
+        exposure = raster.exposure_columns(columns)["population_exposure"]
+        assert abs(exposure[0]["shockwave"]["population"] - 1000.0) / 1000.0 < 0.1
+        assert exposure[1]["thermal"]["population"] == 0.0
+        assert exposure[2] is None
+        del raster
@@ -0,0 +1,86 @@
+import asyncio
+import os
+import tempfile
+import time
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import app as api
+from hazard_ranking import hazard_scores, new_columns, parse_browse_objects, rank_catalog
+from jobs import JobManager, JobStore
+from nasa_client import NeoWsClient
+from nasa_stub import NeoWsStub, browse_payload
+
+
+def test_catalog_ranking_matches_brute_force_and_resumes():
+    """Top-k from the paged pipeline equals a full sort; an interrupted run resumes from its checkpoint"""
+    class Interrupted(Exception):
+        pass
+
+    def stop_after(pages):
+        def progress(done, total):
+            if done >= pages:
+                raise Interrupted()
+        return progress
+
+    with NeoWsStub(catalog_size=1000) as stub, tempfile.TemporaryDirectory() as tmp:
+        columns = new_columns()
+        skipped = sum(parse_browse_objects(browse_payload(p, 20, 1000)["near_earth_objects"], columns) for p in range(50))
+        _, scores = hazard_scores(columns, 3000.0, 45.0, "fast")
+        expected = [columns["id"][i] for i in np.argsort(-scores, kind="stable")[:25]]
+
+        async def run(progress=None, checkpoint=None):
+            client = NeoWsClient(stub.base_url, "TEST_KEY", rate_limit=1000, rate_burst=100)
+            try:
+                return await rank_catalog(client, k=25, checkpoint_path=checkpoint, progress=progress, chunk_pages=7)
+            finally:
+                await client.aclose()
+
+        full = asyncio.run(run())
+        assert [r["id"] for r in full["top"]] == expected
+        assert full["ranked"] + full["skipped"] == 1000 and full["skipped"] == skipped
+        assert [r["score"] for r in full["top"]] == sorted((r["score"] for r in full["top"]), reverse=True)
+
+        checkpoint = os.path.join(tmp, "ranking.json")
+        try:
+            asyncio.run(run(stop_after(21), checkpoint))
+        except Interrupted:
+            pass
+        before = stub.request_count
+        resumed = asyncio.run(run(checkpoint=checkpoint))
+        assert stub.request_count - before == 50 - 21
+        assert resumed == full
+
+
+def test_finished_ranking_job_is_reused_until_refreshed():
+    """A done ranking answers resubmissions without NeoWs traffic; refresh walks the catalog again"""
+    def finished(client, submitted):
+        while submitted["status"] not in ("done", "failed"):
+            time.sleep(0.02)
+            submitted = client.get(f"/jobs/{submitted['id']}").json()
+        return submitted
+
+    with NeoWsStub(catalog_size=200) as stub, tempfile.TemporaryDirectory() as tmp:
+        original, saved_jobs = api.nasa, api.jobs
+        api.nasa = NeoWsClient(stub.base_url, "TEST_KEY", rate_limit=1000, rate_burst=100)
+        api.jobs = JobManager(JobStore(tmp))
+        try:
+            with TestClient(api.app) as client:
+                first = finished(client, client.post("/jobs/catalog-ranking", json={"k": 5}).json())
+                assert first["status"] == "done"
+                assert not os.listdir(os.path.join(tmp, "checkpoints"))
+                result = client.get(f"/jobs/{first['id']}/results").json()
+
+                requests = stub.request_count
+                again = client.post("/jobs/catalog-ranking", json={"k": 5}).json()
+                assert again["id"] == first["id"] and again["status"] == "done"
+                assert stub.request_count == requests
+
+                refreshed = client.post("/jobs/catalog-ranking", json={"k": 5, "refresh": True}).json()
+                assert refreshed["id"] == first["id"] and refreshed["status"] == "queued"
+                assert finished(client, refreshed)["status"] == "done"
+                assert stub.request_count > requests
+                assert client.get(f"/jobs/{first['id']}/results").json() == result
+        finally:
+            api.nasa, api.jobs = original, saved_jobs
@@ -0,0 +1,69 @@
+import numpy as np
+from fastapi.testclient import TestClient
+
+import app as api
+from simulation.exposure import great_circle_km
+from simulation.heatmap import HeatmapGrid, HeatmapStore, exposure_map, frequency_map
+
+
+def test_heatmaps_match_brute_force_distances():
+    """Prefix-sum exposure and difference-array footprints equal a direct distance check per cell"""
+    grid = HeatmapGrid(1.0)
+    rng = np.random.default_rng(3)
+    counts = rng.random((grid.rows, grid.cols))
+    lat = np.degrees(grid.row_lat)
+    lon = -180.0 + grid.resolution * (np.arange(grid.cols) + 0.5)
+
+    for radius in (150.0, 2500.0, 25000.0):
+        values = exposure_map(counts, grid, radius)
+        for i, c in ((0, 0), (45, 359), (90, 180), (179, 17)):
+            inside = great_circle_km(lat[i], lon[c], lat[:, None], lon[None, :]) <= radius
+            assert abs(values[i, c] - counts[inside].sum()) < 1e-6
+
+    s_lat, s_lon = np.array([40.0, -89.0, 0.0]), np.array([179.9, 10.0, -180.0])
+    s_radius, s_weight = np.array([800.0, 400.0, 3000.0]), np.array([0.5, 1.0, 2.0])
+    expected = sum(
+        w * (great_circle_km(a, b, lat[:, None], lon[None, :]) <= r)
+        for a, b, r, w in zip(s_lat, s_lon, s_radius, s_weight)
+    )
+    assert np.allclose(frequency_map(grid, s_lat, s_lon, s_radius, s_weight), expected)
+
+
+def test_heatmap_endpoints_store_and_serve_tiles(tmp_path):
+    """Creation is idempotent, meta lists the non-empty tiles, tiles decode to the grid, the rest are 204/404"""
+    request = {"metric": "frequency", "zone": "shockwave", "resolution": 1.0, "tile_size": 64,
+               "scenarios": [{"diameter": 800.0, "velocity": 20.0, "lat": 40.0, "lon": -74.0, "weight": 0.25}]}
+    original = api.heatmap_store
+    api.heatmap_store = HeatmapStore(str(tmp_path))
+    try:
+        with TestClient(api.app) as client:
+            created = client.post("/heatmaps", json=request)
+            assert created.status_code == 200
+            meta = created.json()
+            assert (meta["rows"], meta["cols"], meta["tiles_y"], meta["tiles_x"]) == (180, 360, 3, 6)
+            assert 0 < len(meta["tiles"]) < 18 and meta["max"] == 0.25
+            assert client.post("/heatmaps", json=request).json() == meta
+            assert client.get(f"/heatmaps/{meta['id']}").json() == meta
+
+            total = 0.0
+            for ty, tx in meta["tiles"]:
+                tile = client.get(f"/heatmaps/{meta['id']}/tiles/{ty}/{tx}")
+                assert tile.status_code == 200 and tile.headers["content-encoding"] == "deflate"
+                assert tile.headers["x-tile-dtype"] == "float32" and "immutable" in tile.headers["cache-control"]
+                shape = tuple(int(n) for n in tile.headers["x-tile-shape"].split(","))
+                values = np.frombuffer(tile.content, dtype="<f4").reshape(shape)   # deflate undone by the client
+                assert np.all((values == 0) | (values == 0.25))
+                total += float(values.sum())
+            assert np.isclose(total, meta["total"])
+
+            empty = next((ty, tx) for ty in range(3) for tx in range(6) if [ty, tx] not in meta["tiles"])
+            blank = client.get(f"/heatmaps/{meta['id']}/tiles/{empty[0]}/{empty[1]}")
+            assert blank.status_code == 204 and blank.content == b"" and blank.headers["x-tile-shape"] == "64,64"
+
+            assert client.get(f"/heatmaps/{meta['id']}/tiles/3/0").status_code == 404
+            assert client.get("/heatmaps/0123abcd").status_code == 404
+            assert client.get("/heatmaps/0123abcd/tiles/0/0").status_code == 404
+            assert client.post("/heatmaps", json=dict(request, tile_size=8)).status_code == 400
+            assert client.post("/heatmaps", json=dict(request, resolution=0.7)).status_code == 400
+    finally:
+        api.heatmap_store = original
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from fastapi.testclient import TestClient
+
+import app as api
+import simulation.parallel as parallel
+from jobs import JobManager, JobStore
+
+
+def wait_for(client, job_id, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        state = client.get(f"/jobs/{job_id}").json()
+        if state["status"] in ("done", "failed", "cancelled") or time.monotonic() > deadline:
+            return state
+        time.sleep(0.02)
+
+
+def test_batch_job_pages_match_the_synchronous_batch():
+    """Paged job results equal /simulate/batch row for row; resubmitting returns the same job"""
+    scenarios = [
+        {"diameter": 10.0 + 7 * i, "velocity": 12.0 + i % 9, "density": 3000.0, "lat": (i % 50) - 25.0, "lon": 3.0 * i}
+        for i in range(250)
+    ]
+    scenarios[3]["lat"] = scenarios[3]["lon"] = None
+    saved_jobs, saved_chunk = api.jobs, api.JOB_CHUNK_ROWS
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            api.jobs, api.JOB_CHUNK_ROWS = JobManager(JobStore(tmp)), 64
+            with TestClient(api.app) as client:
+                submitted = client.post("/jobs/batch", json={"scenarios": scenarios, "model": "pi_scaling"})
+                assert submitted.status_code == 202
+                job_id = submitted.json()["id"]
+
+                events = client.get(f"/jobs/{job_id}/events").text
+                states = [json.loads(line[6:]) for line in events.splitlines() if line.startswith("data: ")]
+                assert states[-1]["status"] == "done" and states[-1]["rows"] == 250
+                assert [s["progress"] for s in states] == sorted(s["progress"] for s in states)
+
+                rows, offset = [], 0
+                while offset is not None:
+                    page = client.get(f"/jobs/{job_id}/results", params={"offset": offset, "limit": 100}).json()
+                    rows += page["results"]
+                    offset = page["next_offset"]
+                expected = client.post("/simulate/batch", json={"scenarios": scenarios, "model": "pi_scaling"}).json()
+                assert rows == expected["results"]
+
+                again = client.post("/jobs/batch", json={"scenarios": scenarios, "model": "pi_scaling"}).json()
+                assert again["id"] == job_id and again["status"] == "done"
+                assert client.get("/jobs/nosuchjob/results").status_code == 404
+        finally:
+            api.jobs, api.JOB_CHUNK_ROWS = saved_jobs, saved_chunk
+
+
+def test_monte_carlo_job_cancels_and_resubmits():
+    """A cancelled job stops at its next chunk; the same request then runs afresh and matches the sharded endpoint"""
+    request = {"diameter": {"dist": "loguniform", "low": 50, "high": 500}, "samples": 2_000_000, "chunk_size": 10_000, "seed": 5}
+    saved_jobs, saved_min = api.jobs, parallel.PARALLEL_MIN_SAMPLES
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            api.jobs = JobManager(JobStore(tmp), workers=1)
+            parallel.PARALLEL_MIN_SAMPLES = 10_000   # the endpoint shards this run over the pool
+            with TestClient(api.app) as client:
+                job_id = client.post("/jobs/monte-carlo", json=request).json()["id"]
+                assert client.delete(f"/jobs/{job_id}").status_code == 200
+                state = wait_for(client, job_id)
+                assert state["status"] == "cancelled" and state["progress"] < 1
+                assert client.get(f"/jobs/{job_id}/results").status_code == 409
+
+                small = dict(request, samples=20_000)
+                job_id = client.post("/jobs/monte-carlo", json=small).json()["id"]
+                assert wait_for(client, job_id)["status"] == "done"
+                result = client.get(f"/jobs/{job_id}/results").json()
+                assert result == client.post("/simulate/monte-carlo", json=small).json()
+                assert client.post("/jobs/monte-carlo", json=dict(request, samples=0)).status_code == 400
+        finally:
+            api.jobs, parallel.PARALLEL_MIN_SAMPLES = saved_jobs, saved_min
+            parallel.shutdown_executor()
+
+
+def test_finished_jobs_expire_after_the_retention():
+    """Finished jobs leave memory and disk once the retention has passed; running ones stay"""
+    async def scenario(tmp):
+        manager = JobManager(JobStore(tmp), retention=3600)
+        release = asyncio.Event()
+
+        async def wait(job):
+            await release.wait()
+            return {"waited": True}
+
+        done = manager.submit("sum", {"n": 1}, lambda job: {"total": 1})
+        running = manager.submit("wait", {}, wait)
+        await manager.jobs[done["id"]].task
+        assert manager.expire() == 0
+
+        later = time.time() + 3601
+        assert manager.expire(now=later) == 1
+        assert manager.get(done["id"]) is None and not os.path.exists(os.path.join(tmp, done["id"]))
+        assert manager.get(running["id"])["status"] == "running"
+
+        release.set()
+        await manager.jobs[running["id"]].task
+        assert manager.expire(now=later + 3601) == 1 and manager.jobs == {} and os.listdir(tmp) == []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(scenario(tmp))
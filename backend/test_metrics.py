@@ -0,0 +1,70 @@
+import asyncio
+import json
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import app as api
+import metrics
+from nasa_client import NeoWsClient
+from simulation.calculations import ImpactCalculator
+from simulation.parallel import parallel_batch_simulation, shutdown_executor
+from nasa_stub import NeoWsStub
+
+
+def test_metrics_and_server_timing():
+    """Upstream fetches and calculator stages are timed, exported on /metrics and in Server-Timing"""
+    with NeoWsStub() as stub:
+        original, original_catalog = api.nasa, api.catalog
+        api.nasa = NeoWsClient(stub.base_url, "TEST_KEY")
+        api.catalog = None
+        metrics.SERVER_TIMING = True
+        try:
+            with TestClient(api.app) as client:
+                sim = client.get("/simulate-impact-nasa/3073925200")
+                assert sim.status_code == 200
+                stages = [entry.split(";")[0] for entry in sim.headers["server-timing"].split(", ")]
+                assert {"nasa_fetch", "nasa_parse", "model_fast", "app"} <= set(stages)
+
+                text = client.get("/metrics").text
+                assert 'nasa_upstream_requests_total{endpoint="neo",outcome="ok"}' in text
+                assert 'route="/simulate-impact-nasa/{asteroid_id}"' in text
+                assert 'stage_duration_seconds_count{stage="model_fast"}' in text
+                assert "nasa_cache_hits_total" in text
+        finally:
+            metrics.SERVER_TIMING = False
+            api.nasa, api.catalog = original, original_catalog
+
+
+def test_batch_rows_add_no_per_row_spans():
+    """Streaming a batch times the model kernel once per chunk, never a step per row"""
+    scenarios = [{"diameter": 10.0 + i, "velocity": 15.0, "density": 3000.0} for i in range(2_000)]
+    stages = ("model_fast", "impact_columns")
+    with TestClient(api.app) as client:
+        before = [metrics.STAGE_SECONDS.count(name) for name in stages]
+        streamed = client.post("/simulate/batch", params={"format": "ndjson"}, json={"scenarios": scenarios})
+        rows = [json.loads(line) for line in streamed.text.splitlines()]
+        assert len(rows) == 2_000
+        for row in rows[::97]:
+            zones = row["impact_zones"]
+            assert zones == ImpactCalculator.calculate_impact_zones(zones["epicenter"], row["kinetic_energy_megatons"])
+        # 2,000 rows are one chunk: one span per stage
+        assert [metrics.STAGE_SECONDS.count(name) for name in stages] == [n + 1 for n in before]
+        text = client.get("/metrics").text
+        assert 'stage="calculate_impact_zones"' not in text and 'stage="calculate_kinetic_energy"' not in text
+
+        before = [metrics.STAGE_SECONDS.count(name) for name in stages]
+        assert client.post("/simulate/batch", json={"scenarios": scenarios}).status_code == 200
+        assert [metrics.STAGE_SECONDS.count(name) for name in stages] == [n + 1 for n in before]
+
+
+def test_parallel_shards_report_their_stages():
+    """Each pool shard's kernel and column timings are recorded by the parent process"""
+    stages = ("model_fast", "impact_columns")
+    with TestClient(api.app):
+        before = [metrics.STAGE_SECONDS.count(name) for name in stages]
+        try:
+            asyncio.run(parallel_batch_simulation(np.linspace(10, 500, 3_000), 18.0, 3000.0, workers=3))
+        finally:
+            shutdown_executor()
+        assert [metrics.STAGE_SECONDS.count(name) for name in stages] == [n + 3 for n in before]
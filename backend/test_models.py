@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from simulation.calculations import ImpactCalculator, iter_impact_summaries, run_batch_simulation
+from simulation.models import MODELS, get_model
+
+
+def test_fast_model_matches_the_calculator_and_every_model_fills_the_shared_columns():
+    """The default model reproduces ImpactCalculator; all models go through the same output columns"""
+    diameter, velocity, density = np.array([10.0, 60.0, 400.0, 5000.0]), np.array([12.0, 17.0, 20.0, 30.0]), 3000.0
+    columns = run_batch_simulation(diameter, velocity, density)
+    energy = ImpactCalculator.calculate_kinetic_energy(diameter, velocity * 1000, density)
+    crater = ImpactCalculator.calculate_crater_size(energy)
+    assert np.allclose(columns["kinetic_energy_joules"], energy)
+    assert np.allclose(columns["crater_diameter_km"], crater["diameter"] / 1000)
+    assert list(columns["impact_type"]) == ["airburst / local", "regional", "continental", "global"]
+
+    for name in MODELS:
+        columns = run_batch_simulation(diameter, velocity, density, angle=30.0, model=name)
+        summary = list(iter_impact_summaries(columns))[1]
+        assert summary["angle_deg"] == 30.0
+        assert summary["impact_zones"]["shockwave_radius"] >= 0
+        assert all(columns[extra].shape == diameter.shape for extra in get_model(name).extra_columns)
+
+    with pytest.raises(ValueError):
+        get_model("no-such-model")
+
+
+def test_angle_and_atmosphere_change_the_outcome():
+    """Pi-scaling craters shrink at grazing angles; small stones burst aloft while large irons crater"""
+    pi_scaling = get_model("pi_scaling")
+    steep = pi_scaling.evaluate(1000.0, 20e3, 3000.0, 90.0)["crater_diameter_m"]
+    grazing = pi_scaling.evaluate(1000.0, 20e3, 3000.0, 15.0)["crater_diameter_m"]
+    assert grazing < steep
+
+    airburst = get_model("airburst").evaluate([19.0, 60.0, 50.0], [19e3, 15e3, 12.8e3], [3300.0, 3000.0, 7800.0],
+                                              [18.0, 45.0, 45.0])
+    # Chelyabinsk- and Tunguska-like bodies burst in the air, a Barringer-like iron reaches the ground
+    assert 20 < airburst["burst_altitude_km"][0] < 45
+    assert 0 < airburst["burst_altitude_km"][1] < 15
+    assert np.isnan(airburst["burst_altitude_km"][2])
+    assert list(airburst["crater_diameter_m"][:2]) == [0.0, 0.0] and airburst["crater_diameter_m"][2] > 500
+    assert airburst["ground_energy_joules"][1] == 0.0
+
+    with pytest.raises(ValueError):
+        pi_scaling.evaluate(100.0, 20e3, 3000.0, 0.0)
+
+
+def test_entry_integrator_converges_and_conserves_energy():
+    """Halving the step barely moves the burst; deposited plus ground energy is the entry energy"""
+    from simulation.entry import integrate_entry
+
+    diameter, velocity, density, angle = [19.0, 60.0, 80.0], [19e3, 15e3, 12.8e3], [3300.0, 3000.0, 7800.0], [18.0, 45.0, 45.0]
+    coarse = integrate_entry(diameter, velocity, density, angle, dt=0.04)
+    fine = integrate_entry(diameter, velocity, density, angle, dt=0.02, profile=True)
+    assert list(fine["airburst"]) == [True, True, False]
+    assert np.allclose(coarse["burst_altitude_m"][:2], fine["burst_altitude_m"][:2], rtol=0.02)
+
+    energy = 0.5 * np.array(density) * np.pi / 6 * np.array(diameter) ** 3 * np.array(velocity) ** 2
+    total = fine["energy_deposited_joules"] + 0.5 * fine["ground_mass_kg"] * fine["ground_velocity_ms"] ** 2
+    assert np.allclose(total, energy, rtol=0.02)
+    assert np.allclose(fine["deposition_profile_joules"][:2].sum(axis=1), fine["energy_deposited_joules"][:2], rtol=0.02)
@@ -0,0 +1,33 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import app as api
+from simulation.monte_carlo import MIN_CHUNK_SIZE, run_monte_carlo
+from simulation.parallel import parallel_monte_carlo, shutdown_executor
+
+DISTRIBUTIONS = {"diameter": {"dist": "loguniform", "low": 50, "high": 500}}
+
+
+def test_seeded_monte_carlo_ignores_the_worker_count():
+    """A seed gives the same answer serially and sharded over any number of workers"""
+    serial = run_monte_carlo(DISTRIBUTIONS, samples=25_000, seed=11, chunk_size=2_000)
+    try:
+        for workers in (2, 3):
+            sharded = asyncio.run(parallel_monte_carlo(DISTRIBUTIONS, 25_000, seed=11, chunk_size=2_000, workers=workers))
+            assert sharded == serial
+    finally:
+        shutdown_executor()
+    assert run_monte_carlo(DISTRIBUTIONS, samples=25_000, seed=12, chunk_size=2_000) != serial
+
+
+def test_monte_carlo_rejects_unbounded_chunks_and_bad_percentiles():
+    """Chunks outside [MIN_CHUNK_SIZE, MAX_CHUNK_SIZE] and percentiles outside [0, 100] are 400s"""
+    with TestClient(api.app) as client:
+        for bad in ({"chunk_size": 1}, {"chunk_size": 10_000_000}, {"percentiles": [50, 101]}, {"percentiles": [-5]}):
+            request = {"diameter": DISTRIBUTIONS["diameter"], "samples": 5_000, **bad}
+            assert client.post("/simulate/monte-carlo", json=request).status_code == 400
+            assert client.post("/jobs/monte-carlo", json=request).status_code == 400
+        edges = client.post("/simulate/monte-carlo", json={"diameter": DISTRIBUTIONS["diameter"], "samples": 5_000,
+                                                            "chunk_size": MIN_CHUNK_SIZE, "percentiles": [0, 100]})
+        assert edges.status_code == 200 and list(edges.json()["outputs"]["energy_joules"])[:2] == ["p0", "p100"]
@@ -0,0 +1,298 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as api
+from cache import TTLCache
+from catalog_store import NeoCatalog
+from nasa_client import MAX_FEED_DAYS, CircuitBreaker, CircuitOpenError, NeoWsClient, split_range
+from nasa_stub import NeoWsStub, feed_payload
+
+
+def test_feed_and_lookup_against_stub():
+    """The client parses feed and lookup responses from the local stub"""
+    async def run(base_url):
+        client = NeoWsClient(base_url, "TEST_KEY")
+        try:
+            feed = await client.feed("2025-01-01", "2025-01-02")
+            neo_id = feed["near_earth_objects"]["2025-01-01"][0]["id"]
+            neo = await client.neo(neo_id)
+            return feed, neo, neo_id
+        finally:
+            await client.aclose()
+
+    with NeoWsStub() as stub:
+        feed, neo, neo_id = asyncio.run(run(stub.base_url))
+
+    assert feed["element_count"] == 24
+    assert neo["id"] == neo_id
+
+
+def test_concurrency_is_capped_per_host():
+    """With max_per_host=2 and a 0.1 s upstream, six requests take at least three rounds"""
+    async def run(base_url):
+        client = NeoWsClient(base_url, "TEST_KEY", max_per_host=2)
+        try:
+            start = time.perf_counter()
+            await asyncio.gather(*(client.neo(str(2000000 + i)) for i in range(6)))
+            return time.perf_counter() - start
+        finally:
+            await client.aclose()
+
+    with NeoWsStub(delay=0.1) as stub:
+        elapsed = asyncio.run(run(stub.base_url))
+
+    assert elapsed >= 0.3
+
+
+def test_cache_single_flight_and_lru():
+    """Concurrent misses share one upstream fetch; repeats are hits; the byte budget evicts LRU"""
+    async def run(base_url):
+        cache = TTLCache(max_bytes=4096, ttls={"neo": 60})
+        client = NeoWsClient(base_url, "TEST_KEY", cache=cache)
+        try:
+            await asyncio.gather(*(client.neo("2000433") for _ in range(5)))
+            await client.neo("2000433")
+            for i in range(10):
+                await client.neo(str(2001000 + i))
+            return cache.stats()
+        finally:
+            await client.aclose()
+
+    with NeoWsStub(delay=0.05) as stub:
+        stats = asyncio.run(run(stub.base_url))
+        assert stub.request_count == 11
+
+    assert stats["misses"] == 11
+    assert stats["coalesced"] == 4
+    assert stats["hits"] == 1
+    assert stats["evictions"] > 0
+    assert stats["bytes"] <= 4096
+
+
+def test_stale_while_revalidate_hedging_and_deadline():
+    """Expired entries are served while one background fetch refreshes them; slow requests are hedged, then cut off"""
+    async def swr():
+        cache = TTLCache(max_bytes=4096, ttls={"feed": 0.3}, stale_ttl=60)
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return len(calls), 1
+
+        assert await cache.get_or_fetch("k", "feed", fetch) == 1
+        await asyncio.sleep(0.35)
+        assert cache.get("k") is None
+        assert [await cache.get_or_fetch("k", "feed", fetch) for _ in range(3)] == [1, 1, 1]
+        await asyncio.sleep(0.1)
+        assert await cache.get_or_fetch("k", "feed", fetch) == 2
+        assert len(calls) == 2
+        return cache.stats()
+
+    stats = asyncio.run(swr())
+    assert stats["stale_hits"] == 3 and stats["hits"] == 1 and stats["refresh_errors"] == 0
+
+    async def slow(base_url):
+        client = NeoWsClient(base_url, "TEST_KEY", hedge_delay=0.05)
+        try:
+            data = await client.neo("2000433", timeout=2)
+            started = time.perf_counter()
+            try:
+                await client.neo("2000434", timeout=0.1)
+                raise AssertionError("request outlived its deadline")
+            except asyncio.TimeoutError:
+                pass
+            return data, time.perf_counter() - started, client.stats()
+        finally:
+            await client.aclose()
+
+    with NeoWsStub(delay=0.3) as stub:
+        data, elapsed, stats = asyncio.run(slow(stub.base_url))
+        assert data["id"] == "2000433"
+        assert elapsed < 0.25
+        assert stats["hedged"] == 2
+        assert stats["consecutive_failures"] == 1 and stats["state"] == "closed"
+
+
+def test_breaker_fails_fast_and_recovers():
+    """With NeoWs down the breaker opens and /nasa-asteroids answers from the catalog without calling it"""
+    with tempfile.TemporaryDirectory() as tmp, NeoWsStub() as stub:
+        original, original_catalog = api.nasa, api.catalog
+        breaker = CircuitBreaker(failures=3, reset_timeout=0.3)
+        api.nasa = NeoWsClient(stub.base_url, "TEST_KEY", breaker=breaker)
+        api.catalog = NeoCatalog(os.path.join(tmp, "catalog.sqlite3"))
+        try:
+            start = datetime.now().date()
+            end = start + timedelta(days=7)
+            api.catalog.store_feed(feed_payload(start.isoformat(), end.isoformat()), start, end)
+
+            with TestClient(api.app) as client:
+                stub.set_failing(True)
+                for _ in range(3):
+                    neos = client.get("/nasa-asteroids").json()
+                    assert neos["source"] == "Local NEO catalog (NASA API unavailable)"
+                    assert len(neos["neos"]) == 8 * 12
+                assert breaker.state == "open"
+
+                requests_before = stub.request_count
+                assert client.get("/nasa-asteroids").json()["source"] == "Local NEO catalog (NASA API unavailable)"
+                try:
+                    asyncio.run(api.nasa.neo("2000433"))
+                    raise AssertionError("open circuit let a request through")
+                except CircuitOpenError:
+                    pass
+                assert stub.request_count == requests_before
+                assert client.get("/cache-stats").json()["upstream"]["rejected"] == 2
+                assert "nasa_upstream_open 1" in client.get("/metrics").text
+
+                stub.set_failing(False)
+                time.sleep(0.35)
+                assert client.get("/nasa-asteroids").json()["source"] == "NASA NEO API"
+                assert breaker.state == "closed"
+        finally:
+            api.catalog.close()
+            api.nasa, api.catalog = original, original_catalog
+
+
+def test_catalog_syncs_only_missing_windows():
+    """A 20-day range is fetched in 7-day windows once, then answered locally"""
+    async def run(base_url, catalog):
+        from datetime import date
+        from catalog_store import sync_range
+        client = NeoWsClient(base_url, "TEST_KEY")
+        try:
+            first = await sync_range(catalog, client, date(2024, 5, 1), date(2024, 5, 20))
+            second = await sync_range(catalog, client, date(2024, 5, 10), date(2024, 5, 22))
+            return first, second
+        finally:
+            await client.aclose()
+
+    with tempfile.TemporaryDirectory() as tmp, NeoWsStub() as stub:
+        catalog = NeoCatalog(os.path.join(tmp, "catalog.sqlite3"))
+        first, second = asyncio.run(run(stub.base_url, catalog))
+
+        assert len(first["windows_fetched"]) == 3
+        assert second["windows_fetched"] == [("2024-05-21", "2024-05-22")]
+        assert stub.request_count == 4
+
+        rows = catalog.query_feed("2024-05-01", "2024-05-22")
+        assert len(rows) == 22 * 12
+        assert [r["close_approach_date"] for r in rows] == sorted(r["close_approach_date"] for r in rows)
+        assert all(r["hazardous"] for r in catalog.query_feed("2024-05-01", "2024-05-22", hazardous=True))
+        catalog.close()
+
+
+def test_feed_range_is_sharded_retried_and_merged():
+    """A 30-day feed without the catalog is fetched as 5 shards, retried past 503s, in date order"""
+    with NeoWsStub() as stub:
+        original, original_catalog = api.nasa, api.catalog
+        api.nasa = NeoWsClient(stub.base_url, "TEST_KEY", backoff=0.01)
+        api.catalog = None
+        try:
+            with TestClient(api.app) as client:
+                stub.fail_next(2)
+                params = {"start_date": "2025-06-01", "end_date": "2025-06-30"}
+                feed = client.get("/nasa-neo-feed", params=params)
+                assert feed.status_code == 200
+                assert stub.request_count == 5 + 2
+
+                neos = feed.json()["neos"]
+                assert len(neos) == 30 * 12
+                assert [n["close_approach_date"] for n in neos] == sorted(n["close_approach_date"] for n in neos)
+
+                ndjson = client.get("/nasa-neo-feed", params={**params, "format": "ndjson"})
+                assert [json.loads(line) for line in ndjson.text.splitlines()] == neos
+        finally:
+            api.nasa, api.catalog = original, original_catalog
+
+
+def test_feed_range_length_is_capped():
+    """Ranges past MAX_FEED_DAYS are 400s on every feed path, before any NeoWs request"""
+    start = date(2025, 1, 1)
+    last = start + timedelta(days=MAX_FEED_DAYS - 1)
+    assert len(split_range(start, last)) == -(-MAX_FEED_DAYS // 7)
+    with pytest.raises(ValueError):
+        split_range(start, last + timedelta(days=1))
+
+    with tempfile.TemporaryDirectory() as tmp, NeoWsStub() as stub:
+        original, original_catalog = api.nasa, api.catalog
+        api.nasa = NeoWsClient(stub.base_url, "TEST_KEY")
+        api.catalog = NeoCatalog(os.path.join(tmp, "catalog.sqlite3"))
+        try:
+            with TestClient(api.app) as client:
+                century = {"start_date": "1900-01-01", "end_date": "2100-01-01"}
+                for fmt in (None, "ndjson", "json-stream"):
+                    params = century if fmt is None else {**century, "format": fmt}
+                    assert client.get("/nasa-neo-feed", params=params).status_code == 400
+                assert client.get("/nasa-neo-feed/entry", params=century).status_code == 400
+                assert client.post("/catalog/sync", params=century).status_code == 400
+                assert stub.request_count == 0
+        finally:
+            api.catalog.close()
+            api.nasa, api.catalog = original, original_catalog
+
+
+def test_endpoints_use_shared_client():
+    """Feed and lookup endpoints answer from the stub through the shared client"""
+    with tempfile.TemporaryDirectory() as tmp, NeoWsStub() as stub:
+        original, original_catalog = api.nasa, api.catalog
+        api.nasa = NeoWsClient(stub.base_url, "TEST_KEY")
+        api.catalog = NeoCatalog(os.path.join(tmp, "catalog.sqlite3"))
+        try:
+            with TestClient(api.app) as client:
+                feed = client.get("/nasa-neo-feed", params={"start_date": "2025-03-01", "end_date": "2025-03-01"})
+                assert feed.status_code == 200
+                assert feed.json()["count"] == 12
+
+                neo_id = feed.json()["neos"][0]["id"]
+                sim = client.get(f"/simulate-impact-nasa/{neo_id}")
+                assert sim.status_code == 200
+                assert sim.json()["asteroid"]["id"] == neo_id
+
+                ndjson = client.get("/nasa-neo-feed", params={"start_date": "2025-03-01", "end_date": "2025-03-01", "format": "ndjson"})
+                assert [json.loads(line) for line in ndjson.text.splitlines()] == feed.json()["neos"]
+                streamed = client.get("/nasa-neo-feed", params={"start_date": "2025-03-01", "end_date": "2025-03-01", "format": "json-stream"})
+                assert streamed.json() == feed.json()
+
+                requests_before = stub.request_count
+                client.get(f"/simulate-impact-nasa/{neo_id}")
+                client.get("/nasa-neo-feed", params={"start_date": "2025-03-01", "end_date": "2025-03-01"})
+                assert stub.request_count == requests_before
+        finally:
+            api.catalog.close()
+            api.nasa, api.catalog = original, original_catalog
+
+
+def test_weekly_feed_entry_integration():
+    """A week of feed objects goes through the entry integrator in one batch"""
+    with NeoWsStub() as stub:
+        original, original_catalog = api.nasa, api.catalog
+        api.nasa = NeoWsClient(stub.base_url, "TEST_KEY")
+        api.catalog = None
+        try:
+            with TestClient(api.app) as client:
+                week = {"start_date": "2025-03-01", "end_date": "2025-03-07"}
+                started = time.perf_counter()
+                entry = client.get("/nasa-neo-feed/entry", params=week)
+                elapsed = time.perf_counter() - started
+                assert entry.status_code == 200, entry.text
+                results = entry.json()["results"]
+                assert len(results) == 7 * 12 and elapsed < 5
+
+                for r in results:
+                    assert r["entry_velocity_km_s"] > 11.1
+                    if r["airburst"]:
+                        assert r["crater_diameter_km"] == 0 and r["surface_velocity_ms"] == 0
+                    else:
+                        assert r["burst_altitude_km"] is None and r["crater_diameter_km"] > 0
+
+                assert client.get("/nasa-neo-feed/entry", params={**week, "angle": 0}).status_code == 400
+        finally:
+            api.nasa, api.catalog = original, original_catalog
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import os
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import app as api
+from cache import ResponseMemo
+from simulation.exposure import PopulationRaster
+from simulation.parallel import parallel_monte_carlo, shutdown_executor
+from simulation.result_store import INDEX_RECORD, ResultStore, result_key
+
+
+def test_result_store_survives_restarts_evicts_and_compacts(tmp_path):
+    """A new store (restart, other worker) reads what another wrote; oldest go first over budget"""
+    root = str(tmp_path)
+    store = ResultStore(root, max_bytes=10_000, max_age=3600, segment_bytes=4096)
+    key = result_key("simulate", {"diameter": 100.0, "velocity": 20.0})
+    assert key == result_key("simulate", {"velocity": 20.0, "diameter": 100.0})
+    assert store.get(key) is None
+
+    store.put(key, b'{"energy":1}' * 100)
+    other = ResultStore(root, max_bytes=10_000, max_age=3600, segment_bytes=4096)
+    assert other.get(key) == b'{"energy":1}' * 100
+    # Content-addressed: an identical result is not written twice, by either store
+    store.put(key, b'{"energy":1}' * 100)
+    other.put(key, b'{"energy":1}' * 100)
+    assert os.path.getsize(os.path.join(root, "index.bin")) == INDEX_RECORD.itemsize
+    # Records appended by another process show up on a miss
+    late = result_key("simulate", {"diameter": 200.0})
+    other.put(late, b"late")
+    assert store.get(late) == b"late"
+
+    # A torn index tail (crash mid-write) is ignored on warm start
+    with open(os.path.join(root, "index.bin"), "ab") as f:
+        f.write(b"\0" * 7)
+    assert ResultStore(root, 10_000, 3600).get(key) == b'{"energy":1}' * 100
+
+    # Incompressible blobs fill the budget: the oldest are evicted, then compacted away
+    keys = [result_key("blob", {"i": i}) for i in range(12)]
+    for i, k in enumerate(keys):
+        store.put(k, os.urandom(1500))
+    stats = store.stats()
+    assert stats["evictions"] > 0 and stats["live_bytes"] <= 10_000
+    assert store.get(keys[0]) is None and store.get(keys[-1]) is not None
+    assert stats["dead_bytes"] <= max(stats["live_bytes"], 1024)
+
+    warm = ResultStore(root, 10_000, 3600)
+    assert warm.get(keys[-1]) == store.get(keys[-1])
+    assert warm.stats()["entries"] == stats["entries"]
+    # Expired entries are misses
+    assert ResultStore(root, 10_000, max_age=-1).get(keys[-1]) is None
+
+    # Keys are raw digests: one ending in NUL bytes survives the index round trip
+    padded = b"\x01" * 30 + b"\0\0"
+    store.put(padded, b"padded")
+    assert ResultStore(root, 10_000, 3600).get(padded) == b"padded"
+
+
+def test_seeded_monte_carlo_is_served_from_the_store(tmp_path):
+    """A seeded run computed once is answered from disk by a fresh store instance, whatever the pool size"""
+    request = {"diameter": {"dist": "uniform", "low": 100, "high": 200}, "samples": 20_000, "seed": 7, "chunk_size": 4_000}
+    original, threshold = api.result_store, api.RESULT_STORE_MIN_SECONDS
+    try:
+        api.RESULT_STORE_MIN_SECONDS = 0.0
+        api.result_store = ResultStore(str(tmp_path), 1 << 20, 3600)
+        with TestClient(api.app) as client:
+            first = client.post("/simulate/monte-carlo", json=request)
+            assert first.status_code == 200
+            assert api.result_store.stats()["writes"] == 1
+
+            api.result_store = ResultStore(str(tmp_path), 1 << 20, 3600)
+            second = client.post("/simulate/monte-carlo", json=request)
+            assert second.status_code == 200 and second.content == first.content
+            assert api.result_store.stats()["hits"] == 1
+            assert client.get("/cache-stats").json()["results"]["entries"] == 1
+
+        # What a deployment with another SIM_WORKERS would have computed and stored
+        sharded = asyncio.run(parallel_monte_carlo({"diameter": request["diameter"]}, 20_000, seed=7, chunk_size=4_000, workers=3))
+        assert json.loads(first.content)["outputs"] == sharded["outputs"]
+    finally:
+        shutdown_executor()
+        api.result_store, api.RESULT_STORE_MIN_SECONDS = original, threshold
+
+
+def test_stored_simulations_are_keyed_on_the_population_raster(tmp_path):
+    """A restart with another raster misses the results stored with the old one"""
+    request = {"diameter": 300.0, "velocity": 20.0, "density": 3000.0, "lat": 40.5, "lon": -73.5}
+    coarse = PopulationRaster(np.full((180, 360), 1000.0, dtype=np.float32))
+    fine = PopulationRaster(np.full((360, 720), 250.0, dtype=np.float32))
+    original = api.result_store, api.RESULT_STORE_MIN_SECONDS, api.population, api.response_memo
+    try:
+        api.RESULT_STORE_MIN_SECONDS = 0.0
+        exposures = []
+        for raster in (coarse, fine, coarse):
+            # A fresh process: new memo, new store instance over the same directory
+            api.population, api.response_memo = raster, ResponseMemo(64, 6)
+            api.result_store = ResultStore(str(tmp_path), 1 << 20, 3600)
+            with TestClient(api.app) as client:
+                response = client.post("/simulate", json=request)
+            assert response.status_code == 200
+            exposures.append((response.json()["population_exposure"], api.result_store.stats()))
+        (first, first_stats), (second, second_stats), (third, third_stats) = exposures
+        assert first_stats["writes"] == 1 and second_stats["writes"] == 1 and second != first
+        assert third == first and third_stats["hits"] == 1 and third_stats["writes"] == 0
+    finally:
+        api.result_store, api.RESULT_STORE_MIN_SECONDS, api.population, api.response_memo = original
@@ -0,0 +1,82 @@
+import numpy as np
+from fastapi.testclient import TestClient
+
+import app as api
+from simulation.deflection import EARTH_ESCAPE_SPEED
+from simulation.scenario import (
+    FRAME_DTYPE, FRAME_HEADER, SCENARIO_COLUMNS, ZONE_COLUMNS, decimate, run_scenario,
+)
+
+
+def test_scenario_phases_grow_to_the_final_state():
+    """Time runs forward through approach, entry and aftermath; zones end at the model's final radii"""
+    scenario = run_scenario(300.0, 20.0, 3000.0, angle=45.0, model="pi_scaling")
+    columns = scenario["columns"]
+    assert np.all(np.diff(columns["time_s"]) > 0)
+    assert [phase["name"] for phase in scenario["phases"]] == ["approach", "entry", "aftermath"]
+
+    approach, entry, aftermath = (slice(phase["start"], phase["stop"]) for phase in scenario["phases"])
+    assert np.all(columns["time_s"][approach] < 0) and columns["time_s"][entry][0] == 0
+    # Falling in, the body speeds up and closes in on Earth
+    assert np.all(np.diff(columns["altitude_km"][approach]) < 0)
+    assert np.all(np.diff(columns["velocity_km_s"][approach]) > 0)
+    assert columns["altitude_km"][entry][0] == 100 and columns["altitude_km"][entry][-1] == 0
+
+    result = scenario["outcome"]
+    for name in ZONE_COLUMNS:
+        radii = columns[name][aftermath]
+        assert np.all(np.diff(radii) >= 0)
+        assert np.isclose(radii[-1], result["impact_zones"][name], rtol=1e-3)
+    assert np.isclose(columns["crater_radius_km"][-1], result["crater_diameter_km"] / 2, rtol=1e-3)
+    assert scenario["entry_velocity_km_s"] == 20.0
+
+    # A velocity below escape speed is the speed far from Earth; the fall adds escape speed
+    slow = run_scenario(300.0, 5.0, 3000.0, angle=45.0, model="pi_scaling")
+    assert np.isclose(slow["entry_velocity_km_s"], np.hypot(5.0, EARTH_ESCAPE_SPEED))
+    assert np.all(np.isfinite(slow["columns"]["velocity_km_s"]))
+    assert np.isclose(slow["columns"]["velocity_km_s"][slow["phases"][1]["start"]], slow["entry_velocity_km_s"])
+
+    frames = decimate(columns, 200)
+    assert len(frames) <= 200 and frames[0] == 0 and frames[-1] == len(columns["time_s"]) - 1
+    for phase in scenario["phases"]:
+        assert phase["start"] in frames and phase["stop"] - 1 in frames
+
+
+def test_scenario_websocket_streams_binary_frames():
+    """One socket serves several scenarios; bad requests get an error message and the socket stays open"""
+    with TestClient(api.app) as client, client.websocket_connect("/ws/scenario") as ws:
+        for bad in ({"diameter": 100, "velocity": 0, "density": 3000}, {"diameter": 0, "velocity": 18, "density": 3000}, {"diameter": -5, "velocity": 18, "density": 3000},
+                    {"diameter": 60, "velocity": 18, "density": 0}, [1, 2]):
+            ws.send_json(bad)
+            error = ws.receive_json()
+            assert error["event"] == "error" and error["detail"].startswith("Invalid scenario request")
+        ws.send_text("{not json")
+        assert ws.receive_json()["event"] == "error"
+        ws.send_bytes(b"\xff")
+        assert ws.receive_json()["event"] == "error"
+
+        request = {"diameter": 60, "velocity": 18, "density": 3000, "model": "entry",
+                   "max_frames": 150, "frames_per_message": 40}
+        ws.send_json(request)
+        header = ws.receive_json()
+        assert header["event"] == "scenario" and header["columns"] == list(SCENARIO_COLUMNS)
+        assert header["frames"] <= 150 and header["phases"][-1]["stop"] == header["frames"]
+
+        chunks = []
+        while True:
+            message = ws.receive()
+            if message.get("bytes") is None:
+                break
+            first, count = FRAME_HEADER.unpack_from(message["bytes"])
+            assert first == sum(len(chunk) for chunk in chunks) and count <= 40
+            frames = np.frombuffer(message["bytes"], dtype=FRAME_DTYPE, offset=FRAME_HEADER.size)
+            chunks.append(frames.reshape(count, len(header["columns"])))
+        assert '"done"' in message["text"]
+        frames = np.concatenate(chunks)
+        assert len(frames) == header["frames"]
+
+        scenario = run_scenario(60, 18, 3000, model="entry")
+        expected = np.stack([scenario["columns"][name] for name in SCENARIO_COLUMNS], axis=1)
+        expected = expected[decimate(scenario["columns"], 150)].astype(FRAME_DTYPE)
+        assert np.array_equal(frames, expected)
+        assert header["airburst"] == scenario["airburst"]
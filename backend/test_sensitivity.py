@@ -0,0 +1,70 @@
+import time
+import tracemalloc
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import app as api
+from simulation.sensitivity import MAX_SOBOL_SAMPLES, run_sensitivity, sobol_sequence
+
+BASE = {"diameter": 200.0, "velocity": 20.0, "density": 3000.0, "angle": 45.0}
+
+
+def test_sobol_points_are_stratified_and_energy_indices_follow_its_exponents():
+    """E ∝ d³ v² ρ: elasticities 3, 2, 1, 0 locally; globally diameter > velocity > density and angle is inert"""
+    points = sobol_sequence(1024, 8, skip=0)
+    assert points[:4].tolist() == [[0.0] * 8, [0.5] * 8, [0.75, 0.25, 0.25, 0.25, 0.75, 0.75, 0.25, 0.75],
+                                    [0.25, 0.75, 0.75, 0.75, 0.25, 0.25, 0.75, 0.25]]
+    for j in range(8):
+        assert np.all(np.bincount((points[:, j] * 64).astype(int), minlength=64) == 16)
+
+    result = run_sensitivity(BASE, model="fast", samples=4096, trajectories=50, seed=7)
+    local = result["local"]["kinetic_energy_megatons"]["derivatives"]
+    for name, exponent in (("diameter", 3), ("velocity", 2), ("density", 1), ("angle", 0)):
+        assert abs(local[name]["elasticity"] - exponent) < 1e-5
+
+    sobol = result["sobol"]["indices"]["kinetic_energy_megatons"]
+    assert result["sobol"]["ranking"]["kinetic_energy_megatons"] == ["diameter", "velocity", "density", "angle"]
+    assert sobol["angle"]["ST"] == 0 and sobol["angle"]["S1"] == 0
+    # With ±25% ranges the output is nearly additive in log space: S1 ~ ST, summing to ~1
+    assert abs(sum(index["S1"] for index in sobol.values()) - 1) < 0.1
+    assert all(index["ST"] >= index["S1"] - index["S1_conf"] for index in sobol.values())
+    assert result["morris"]["ranking"]["kinetic_energy_megatons"] == ["diameter", "velocity", "density", "angle"]
+    # Angle matters to the pi-scaling crater but not to its energy
+    angled = run_sensitivity(BASE, model="pi_scaling", methods=["local"])
+    assert angled["local"]["crater_radius_km"]["derivatives"]["angle"]["elasticity"] > 0
+
+
+def test_sensitivity_endpoint():
+    """Fixed parameters drop out of the global analysis; unbounded distributions are rejected"""
+    with TestClient(api.app) as client:
+        response = client.post("/simulate/sensitivity", json={
+            **BASE, "ranges": {"density": {"dist": "fixed", "value": 3000}, "angle": {"dist": "isotropic", "min": 5}},
+            "methods": ["sobol", "morris"], "samples": 100, "seed": 1, "model": "pi_scaling",
+        })
+        assert response.status_code == 200
+        result = response.json()
+        assert result["parameters"] == ["diameter", "velocity", "angle"] and "local" not in result
+        assert result["sobol"]["samples"] == 128 and result["sobol"]["evaluations"] == 128 * 5
+        assert set(result["morris"]["indices"]["shockwave_radius"]) == {"diameter", "velocity", "angle"}
+
+        bad = client.post("/simulate/sensitivity", json={**BASE, "ranges": {"velocity": {"dist": "normal", "mean": 20, "std": 5}}})
+        assert bad.status_code == 400
+        assert client.post("/simulate/sensitivity", json={**BASE, "methods": ["anova"]}).status_code == 400
+
+
+def test_sobol_bootstrap_is_bounded_at_the_largest_sample_count():
+    """N = MAX_SOBOL_SAMPLES stays within a few hundred MB and seconds, with tight 200-resample intervals"""
+    tracemalloc.start()
+    try:
+        started = time.perf_counter()
+        result = run_sensitivity(BASE, methods=["sobol"], samples=MAX_SOBOL_SAMPLES, model="fast", seed=3)
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak < 512 * 2 ** 20 and elapsed < 30
+    energy = result["sobol"]["indices"]["kinetic_energy_megatons"]
+    assert 0 < energy["diameter"]["S1_conf"] < 0.05 and 0 < energy["velocity"]["ST_conf"] < 0.05
+    assert result["sobol"]["ranking"]["kinetic_energy_megatons"][:3] == ["diameter", "velocity", "density"]
+
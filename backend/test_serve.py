@@ -0,0 +1,37 @@
+from fastapi.testclient import TestClient
+
+import app as api
+from catalog_store import NeoCatalog
+from jobs import JobManager
+
+
+def test_readiness_probe_follows_the_worker_lifecycle(tmp_path):
+    """/ready is 503 until the startup warm-up, 200 after it, 503 from the start of the drain and on a dead catalog"""
+    assert TestClient(api.app).get("/ready").status_code == 503   # no lifespan: never warmed up
+
+    drained = []
+
+    class DrainProbe(JobManager):
+        def cancel_all(self):
+            drained.append(api.readiness().status_code)
+            super().cancel_all()
+
+    saved_jobs, saved_catalog = api.jobs, api.catalog
+    api.jobs = DrainProbe(saved_jobs.store)
+    try:
+        with TestClient(api.app) as client:
+            ready = client.get("/ready")
+            assert ready.status_code == 200 and ready.json()["checks"]["warmed_up"]
+
+            api.catalog = NeoCatalog(str(tmp_path / "catalog.sqlite3"))
+            assert client.get("/ready").json()["checks"]["catalog"] is True
+            api.catalog.close()
+            failed = client.get("/ready")
+            assert failed.status_code == 503 and failed.json()["checks"] == {"warmed_up": True, "catalog": False}
+            assert client.get("/health").status_code == 200
+            api.catalog = saved_catalog
+        # Shutdown clears readiness before it starts cancelling jobs and closing pools
+        assert drained == [503]
+        assert TestClient(api.app).get("/ready").status_code == 503
+    finally:
+        api.jobs, api.catalog = saved_jobs, saved_catalog
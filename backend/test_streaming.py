@@ -0,0 +1,24 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import app as api
+
+
+def test_batch_streams_parse_to_the_buffered_response():
+    """json-stream parses to the buffered JSON object; ndjson carries the same rows one per line"""
+    scenarios = [
+        {"diameter": 20.0 + 13 * i, "velocity": 11.5 + i % 17, "density": 1500.0 + 40 * i, "angle": 10 + i % 80,
+         "lat": (i % 120) - 60.0, "lon": 2.5 * i}
+        for i in range(300)
+    ]
+    scenarios[7]["lat"] = scenarios[7]["lon"] = None
+    body = {"scenarios": scenarios, "model": "pi_scaling"}
+    with TestClient(api.app) as client:
+        buffered = client.post("/simulate/batch", json=body).json()
+        streamed = client.post("/simulate/batch", params={"format": "json-stream"}, json=body)
+        assert streamed.headers["content-type"] == "application/json"
+        assert json.loads(streamed.content) == buffered
+
+        lines = client.post("/simulate/batch", params={"format": "ndjson"}, json=body).text.splitlines()
+        assert [json.loads(line) for line in lines] == buffered["results"]